@@ -0,0 +1,307 @@
+"""
+Stage-by-stage benchmarks of the analysis on synthetic plates.
+
+Every stage of the app is timed separately (parsing, control analysis, dense matrix, DTW, feature
+extraction of all wells, plate-format conversion, heatmap and CSV/Parquet/Arrow export) and the
+results are written to a JSON file, so runs of different versions can be compared.
+
+Example:
+    python benchmarks/run_benchmarks.py --plate-sizes 96 384 --repeats 3
+"""
+import argparse
+from datetime import datetime, timezone
+import json
+import os
+from pathlib import Path
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCHMARK_DIR.parent / "src"))
+
+from analysis.classification import ATYPICAL, WellClassification  # noqa: E402
+from analysis.clustering import cluster_wells, get_pairwise_dtw_distances  # noqa: E402
+from analysis.dense import DenseCurves  # noqa: E402
+from analysis.dtw import get_dtw_distances  # noqa: E402
+from analysis.export import export_table  # noqa: E402
+from analysis.features import extract_features_batch  # noqa: E402
+from analysis.heatmap import create_plate_heatmap  # noqa: E402
+from analysis.ingest import parse_dsf_file  # noqa: E402
+from analysis.plate import PlateData  # noqa: E402
+from analysis.results import WellResults, build_results_table  # noqa: E402
+from analysis.similarity import get_correlation_distances  # noqa: E402
+from synthetic import make_plate, to_quantstudio7  # noqa: E402
+
+DTW_LOWER_THRESHOLD = 0.5
+DTW_UPPER_THRESHOLD = 1.5
+SMOOTHING = 0.01
+
+
+def stage_parse(ctx: Dict[str, Any]) -> None:
+    validated_data, _ = parse_dsf_file(ctx["export"], "QuantStudio 7")
+    ctx["plate"] = PlateData(validated_data)
+    ctx["wells"] = ctx["plate"].wells
+
+
+def stage_control_analysis(ctx: Dict[str, Any]) -> None:
+    control_features = extract_features_batch(
+        ctx["plate"],
+        ctx["control_wells"],
+        min_temp=ctx["min_temp"],
+        max_temp=ctx["max_temp"],
+        smoothing=SMOOTHING,
+        max_workers=ctx["max_workers"],
+    )
+    control_tms = [features["tm"] for features in control_features.values()]
+    ctx["avg_control_tm"] = float(np.mean(control_tms))
+
+
+def stage_dense_matrix(ctx: Dict[str, Any]) -> None:
+    ctx["dense_curves"] = DenseCurves.from_plate(ctx["plate"], ctx["wells"])
+
+
+def stage_dtw(ctx: Dict[str, Any]) -> None:
+    dtw_distances, _ = get_dtw_distances(
+        ctx["dense_curves"],
+        ctx["control_wells"][0],
+        min_temp=ctx["min_temp"],
+        max_temp=ctx["max_temp"],
+        prune_above=DTW_UPPER_THRESHOLD,
+        max_workers=ctx["max_workers"],
+    )
+    classification = WellClassification.from_dtw_distances(dtw_distances)
+    classification.classify(DTW_LOWER_THRESHOLD, DTW_UPPER_THRESHOLD)
+    ctx["atypical_wells"] = classification.get_wells(ATYPICAL)
+
+
+def stage_correlation(ctx: Dict[str, Any]) -> None:
+    get_correlation_distances(
+        ctx["dense_curves"], ctx["control_wells"][0], ctx["min_temp"], ctx["max_temp"]
+    )
+
+
+def stage_pairwise_clustering(ctx: Dict[str, Any]) -> None:
+    pairwise = get_pairwise_dtw_distances(
+        ctx["dense_curves"], ctx["min_temp"], ctx["max_temp"], max_workers=ctx["max_workers"]
+    )
+    cluster_wells(pairwise)
+
+
+def stage_feature_extraction(ctx: Dict[str, Any]) -> None:
+    all_features = extract_features_batch(
+        ctx["plate"],
+        ctx["wells"],
+        min_temp=ctx["min_temp"],
+        max_temp=ctx["max_temp"],
+        smoothing=SMOOTHING,
+        avg_control_tm=ctx["avg_control_tm"],
+        max_workers=ctx["max_workers"],
+    )
+    ctx["results"] = WellResults.from_features(
+        all_features,
+        ctx["atypical_wells"],
+        smoothing=SMOOTHING,
+        min_temp=ctx["min_temp"],
+        max_temp=ctx["max_temp"],
+        positions=ctx["plate"].get_positions(list(all_features)),
+    )
+
+
+def stage_plate_format(ctx: Dict[str, Any]) -> None:
+    ctx["heatmap_data"] = ctx["results"].to_plate_format(
+        "delta_tm", ctx["plate_size"], mask_empty=True
+    )
+
+
+def stage_heatmap(ctx: Dict[str, Any]) -> None:
+    plate_data, cols, rows = ctx["heatmap_data"]
+    create_plate_heatmap(plate_data, cols, rows, title="ΔTm", colorbar_title="ΔTm")
+
+
+def stage_csv_export(ctx: Dict[str, Any]) -> None:
+    ctx["results_table"] = build_results_table(ctx["results"], ctx["wells"])
+    export_table(ctx["results_table"], "csv")
+
+
+def stage_parquet_export(ctx: Dict[str, Any]) -> None:
+    export_table(ctx["results_table"], "parquet")
+
+
+def stage_arrow_export(ctx: Dict[str, Any]) -> None:
+    export_table(ctx["results_table"], "arrow")
+
+
+# in the order of the pages of the app; every stage uses the outputs of the previous stages
+STAGES: Dict[str, Callable[[Dict[str, Any]], None]] = {
+    "parse": stage_parse,
+    "control_analysis": stage_control_analysis,
+    "dense_matrix": stage_dense_matrix,
+    "dtw": stage_dtw,
+    "correlation": stage_correlation,
+    "pairwise_clustering": stage_pairwise_clustering,
+    "feature_extraction": stage_feature_extraction,
+    "plate_format": stage_plate_format,
+    "heatmap": stage_heatmap,
+    "csv_export": stage_csv_export,
+    "parquet_export": stage_parquet_export,
+    "arrow_export": stage_arrow_export,
+}
+
+# stages that only run if requested with --stages (minutes for 1536 wells)
+OPTIONAL_STAGES = {"pairwise_clustering"}
+
+
+def time_stage(func: Callable[[Dict[str, Any]], None], ctx: Dict[str, Any], repeats: int) -> Dict:
+    """Run a stage `repeats` times and summarize the wall times (or record the error)."""
+    timings = []
+    try:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            func(ctx)
+            timings.append(time.perf_counter() - start)
+    except Exception as e:
+        # keep the first line only (validation errors list every failing value)
+        message = str(e).splitlines()[0] if str(e) else ""
+        return {"error": f"{type(e).__name__}: {message[:200]}"}
+
+    return {
+        "median_s": statistics.median(timings),
+        "min_s": min(timings),
+        "max_s": max(timings),
+        "repeats": repeats,
+    }
+
+
+def run_plate_benchmark(plate_size: int, args: argparse.Namespace) -> Dict[str, Any]:
+    synthetic = make_plate(
+        plate_size=plate_size,
+        temperature_step=args.temperature_step,
+        noise=args.noise,
+        empty_fraction=args.empty_fraction,
+        seed=args.seed,
+    )
+    ctx: Dict[str, Any] = {
+        "export": to_quantstudio7(synthetic.data),
+        "plate_size": plate_size,
+        "control_wells": synthetic.control_wells,
+        "min_temp": float(synthetic.data["temperature"].min()),
+        "max_temp": float(synthetic.data["temperature"].max()),
+        "max_workers": args.workers,
+    }
+
+    if "parse" not in args.stages:
+        # the other stages need the plate; it is built without the (untimed) parser
+        ctx["plate"] = PlateData(synthetic.data)
+        ctx["wells"] = ctx["plate"].wells
+
+    stages = {}
+    for name, func in STAGES.items():
+        if name not in args.stages:
+            continue
+        stages[name] = time_stage(func, ctx, args.repeats)
+        if name == "parse" and "plate" not in ctx:
+            # e.g. plate sizes the parsers do not support yet; time the other stages anyway
+            ctx["plate"] = PlateData(synthetic.data)
+            ctx["wells"] = ctx["plate"].wells
+
+    return {
+        "plate_size": plate_size,
+        "n_wells": len(ctx["wells"]),
+        "n_points": synthetic.n_points,
+        "n_empty_wells": len(synthetic.empty_wells),
+        "export_bytes": len(ctx["export"]),
+        "stages": stages,
+    }
+
+
+def get_git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BENCHMARK_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_metadata(args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": get_git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            "temperature_step": args.temperature_step,
+            "noise": args.noise,
+            "empty_fraction": args.empty_fraction,
+            "seed": args.seed,
+            "repeats": args.repeats,
+            "workers": args.workers,
+            "dtw_upper_threshold": DTW_UPPER_THRESHOLD,
+            "smoothing": SMOOTHING,
+        },
+    }
+
+
+def print_summary(results: List[Dict[str, Any]]) -> None:
+    for result in results:
+        print(f"\n{result['plate_size']} wells, {result['n_points']} points per well")
+        for name, timing in result["stages"].items():
+            if "error" in timing:
+                print(f"  {name:<20} failed: {timing['error']}")
+            else:
+                print(f"  {name:<20} {timing['median_s'] * 1000:10.1f} ms")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--plate-sizes", type=int, nargs="+", default=[96, 384, 1536])
+    parser.add_argument("--temperature-step", type=float, default=0.5, help="Degrees per reading")
+    parser.add_argument("--noise", type=float, default=0.005, help="Noise relative to amplitude")
+    parser.add_argument("--empty-fraction", type=float, default=0.1, help="Fraction of empty wells")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--workers", type=int, help="Number of CPUs to use (default: all)")
+    parser.add_argument(
+        "--stages",
+        nargs="+",
+        choices=list(STAGES),
+        default=[name for name in STAGES if name not in OPTIONAL_STAGES],
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="JSON file for the results (default: benchmarks/results/<timestamp>.json)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+
+    results = [run_plate_benchmark(plate_size, args) for plate_size in args.plate_sizes]
+    report = {"metadata": get_metadata(args), "results": results}
+
+    output = args.output
+    if output is None:
+        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = BENCHMARK_DIR / "results" / f"{timestamp}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+
+    print_summary(results)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Generator for synthetic DSF plates.
+
+The melting curves are sigmoidal unfolding transitions followed by a slow decay of the signal (as
+seen for aggregating proteins), with Gaussian noise. Empty wells have a flat, low signal.
+"""
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+# the app's layout helpers (src must be on the path, see run_benchmarks.py)
+from analysis.layout import get_plate_shape, get_row_labels
+
+
+@dataclass
+class SyntheticPlate:
+    """Synthetic plate in the validated format returned by the parsers."""
+
+    data: pd.DataFrame
+    plate_size: int
+    control_wells: List[str]
+    empty_wells: List[str]
+
+    @property
+    def n_points(self) -> int:
+        return int(len(self.data) // self.data["well_position"].nunique())
+
+
+def get_well_ids(plate_size: int) -> List[str]:
+    """Well IDs of a plate in row-major order."""
+    _, n_cols = get_plate_shape(plate_size)
+    return [f"{row}{col}" for row in get_row_labels(plate_size) for col in range(1, n_cols + 1)]
+
+
+def make_plate(
+    plate_size: int = 384,
+    min_temp: float = 25.0,
+    max_temp: float = 95.0,
+    temperature_step: float = 0.5,
+    noise: float = 0.005,
+    empty_fraction: float = 0.1,
+    tm_mean: float = 55.0,
+    tm_sd: float = 3.0,
+    n_controls: int = 4,
+    seed: Optional[int] = 0,
+) -> SyntheticPlate:
+    """
+    Generate a synthetic plate.
+
+    Args:
+        plate_size: Number of wells (96, 384 or 1536)
+        min_temp: First temperature of the melt
+        max_temp: Last temperature of the melt
+        temperature_step: Temperature resolution in degrees
+        noise: Standard deviation of the noise relative to the amplitude of the transition
+        empty_fraction: Fraction of empty wells (control wells are never empty)
+        tm_mean: Mean melting temperature
+        tm_sd: Standard deviation of the melting temperatures
+        n_controls: Number of control wells (the first wells of the first column)
+        seed: Seed of the random number generator
+
+    Returns:
+        SyntheticPlate
+    """
+    _, n_cols = get_plate_shape(plate_size)
+    rng = np.random.default_rng(seed)
+    wells = get_well_ids(plate_size)
+    n_wells = len(wells)
+    n_points = int(round((max_temp - min_temp) / temperature_step)) + 1
+    temperatures = np.round(min_temp + temperature_step * np.arange(n_points), 3)
+
+    control_wells = [wells[i * n_cols] for i in range(n_controls)]
+    control_idx = np.array([i * n_cols for i in range(n_controls)], dtype=int)
+
+    candidates = np.setdiff1d(np.arange(n_wells), control_idx)
+    n_empty = int(round(empty_fraction * n_wells))
+    empty_idx = np.sort(rng.choice(candidates, size=min(n_empty, len(candidates)), replace=False))
+
+    baseline = rng.normal(1000.0, 50.0, n_wells)[:, None]
+    amplitude = rng.normal(5000.0, 500.0, n_wells)[:, None]
+    tm = rng.normal(tm_mean, tm_sd, n_wells)[:, None]
+    slope = rng.uniform(1.5, 2.5, n_wells)[:, None]
+    decay = rng.uniform(0.01, 0.03, n_wells)[:, None]
+
+    t = temperatures[None, :]
+    unfolded = 1.0 / (1.0 + np.exp(-(t - tm) / slope))
+    post_transition = np.clip(t - tm - 5.0 * slope, 0.0, None)
+    signal = baseline + amplitude * unfolded * np.exp(-decay * post_transition)
+    signal[empty_idx] = baseline[empty_idx]
+    signal += rng.normal(0.0, 1.0, signal.shape) * noise * amplitude
+
+    data = pd.DataFrame(
+        {
+            "well_position": np.repeat(wells, len(temperatures)),
+            "temperature": np.tile(temperatures, n_wells),
+            "fluorescence": signal.ravel(),
+        }
+    )
+
+    return SyntheticPlate(
+        data=data,
+        plate_size=plate_size,
+        control_wells=control_wells,
+        empty_wells=[wells[i] for i in empty_idx],
+    )
+
+
+def to_quantstudio7(data: pd.DataFrame) -> bytes:
+    """Write a plate as a QuantStudio 7 export (as expected by QuantStudio7Parser)."""
+    header = "".join(f"* Synthetic plate header line {i + 1}\n" for i in range(21))
+
+    well_codes, _ = pd.factorize(data["well_position"])
+    export = pd.DataFrame(
+        {
+            "Well": well_codes + 1,
+            "Well Position": data["well_position"],
+            "Reading Number": data.groupby("well_position").cumcount() + 1,
+            "Target": "Target 1",
+            "Temperature": data["temperature"],
+            "Fluorescence": data["fluorescence"],
+            "Derivative": 0.0,
+        }
+    )
+    return (header + export.to_csv(index=False)).encode()
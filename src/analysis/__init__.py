@@ -0,0 +1 @@
+# Analysis engines shared by the pages
@@ -0,0 +1,221 @@
+from collections import OrderedDict
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from bada.processing import get_dsf_curve_features
+import numpy as np
+
+from analysis.features import extract_features_batch, with_delta_tm
+from analysis.parallel import DEFAULT_CHUNK_SIZE
+from analysis.plate import PlateData
+from profiling import timed
+
+CacheKey = Tuple[str, Optional[float], Optional[float], float]
+
+# the parts of the get_dsf_curve_features output that are cached: the scalar features and the
+# curves that are plotted; the raw data of the well ("full_well_data") is taken from the plate
+CACHED_FEATURES = (
+    "x_spline",
+    "y_spline",
+    "y_spline_derivative",
+    "min_fluorescence",
+    "max_fluorescence",
+    "fluorescence_range",
+    "temp_at_min",
+    "temp_at_max",
+    "tm",
+    "max_derivative_value",
+    "smoothing",
+    "min_temp",
+    "max_temp",
+)
+
+
+class FeatureCache:
+    """
+    Bounded LRU cache for the output of get_dsf_curve_features.
+
+    Entries are keyed on (well, min_temp, max_temp, smoothing). The average control Tm only affects
+    ΔTm, so the features are cached without it and ΔTm is derived when an entry is returned. The
+    cache is meant for the small working set of wells that are looked at (e.g. the controls and
+    the inspected wells), so only the scalar features and the plotted curves are kept.
+    """
+
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[CacheKey, Dict[str, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _make_key(
+        well_id: str, min_temp: Optional[float], max_temp: Optional[float], smoothing: float
+    ) -> CacheKey:
+        return (
+            well_id,
+            None if min_temp is None else float(min_temp),
+            None if max_temp is None else float(max_temp),
+            float(smoothing),
+        )
+
+    @staticmethod
+    def _with_well_data(
+        features: Dict[str, Any],
+        plate: PlateData,
+        well_id: str,
+        avg_control_tm: Optional[float],
+    ) -> Dict[str, Any]:
+        result = with_delta_tm(features, avg_control_tm)
+        result["full_well_data"] = plate.get_well_data(well_id)
+        return result
+
+    def _lookup(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        features = self._entries.get(key)
+        if features is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return features
+
+    def _store(self, key: CacheKey, features: Dict[str, Any]) -> None:
+        self._entries[key] = {name: features[name] for name in CACHED_FEATURES}
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def get(
+        self,
+        plate: PlateData,
+        well_id: str,
+        min_temp: Optional[float],
+        max_temp: Optional[float],
+        smoothing: float,
+        avg_control_tm: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Get the curve features of a single well, computing them on a cache miss.
+
+        Args:
+            plate: Indexed plate data
+            well_id: Well to analyze
+            min_temp: Minimum temperature of the analysis range
+            max_temp: Maximum temperature of the analysis range
+            smoothing: Smoothing factor for the spline fit
+            avg_control_tm: Average Tm of the control wells (used for ΔTm)
+
+        Returns:
+            Dictionary in the format returned by get_dsf_curve_features
+        """
+        key = self._make_key(well_id, min_temp, max_temp, smoothing)
+        features = self._lookup(key)
+        if features is None:
+            with timed("get_dsf_curve_features"):
+                features = get_dsf_curve_features(
+                    data=plate.get_well_data(well_id),
+                    min_temp=min_temp,
+                    max_temp=max_temp,
+                    smoothing=smoothing,
+                )
+            self._store(key, features)
+
+        return self._with_well_data(features, plate, well_id, avg_control_tm)
+
+    def get_cached(
+        self,
+        plate: PlateData,
+        well_id: str,
+        min_temp: Optional[float],
+        max_temp: Optional[float],
+        smoothing: float,
+        avg_control_tm: Optional[float] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Get the curve features of a well if they are cached (without computing or counting)."""
+        features = self._entries.get(self._make_key(well_id, min_temp, max_temp, smoothing))
+        if features is None:
+            return None
+        return self._with_well_data(features, plate, well_id, avg_control_tm)
+
+    def get_many(
+        self,
+        plate: PlateData,
+        wells: List[str],
+        min_temp: Optional[float],
+        max_temp: Optional[float],
+        smoothing: float,
+        avg_control_tm: Optional[float] = None,
+        max_workers: Optional[int] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the curve features of many wells; the misses are computed with extract_features_batch.
+
+        Args:
+            plate: Indexed plate data
+            wells: Wells to analyze
+            min_temp: Minimum temperature of the analysis range
+            max_temp: Maximum temperature of the analysis range
+            smoothing: Smoothing factor for the spline fit
+            avg_control_tm: Average Tm of the control wells (used for ΔTm)
+            max_workers: Number of worker processes for the misses
+            chunk_size: Number of wells sent to a worker at once
+
+        Returns:
+            Dictionary mapping well IDs to their features (without "full_well_data"), in the order
+            of `wells`
+        """
+        cached = {}
+        missing = []
+        for well in wells:
+            features = self._lookup(self._make_key(well, min_temp, max_temp, smoothing))
+            if features is None:
+                missing.append(well)
+            else:
+                cached[well] = features
+
+        if missing:
+            with timed("extract_features_batch"):
+                computed = extract_features_batch(
+                    plate,
+                    missing,
+                    min_temp=min_temp,
+                    max_temp=max_temp,
+                    smoothing=smoothing,
+                    max_workers=max_workers,
+                    chunk_size=chunk_size,
+                )
+            for well, features in computed.items():
+                self._store(self._make_key(well, min_temp, max_temp, smoothing), features)
+            cached.update(computed)
+
+        return {well: with_delta_tm(cached[well], avg_control_tm) for well in wells}
+
+    def clear(self) -> None:
+        """Remove all entries and reset the statistics."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory usage of the cached features."""
+        return int(
+            sum(
+                value.nbytes if isinstance(value, np.ndarray) else sys.getsizeof(value)
+                for features in self._entries.values()
+                for value in features.values()
+            )
+        )
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counts and current size of the cache."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
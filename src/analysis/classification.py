@@ -0,0 +1,149 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# per-well labels (int8)
+TYPICAL = 0
+UNDECIDED = 1
+ATYPICAL = 2
+LABEL_NAMES = {TYPICAL: "Typical", UNDECIDED: "Undecided", ATYPICAL: "Atypical"}
+
+
+class WellClassification:
+    """
+    Threshold classification of the wells by their distance from the reference well.
+
+    The distances are sorted once, so the class boundaries of new thresholds are two binary
+    searches and the labels are assigned with slices of the sort order. The classification is
+    stored as one int8 label per well (TYPICAL, UNDECIDED or ATYPICAL), which also holds manual
+    changes of single wells.
+
+    Wells with a NaN distance (e.g. a zero-range signal) are undecided for all thresholds; they are
+    sorted after all other distances. Infinite distances (DTW distances pruned beyond a threshold)
+    are atypical.
+    """
+
+    def __init__(self, wells: List[str], distances: np.ndarray):
+        """
+        Args:
+            wells: Well IDs (e.g. in plate order)
+            distances: Distance of each well (in the order of `wells`)
+        """
+        self.wells = list(wells)
+        self._index = {well: i for i, well in enumerate(self.wells)}
+        self.distances = np.asarray(distances, dtype=float)
+        self._order = np.argsort(self.distances, kind="stable")
+        self.sorted_distances = self.distances[self._order]
+        self._n_defined = int(np.count_nonzero(~np.isnan(self.distances)))
+        self.labels = np.full(len(self.wells), TYPICAL, dtype=np.int8)
+
+    @classmethod
+    def from_dtw_distances(
+        cls, dtw_distances: Dict[str, Tuple[float, str]]
+    ) -> "WellClassification":
+        """
+        Create the classification from the output of get_dtw_distances (or of
+        get_correlation_distances, which has the same format).
+
+        Args:
+            dtw_distances: Dictionary mapping well IDs to (distance, reference_well)
+
+        Returns:
+            WellClassification with all wells labeled typical (see classify)
+        """
+        distances = np.fromiter(
+            (distance for distance, _ in dtw_distances.values()),
+            dtype=float,
+            count=len(dtw_distances),
+        )
+        return cls(list(dtw_distances), distances)
+
+    def __len__(self) -> int:
+        return len(self.wells)
+
+    def __contains__(self, well_id: str) -> bool:
+        return well_id in self._index
+
+    @property
+    def nbytes(self) -> int:
+        """Memory usage of the distance and label arrays in bytes."""
+        return int(
+            self.distances.nbytes
+            + self.sorted_distances.nbytes
+            + self._order.nbytes
+            + self.labels.nbytes
+        )
+
+    def get_boundaries(self, lower_threshold: float, upper_threshold: float) -> Tuple[int, int]:
+        """
+        Get the class boundaries in the sorted distances.
+
+        Wells with a distance up to the lower threshold are typical, wells with a distance from the
+        upper threshold on are atypical (if the thresholds overlap, typical takes precedence).
+
+        Returns:
+            Tuple of (end of the typical wells, start of the atypical wells)
+        """
+        typical_end = int(np.searchsorted(self.sorted_distances, lower_threshold, side="right"))
+        atypical_start = int(np.searchsorted(self.sorted_distances, upper_threshold, side="left"))
+        return typical_end, max(typical_end, atypical_start)
+
+    def count(self, lower_threshold: float, upper_threshold: float) -> Dict[int, int]:
+        """Get the number of wells per label for the given thresholds (without relabeling)."""
+        typical_end, atypical_start = self.get_boundaries(lower_threshold, upper_threshold)
+        return {
+            TYPICAL: typical_end,
+            UNDECIDED: atypical_start - typical_end + len(self.wells) - self._n_defined,
+            ATYPICAL: self._n_defined - atypical_start,
+        }
+
+    def classify(self, lower_threshold: float, upper_threshold: float) -> None:
+        """
+        Label all wells by the thresholds; manual changes (see set_label) are overwritten.
+
+        Args:
+            lower_threshold: Wells with a distance up to this value are typical
+            upper_threshold: Wells with a distance from this value on are atypical
+        """
+        typical_end, atypical_start = self.get_boundaries(lower_threshold, upper_threshold)
+        self.labels[self._order[:typical_end]] = TYPICAL
+        self.labels[self._order[typical_end:atypical_start]] = UNDECIDED
+        self.labels[self._order[atypical_start:self._n_defined]] = ATYPICAL
+        self.labels[self._order[self._n_defined:]] = UNDECIDED
+
+    def get_label(self, well_id: str) -> int:
+        return int(self.labels[self._index[well_id]])
+
+    def set_label(self, well_id: str, label: int) -> None:
+        """Change the label of a single well (e.g. after a manual review)."""
+        self.labels[self._index[well_id]] = label
+
+    def get_wells(self, label: int) -> List[str]:
+        """Get the wells with a label, in the order of `wells`."""
+        return [self.wells[i] for i in np.flatnonzero(self.labels == label)]
+
+
+def get_agreement_table(
+    reference: WellClassification, other: WellClassification
+) -> pd.DataFrame:
+    """
+    Cross-tabulate the labels of two classifications of the same wells.
+
+    Args:
+        reference: Classification in the rows (e.g. by DTW)
+        other: Classification in the columns
+
+    Returns:
+        DataFrame with the number of wells for each combination of labels
+
+    Raises:
+        ValueError: If the classifications don't contain the same wells in the same order
+    """
+    if reference.wells != other.wells:
+        raise ValueError("The classifications must contain the same wells in the same order")
+
+    counts = np.zeros((len(LABEL_NAMES), len(LABEL_NAMES)), dtype=int)
+    np.add.at(counts, (reference.labels, other.labels), 1)
+    names = [LABEL_NAMES[label] for label in sorted(LABEL_NAMES)]
+    return pd.DataFrame(counts, index=names, columns=names)
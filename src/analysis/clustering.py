@@ -0,0 +1,281 @@
+"""
+Pairwise DTW distances of all wells and their hierarchical clustering.
+
+The distances between all pairs of wells are computed block by block (pairs of row ranges of the
+upper triangle), so only one block of float64 values is in memory besides the result, which is
+stored as a condensed float32 vector (as used by scipy.spatial.distance). With the dtaidistance C
+library every block is parallelized over the CPUs with OpenMP; otherwise the blocks are
+distributed over worker processes and written into the result as they are finished.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from dtaidistance import dtw
+import numpy as np
+from scipy.cluster import hierarchy
+from scipy.spatial.distance import squareform
+
+from analysis.dense import DenseCurves
+from analysis.dtw import HAS_C_LIBRARY, normalize_signal
+from analysis.parallel import imap_chunks, resolve_max_workers, split_into_chunks
+from analysis.plate import PlateData
+from profiling import timed
+
+# number of wells per block of the distance matrix
+DEFAULT_BLOCK_SIZE = 128
+
+# linkage methods for arbitrary distances (ward and centroid assume Euclidean distances)
+LINKAGE_METHODS = {
+    "average": "Average",
+    "complete": "Complete",
+    "single": "Single",
+    "weighted": "Weighted",
+}
+
+DEFAULT_N_CLUSTERS = 6
+
+# the optimal leaf ordering grows with the cube of the number of wells (seconds for 1536 wells)
+MAX_WELLS_OPTIMAL_ORDERING = 512
+
+# (row start, row end, column start, column end) of a block of the distance matrix
+Block = Tuple[int, int, int, int]
+
+
+def get_blocks(n_wells: int, block_size: int = DEFAULT_BLOCK_SIZE) -> List[Block]:
+    """Split the upper triangle of the distance matrix into blocks of at most `block_size` rows."""
+    block_size = max(1, block_size)
+    starts = range(0, n_wells, block_size)
+    return [
+        (
+            row_start,
+            min(row_start + block_size, n_wells),
+            col_start,
+            min(col_start + block_size, n_wells),
+        )
+        for row_start in starts
+        for col_start in starts
+        if col_start >= row_start
+    ]
+
+
+def condensed_index(n_wells: int, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+    """Position of the pairs (rows[k], cols[k]) with rows < cols in the condensed matrix."""
+    rows = rows.astype(np.int64)
+    return n_wells * rows - rows * (rows + 1) // 2 + (cols - rows - 1)
+
+
+def _block_pairs(block: Block) -> Tuple[np.ndarray, np.ndarray]:
+    """Row and column of the values of a block, in the order returned by dtaidistance."""
+    row_start, row_end, col_start, col_end = block
+    if row_start == col_start:
+        rows, cols = np.triu_indices(row_end - row_start, k=1)
+        return rows + row_start, cols + row_start
+    rows = np.repeat(np.arange(row_start, row_end), col_end - col_start)
+    cols = np.tile(np.arange(col_start, col_end), row_end - row_start)
+    return rows, cols
+
+
+def _block_distances(
+    signals: Sequence[np.ndarray],
+    block: Block,
+    window: Optional[int],
+    parallel: bool,
+) -> np.ndarray:
+    """DTW distances of the pairs of a block (see _block_pairs for their order)."""
+    row_start, row_end, col_start, col_end = block
+    if row_start == col_start:
+        series = list(signals[row_start:row_end])
+        block_arg = None
+    else:
+        series = list(signals[row_start:row_end]) + list(signals[col_start:col_end])
+        block_arg = ((0, row_end - row_start), (row_end - row_start, len(series)))
+
+    if HAS_C_LIBRARY:
+        return dtw.distance_matrix_fast(
+            series, block=block_arg, compact=True, parallel=parallel, window=window
+        )
+    return dtw.distance_matrix(
+        series, block=block_arg, compact=True, parallel=False, use_c=False, window=window
+    )
+
+
+def _distance_blocks(
+    blocks: List[Block], signals: Sequence[np.ndarray], window: Optional[int]
+) -> List[Tuple[Block, np.ndarray]]:
+    """Distances of a chunk of blocks with the pure-Python implementation."""
+    return [(block, _block_distances(signals, block, window, parallel=False)) for block in blocks]
+
+
+class PairwiseDistances:
+    """DTW distances between all pairs of wells as a condensed float32 vector."""
+
+    def __init__(self, wells: List[str], condensed: np.ndarray):
+        """
+        Args:
+            wells: Well IDs in the order of the matrix
+            condensed: Upper triangle of the distance matrix, row by row (n * (n - 1) / 2 values)
+        """
+        n_pairs = len(wells) * (len(wells) - 1) // 2
+        if len(condensed) != n_pairs:
+            raise ValueError(f"Expected {n_pairs} distances for {len(wells)} wells")
+        self.wells = list(wells)
+        self._index = {well: i for i, well in enumerate(self.wells)}
+        self.condensed = np.asarray(condensed, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.wells)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory usage of the distances in bytes."""
+        return int(self.condensed.nbytes)
+
+    def get_distance(self, well_a: str, well_b: str) -> float:
+        i, j = sorted((self._index[well_a], self._index[well_b]))
+        if i == j:
+            return 0.0
+        return float(self.condensed[condensed_index(len(self.wells), np.array([i]), j)[0]])
+
+    def to_square(self, order: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Get the full (wells x wells) matrix, e.g. for plotting.
+
+        Args:
+            order: Indices of the wells in the order of the rows and columns; None for `wells`
+        """
+        square = squareform(self.condensed, checks=False)
+        if order is None:
+            return square
+        return square[np.ix_(order, order)]
+
+
+@timed("get_pairwise_dtw_distances")
+def get_pairwise_dtw_distances(
+    curves: Union[DenseCurves, PlateData],
+    min_temp: float,
+    max_temp: float,
+    window: Optional[int] = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    max_workers: Optional[int] = None,
+) -> PairwiseDistances:
+    """
+    Calculate the DTW distances between the normalized signals of all pairs of wells.
+
+    Args:
+        curves: Indexed plate data or the dense matrix of all curves
+        min_temp: Minimum temperature of the analysis range
+        max_temp: Maximum temperature of the analysis range
+        window: Sakoe-Chiba band width (maximum index shift + 1); None for unconstrained DTW
+        block_size: Number of wells per block; a block holds up to block_size² float64 values
+        max_workers: Number of CPUs to use
+
+    Returns:
+        PairwiseDistances of the wells (in the order of `curves.wells`)
+    """
+    windowed_signals = curves.get_windowed_signals(min_temp, max_temp)
+    wells = list(curves.wells)
+    # zero-range signals (NaN after the normalization) are treated as flat lines, so these wells
+    # cluster together instead of making the linkage fail
+    signals = [np.nan_to_num(normalize_signal(windowed_signals[well])) for well in wells]
+
+    n_wells = len(wells)
+    condensed = np.zeros(n_wells * (n_wells - 1) // 2, dtype=np.float32)
+    blocks = get_blocks(n_wells, block_size)
+    parallel = resolve_max_workers(max_workers) > 1
+
+    if HAS_C_LIBRARY:
+        block_results = (
+            (block, _block_distances(signals, block, window, parallel)) for block in blocks
+        )
+    else:
+        # the blocks are written into the result as they arrive instead of being collected first
+        block_results = (
+            block_result
+            for chunk_results in imap_chunks(
+                _distance_blocks,
+                split_into_chunks(blocks, 1),
+                args=(signals, window),
+                max_workers=max_workers,
+            )
+            for block_result in chunk_results
+        )
+
+    for block, distances in block_results:
+        rows, cols = _block_pairs(block)
+        condensed[condensed_index(n_wells, rows, cols)] = distances
+
+    return PairwiseDistances(wells, condensed)
+
+
+@timed("cluster_wells")
+def cluster_wells(
+    pairwise: PairwiseDistances,
+    n_clusters: int = DEFAULT_N_CLUSTERS,
+    method: str = "average",
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hierarchical clustering of the wells by their pairwise distances.
+
+    The leaves are ordered so that neighbouring wells are as similar as possible (optimal leaf
+    ordering, up to MAX_WELLS_OPTIMAL_ORDERING wells), which shows the clusters as blocks along
+    the diagonal of the reordered matrix.
+
+    Args:
+        pairwise: Distances between all pairs of wells
+        n_clusters: Number of clusters the tree is cut into
+        method: Linkage method (see LINKAGE_METHODS)
+
+    Returns:
+        Tuple of (cluster of each well in the order of `pairwise.wells`, numbered from 1 in the
+        order of the leaves; leaf order as indices into `pairwise.wells`)
+    """
+    if method not in LINKAGE_METHODS:
+        raise ValueError(f"Unknown linkage method: {method}")
+    if len(pairwise) < 2:
+        return np.ones(len(pairwise), dtype=int), np.arange(len(pairwise))
+
+    linkage = hierarchy.linkage(
+        pairwise.condensed.astype(float),
+        method=method,
+        optimal_ordering=len(pairwise) <= MAX_WELLS_OPTIMAL_ORDERING,
+    )
+    order = hierarchy.leaves_list(linkage)
+    clusters = hierarchy.fcluster(linkage, t=n_clusters, criterion="maxclust")
+
+    # renumber the clusters by their first leaf, so they appear in order along the diagonal
+    _, first_leaf = np.unique(clusters[order], return_index=True)
+    renumbered = np.empty(clusters.max() + 1, dtype=int)
+    renumbered[clusters[order][np.sort(first_leaf)]] = np.arange(1, len(first_leaf) + 1)
+    return renumbered[clusters], order
+
+
+def get_cluster_summary(
+    pairwise: PairwiseDistances,
+    clusters: np.ndarray,
+    control_wells: Sequence[str] = (),
+) -> List[Dict[str, object]]:
+    """
+    Size, control wells and mean within-cluster distance of each cluster.
+
+    Args:
+        pairwise: Distances between all pairs of wells
+        clusters: Cluster of each well (see cluster_wells)
+        control_wells: Control wells to report per cluster
+
+    Returns:
+        One row per cluster, in the order of the cluster numbers
+    """
+    controls = set(control_wells)
+    square = pairwise.to_square()
+    summary = []
+    for cluster in np.unique(clusters):
+        members = np.flatnonzero(clusters == cluster)
+        wells = [pairwise.wells[i] for i in members]
+        within = square[np.ix_(members, members)][np.triu_indices(len(members), k=1)]
+        summary.append({
+            "Cluster": int(cluster),
+            "Wells": len(wells),
+            "Controls": ", ".join(well for well in wells if well in controls),
+            "Mean DTW distance": float(within.mean()) if len(within) else 0.0,
+            "Members": ", ".join(wells),
+        })
+    return summary
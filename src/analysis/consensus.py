@@ -0,0 +1,62 @@
+from typing import List, Optional
+
+from dtaidistance import dtw_barycenter
+import numpy as np
+
+from analysis.dense import DenseCurves
+from analysis.dtw import HAS_C_LIBRARY, normalize_signal
+from profiling import timed
+
+# name of the consensus curve where a reference well is expected (e.g. in the DTW distances)
+CONSENSUS_REFERENCE = "consensus"
+
+DBA_MAX_ITERATIONS = 10
+
+
+@timed("get_consensus_curve")
+def get_consensus_curve(
+    curves: DenseCurves,
+    control_wells: List[str],
+    min_temp: float,
+    max_temp: float,
+    window: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Average the normalized signals of the control wells with DTW Barycenter Averaging.
+
+    The average starts from the medoid of the controls (the control with the smallest DTW
+    distance to all others), so a single noisy control has less influence than on a point-wise
+    mean. The result is normalized like the well signals before the DTW distances are calculated.
+
+    Args:
+        curves: Dense matrix of all curves
+        control_wells: Wells to average
+        min_temp: Minimum temperature of the analysis range
+        max_temp: Maximum temperature of the analysis range
+        window: Sakoe-Chiba band width used for the alignment; None for unconstrained DTW
+
+    Returns:
+        Consensus signal (one value per temperature of the range); all NaN if every control has a
+        zero-range signal
+    """
+    if not control_wells:
+        raise ValueError("At least one control well is needed for the consensus")
+
+    _, values = curves.get_window(min_temp, max_temp)
+    signals = [normalize_signal(values[curves.row_index(well)]) for well in control_wells]
+    # controls with a zero-range signal (all NaN) have no shape to average
+    signals = [signal for signal in signals if not np.isnan(signal).any()]
+    if not signals:
+        return np.full(values.shape[1], np.nan)
+    if len(signals) == 1:
+        return signals[0]
+
+    consensus = dtw_barycenter.dba_loop(
+        signals,
+        c=None,
+        max_it=DBA_MAX_ITERATIONS,
+        nb_initial_samples=len(signals),
+        use_c=HAS_C_LIBRARY,
+        window=window,
+    )
+    return normalize_signal(consensus)
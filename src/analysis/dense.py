@@ -0,0 +1,108 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from analysis.layout import parse_well_ids
+from analysis.plate import PlateData
+
+
+class DenseCurves:
+    """
+    Fluorescence of all wells as a dense (wells x temperatures) float32 matrix.
+
+    All wells are resampled onto a shared temperature axis, so restricting the analysis to a
+    temperature range is a column slice instead of a DataFrame filter. If all wells were measured
+    at the same temperatures (the usual case), these are used as the axis and no interpolation
+    takes place.
+    """
+
+    def __init__(
+        self,
+        temperatures: np.ndarray,
+        values: np.ndarray,
+        wells: List[str],
+        positions: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    ):
+        """
+        Args:
+            temperatures: Shared, increasing temperature axis
+            values: Fluorescence matrix with one row per well
+            wells: Well IDs of the rows
+            positions: (rows, columns) of the wells on the plate; parsed from the IDs if None
+        """
+        self.temperatures = temperatures
+        self.values = values
+        self.wells = list(wells)
+        self._index = {well: i for i, well in enumerate(self.wells)}
+        self.rows, self.cols = positions if positions is not None else parse_well_ids(self.wells)
+
+    @classmethod
+    def from_plate(cls, plate: PlateData, wells: List[str]) -> "DenseCurves":
+        """
+        Build the matrix from the long-format plate data.
+
+        Args:
+            plate: Indexed plate data
+            wells: Wells in the order of the matrix rows (e.g. available_wells)
+
+        Returns:
+            DenseCurves with one row per well
+        """
+        well_arrays = [plate.get_arrays(well) for well in wells]
+
+        first_temperatures = well_arrays[0][0]
+        shared_axis = all(
+            np.array_equal(temperature, first_temperatures) for temperature, _ in well_arrays
+        ) and np.all(np.diff(first_temperatures) > 0)
+
+        if shared_axis:
+            temperatures = np.asarray(first_temperatures, dtype=float)
+            values = np.vstack([fluorescence for _, fluorescence in well_arrays])
+        else:
+            # common range of all wells, sampled with the median number of points per well
+            start = max(float(temperature.min()) for temperature, _ in well_arrays)
+            stop = min(float(temperature.max()) for temperature, _ in well_arrays)
+            n_points = int(np.median([len(temperature) for temperature, _ in well_arrays]))
+            temperatures = np.linspace(start, stop, n_points)
+            values = np.empty((len(wells), n_points))
+            for row, (temperature, fluorescence) in enumerate(well_arrays):
+                order = np.argsort(temperature, kind="stable")
+                values[row] = np.interp(temperatures, temperature[order], fluorescence[order])
+
+        return cls(temperatures, values.astype(np.float32), wells, plate.get_positions(wells))
+
+    def __len__(self) -> int:
+        return len(self.wells)
+
+    def __contains__(self, well_id: str) -> bool:
+        return well_id in self._index
+
+    @property
+    def nbytes(self) -> int:
+        """Memory usage of the matrix and the temperature axis in bytes."""
+        return int(self.values.nbytes + self.temperatures.nbytes)
+
+    def row_index(self, well_id: str) -> int:
+        """Get the matrix row of a well."""
+        return self._index[well_id]
+
+    def window(self, min_temp: float, max_temp: float) -> slice:
+        """Get the column slice of the temperatures within [min_temp, max_temp]."""
+        start = int(np.searchsorted(self.temperatures, min_temp, side="left"))
+        stop = int(np.searchsorted(self.temperatures, max_temp, side="right"))
+        return slice(start, stop)
+
+    def get_window(self, min_temp: float, max_temp: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the temperatures and the fluorescence matrix within a temperature range.
+
+        Returns:
+            Tuple of (temperatures, values) views; must not be modified
+        """
+        columns = self.window(min_temp, max_temp)
+        return self.temperatures[columns], self.values[:, columns]
+
+    def get_windowed_signals(self, min_temp: float, max_temp: float) -> Dict[str, np.ndarray]:
+        """Get the fluorescence of each well within a temperature range (as row views)."""
+        _, values = self.get_window(min_temp, max_temp)
+        return {well: values[i] for i, well in enumerate(self.wells)}
@@ -0,0 +1,225 @@
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from dtaidistance import dtw
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from analysis.dense import DenseCurves
+from analysis.parallel import map_chunks, resolve_max_workers, split_into_chunks
+from analysis.plate import PlateData
+from profiling import timed
+
+# chunk size for the (slow) pure-Python fallback when the dtaidistance C library is unavailable
+PYTHON_FALLBACK_CHUNK_SIZE = 32
+
+HAS_C_LIBRARY = dtw.try_import_c(verbose=False)
+
+
+def normalize_signal(signal: np.ndarray) -> np.ndarray:
+    """
+    Min-max normalize a signal to the range [0, 1] (same as bada's DTW preprocessing).
+
+    A signal with zero range (e.g. a dead or saturated well) is all NaN, like in bada, so its
+    distances are NaN.
+
+    Raises:
+        ValueError: If the signal is empty
+    """
+    signal = np.asarray(signal, dtype=float)
+    if not signal.size:
+        raise ValueError("Cannot normalize empty signal")
+    min_val = signal.min()
+    max_val = signal.max()
+    if np.isclose(min_val, max_val):
+        return np.full(signal.shape, np.nan)
+    return (signal - min_val) / (max_val - min_val)
+
+
+def lb_kim(reference: np.ndarray, signals: Sequence[np.ndarray]) -> np.ndarray:
+    """
+    LB_Kim lower bound of the DTW distance between the reference and each signal.
+
+    Every warping path contains the first and the last pair of points, so their squared
+    differences bound the (squared) DTW distance from below.
+    """
+    first = np.array([signal[0] for signal in signals]) - reference[0]
+    last = np.array([signal[-1] for signal in signals]) - reference[-1]
+    lengths = np.array([len(signal) for signal in signals])
+    single_cell = (lengths == 1) & (len(reference) == 1)
+    return np.sqrt(first ** 2 + np.where(single_cell, 0.0, last ** 2))
+
+
+def lb_keogh(reference: np.ndarray, signals: np.ndarray, window: int) -> np.ndarray:
+    """
+    LB_Keogh lower bound of the windowed DTW distance between the reference and each signal.
+
+    Args:
+        reference: Reference signal of length n
+        signals: 2D array of signals (one per row) of the same length n
+        window: Sakoe-Chiba window as used by dtaidistance (|i - j| < window)
+
+    Returns:
+        Lower bound for each signal
+    """
+    radius = window - 1
+    padded = np.pad(reference, radius, mode="edge")
+    windows = sliding_window_view(padded, 2 * radius + 1)
+    upper = windows.max(axis=1)
+    lower = windows.min(axis=1)
+
+    above = np.clip(signals - upper, 0.0, None)
+    below = np.clip(lower - signals, 0.0, None)
+    return np.sqrt((above ** 2 + below ** 2).sum(axis=1))
+
+
+def _distance_chunk(
+    chunk: List[Tuple[str, np.ndarray]],
+    reference: np.ndarray,
+    window: Optional[int],
+    max_dist: Optional[float],
+) -> List[Tuple[str, float]]:
+    """Exact DTW distances of a chunk of wells with the pure-Python implementation."""
+    return [
+        (well, dtw.distance(reference, signal, window=window, max_dist=max_dist))
+        for well, signal in chunk
+    ]
+
+
+def _exact_distances(
+    reference: np.ndarray,
+    candidates: List[Tuple[str, np.ndarray]],
+    window: Optional[int],
+    max_dist: Optional[float],
+    max_workers: Optional[int],
+) -> Dict[str, float]:
+    """
+    Exact DTW distances between the reference and the candidate wells.
+
+    With the dtaidistance C library, the reference row of the distance matrix is computed in a
+    single call that is parallelized over the wells with OpenMP; otherwise the wells are split
+    over worker processes. The calculation of a well is abandoned (infinite distance) once it
+    exceeds `max_dist`; dtaidistance's use_pruning is not used, as it replaces the bound with the
+    Euclidean distance of each pair.
+    """
+    if not candidates:
+        return {}
+
+    if HAS_C_LIBRARY:
+        series = [reference] + [signal for _, signal in candidates]
+        matrix_row = dtw.distance_matrix_fast(
+            series,
+            block=((0, 1), (1, len(series))),
+            compact=True,
+            parallel=resolve_max_workers(max_workers) > 1,
+            window=window,
+            max_dist=max_dist,
+        )
+        distances = {well: float(distance) for (well, _), distance in zip(candidates, matrix_row)}
+    else:
+        distances = dict(
+            map_chunks(
+                _distance_chunk,
+                split_into_chunks(candidates, PYTHON_FALLBACK_CHUNK_SIZE),
+                args=(reference, window, max_dist),
+                max_workers=max_workers,
+            )
+        )
+    return distances
+
+
+@timed("get_dtw_distances")
+def get_dtw_distances(
+    curves: Union[PlateData, DenseCurves],
+    reference_well: str,
+    min_temp: float,
+    max_temp: float,
+    window: Optional[int] = None,
+    prune_above: Optional[float] = None,
+    max_workers: Optional[int] = None,
+    reference_signal: Optional[np.ndarray] = None,
+) -> Tuple[Dict[str, Tuple[float, str]], List[str]]:
+    """
+    Calculate the DTW distances of the normalized signals of all wells from a reference well.
+
+    Without a window and pruning threshold, the distances agree with bada's
+    get_dtw_distances_from_reference on the temperature-filtered data up to rounding (the C
+    library sums in a different order than bada's pure-Python call; for DenseCurves, only as long
+    as no resampling was needed). If `prune_above` is set, the exact distance is skipped for wells
+    whose lower bound (LB_Kim, plus LB_Keogh if a window is used and the signals have equal length)
+    already reaches the threshold, and the DTW computation of the remaining wells is abandoned once
+    it exceeds the threshold. These pruned wells get an infinite distance and are returned as a
+    separate list, so they can be left out of plots and statistics. Wells with a zero-range signal
+    get a NaN distance (as in bada); if the reference has one, all distances are NaN.
+
+    Args:
+        curves: Indexed plate data or the dense matrix of all curves
+        reference_well: Well to compare all wells with (or the name of `reference_signal`)
+        min_temp: Minimum temperature of the analysis range
+        max_temp: Maximum temperature of the analysis range
+        window: Sakoe-Chiba band width (maximum index shift + 1); None for unconstrained DTW
+        prune_above: Distance from which on the exact value is not needed (e.g. the upper
+            classification threshold); None to compute all distances exactly
+        max_workers: Number of CPUs to use
+        reference_signal: Signal to compare all wells with instead of the signal of
+            `reference_well` (e.g. the consensus of the control wells); it is normalized like the
+            well signals
+
+    Returns:
+        Tuple of (dictionary mapping well IDs to (distance, reference_well), pruned wells in the
+        order of the data)
+    """
+    signals = {
+        well: normalize_signal(signal)
+        for well, signal in curves.get_windowed_signals(min_temp, max_temp).items()
+    }
+
+    if reference_signal is None:
+        reference = signals[reference_well]
+        wells = [well for well in curves.wells if well != reference_well]
+    else:
+        reference = normalize_signal(reference_signal)
+        wells = list(curves.wells)
+
+    # wells with a zero-range signal (or all wells, if the reference has one) get a NaN distance
+    reference_defined = not np.isnan(reference).any()
+    if not reference_defined:
+        undefined = set(wells)
+    else:
+        undefined = {well for well in wells if np.isnan(signals[well]).any()}
+    wells = [well for well in wells if well not in undefined]
+
+    lower_bounds = np.zeros(len(wells))
+    if prune_above is not None and wells:
+        lower_bounds = lb_kim(reference, [signals[well] for well in wells])
+        lengths = {len(signals[well]) for well in wells}
+        if window is not None and lengths == {len(reference)}:
+            keogh = lb_keogh(reference, np.vstack([signals[well] for well in wells]), window)
+            lower_bounds = np.maximum(lower_bounds, keogh)
+
+    pruned = set()
+    candidates = []
+    for well, lower_bound in zip(wells, lower_bounds):
+        if prune_above is not None and lower_bound >= prune_above:
+            pruned.add(well)
+        else:
+            candidates.append((well, signals[well]))
+
+    exact = _exact_distances(reference, candidates, window, prune_above, max_workers)
+
+    distances: Dict[str, Tuple[float, str]] = {}
+    for well in wells:
+        distance = exact.get(well, np.inf)
+        if np.isinf(distance):
+            # pruned by the lower bound or abandoned during the DTW computation
+            pruned.add(well)
+        distances[well] = (distance, reference_well)
+    for well in undefined:
+        distances[well] = (np.nan, reference_well)
+    if reference_signal is None:
+        distances[reference_well] = (0.0 if reference_defined else np.nan, reference_well)
+
+    # keep the order of the wells in the data
+    distances = {well: distances[well] for well in curves.wells}
+    pruned_wells = [well for well in curves.wells if well in pruned]
+
+    return distances, pruned_wells
@@ -0,0 +1,221 @@
+"""
+Serialization of the results for download.
+
+Besides CSV, the results table is written in the columnar Parquet and Arrow IPC formats, which keep
+the column types and are read without parsing by pandas, polars, DuckDB or Spark. The raw and
+fitted curves of all wells are written as a compressed NPZ archive (see write_curve_archive).
+"""
+from dataclasses import dataclass
+from io import BytesIO
+from itertools import groupby
+from typing import BinaryIO, Callable, Dict, List, Optional
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from analysis.cache import FeatureCache
+from analysis.plate import PlateData
+from analysis.results import WellResults
+from profiling import timed
+
+
+@dataclass(frozen=True)
+class ExportFormat:
+    """Label, file extension and MIME type of a download format."""
+
+    label: str
+    extension: str
+    mime: str
+
+
+EXPORT_FORMATS: Dict[str, ExportFormat] = {
+    "csv": ExportFormat("CSV", "csv", "text/csv"),
+    "parquet": ExportFormat("Parquet", "parquet", "application/vnd.apache.parquet"),
+    "arrow": ExportFormat("Arrow IPC", "arrow", "application/vnd.apache.arrow.file"),
+}
+
+CURVE_EXPORT_FORMAT = ExportFormat("NPZ curves", "npz", "application/zip")
+
+# number of wells whose curves are fitted and written at once
+CURVE_CHUNK_SIZE = 96
+
+# per-well arrays of the curve archive (one row per well)
+CURVE_ARRAYS = [
+    "temperature",
+    "fluorescence",
+    "spline_temperature",
+    "spline_fluorescence",
+    "spline_derivative",
+]
+
+
+@timed("export_table")
+def export_table(table: pd.DataFrame, export_format: str) -> bytes:
+    """
+    Serialize a table without its index.
+
+    Args:
+        table: Table to export (e.g. from build_results_table)
+        export_format: Key of EXPORT_FORMATS
+
+    Returns:
+        Content of the file
+    """
+    if export_format == "csv":
+        return table.to_csv(index=False).encode("utf-8")
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {export_format}")
+
+    arrow_table = pa.Table.from_pandas(table, preserve_index=False)
+    buffer = BytesIO()
+    if export_format == "parquet":
+        pq.write_table(arrow_table, buffer)
+    else:
+        with pa.ipc.new_file(buffer, arrow_table.schema) as writer:
+            writer.write_table(arrow_table)
+    return buffer.getvalue()
+
+
+def write_array(archive: zipfile.ZipFile, name: str, array: np.ndarray) -> None:
+    """Write an array into the archive as `name`.npy (like numpy.savez_compressed)."""
+    with archive.open(f"{name}.npy", "w", force_zip64=True) as file:
+        np.lib.format.write_array(file, np.asanyarray(array), allow_pickle=False)
+
+
+def read_array(archive: zipfile.ZipFile, name: str) -> np.ndarray:
+    """Read the array `name`.npy written by write_array."""
+    with archive.open(f"{name}.npy") as file:
+        return np.lib.format.read_array(file, allow_pickle=False)
+
+
+def _stack_padded(arrays: List[np.ndarray], dtype: type) -> np.ndarray:
+    """Stack arrays of different lengths as rows, padded with NaN."""
+    stacked = np.full((len(arrays), max(len(array) for array in arrays)), np.nan, dtype=dtype)
+    for i, array in enumerate(arrays):
+        stacked[i, : len(array)] = array
+    return stacked
+
+
+@timed("write_curve_archive")
+def write_curve_archive(
+    output: BinaryIO,
+    plate: PlateData,
+    results: WellResults,
+    feature_cache: FeatureCache,
+    chunk_size: int = CURVE_CHUNK_SIZE,
+    dtype: type = np.float32,
+    max_workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> None:
+    """
+    Write the raw and fitted curves of all analyzed wells as a compressed NPZ archive.
+
+    The wells are processed in chunks: the splines of a chunk are fitted (or taken from the feature
+    cache) with the settings saved for each well, written as one array per quantity and released
+    before the next chunk, so only one chunk of curves is held in memory besides the compressed
+    output. The archive contains:
+
+    - `wells`, `smoothing`, `min_temp`, `max_temp` and `atypical`: one value per well
+    - `<array>_<chunk>` for every array of CURVE_ARRAYS and every chunk (e.g.
+      `spline_fluorescence_0000`), with one row per well of the chunk; raw curves of different
+      lengths are padded with NaN
+
+    Use load_curve_archive to read the archive with the chunks concatenated.
+
+    Args:
+        output: Writable binary file
+        plate: Indexed plate data (the raw curves)
+        results: Analysis results with the settings of every well
+        feature_cache: Cache of the spline fits; misses are computed and stored
+        chunk_size: Number of wells per chunk
+        dtype: Float type of the curves
+        max_workers: Number of worker processes for the spline fits
+        progress: Called with (processed wells, total wells) after every chunk
+    """
+    wells = results.wells
+    min_temps = results.column("min_temp")
+    max_temps = results.column("max_temp")
+    smoothings = results.column("smoothing")
+
+    def settings(i: int):
+        return (float(min_temps[i]), float(max_temps[i]), float(smoothings[i]))
+
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        write_array(archive, "wells", np.array(wells, dtype=str))
+        write_array(archive, "smoothing", smoothings)
+        write_array(archive, "min_temp", min_temps)
+        write_array(archive, "max_temp", max_temps)
+        write_array(archive, "atypical", results.column("is_empty"))
+
+        for chunk, start in enumerate(range(0, len(wells), chunk_size)):
+            indices = range(start, min(start + chunk_size, len(wells)))
+
+            # wells with the same settings are fitted together
+            features = {}
+            for (min_temp, max_temp, smoothing), group in groupby(
+                sorted(indices, key=settings), key=settings
+            ):
+                features.update(
+                    feature_cache.get_many(
+                        plate,
+                        [wells[i] for i in group],
+                        min_temp=min_temp,
+                        max_temp=max_temp,
+                        smoothing=smoothing,
+                        max_workers=max_workers,
+                    )
+                )
+
+            chunk_wells = [wells[i] for i in indices]
+            raw = [plate.get_arrays(well) for well in chunk_wells]
+            curves = {
+                "temperature": _stack_padded([temperature for temperature, _ in raw], dtype),
+                "fluorescence": _stack_padded([fluorescence for _, fluorescence in raw], dtype),
+                "spline_temperature": _stack_padded(
+                    [features[well]["x_spline"] for well in chunk_wells], dtype
+                ),
+                "spline_fluorescence": _stack_padded(
+                    [features[well]["y_spline"] for well in chunk_wells], dtype
+                ),
+                "spline_derivative": _stack_padded(
+                    [features[well]["y_spline_derivative"] for well in chunk_wells], dtype
+                ),
+            }
+            for name in CURVE_ARRAYS:
+                write_array(archive, f"{name}_{chunk:04d}", curves[name])
+
+            if progress is not None:
+                progress(indices.stop, len(wells))
+
+
+def load_curve_archive(file) -> Dict[str, np.ndarray]:
+    """
+    Read an archive of write_curve_archive.
+
+    Args:
+        file: Path or binary file of the archive
+
+    Returns:
+        Dictionary with the per-well arrays and the curves of all chunks concatenated (raw curves
+        of different lengths are padded with NaN)
+    """
+    with np.load(file) as archive:
+        arrays = {
+            name: archive[name]
+            for name in ("wells", "smoothing", "min_temp", "max_temp", "atypical")
+        }
+        n_chunks = sum(1 for name in archive.files if name.startswith("spline_derivative_"))
+        for name in CURVE_ARRAYS:
+            chunks = [archive[f"{name}_{chunk:04d}"] for chunk in range(n_chunks)]
+            if not chunks:
+                arrays[name] = np.empty((0, 0))
+                continue
+            width = max(chunk.shape[1] for chunk in chunks)
+            arrays[name] = np.vstack([
+                np.pad(chunk, ((0, 0), (0, width - chunk.shape[1])), constant_values=np.nan)
+                for chunk in chunks
+            ])
+    return arrays
@@ -0,0 +1,160 @@
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from bada.processing import get_dsf_curve_features
+import numpy as np
+import pandas as pd
+
+from analysis.parallel import DEFAULT_CHUNK_SIZE, imap_chunks, map_chunks, split_into_chunks
+from analysis.plate import PlateData
+
+
+def to_well_result(
+    analysis_results: Dict[str, Any],
+    is_empty: bool,
+    smoothing: float,
+    min_temp: Optional[float],
+    max_temp: Optional[float],
+    reviewed: bool = False,
+) -> Dict[str, Any]:
+    """
+    Convert the output of get_dsf_curve_features into an entry of well_analysis_results.
+
+    Args:
+        analysis_results: Dictionary returned by get_dsf_curve_features
+        is_empty: Whether the well is classified as atypical
+        smoothing: Smoothing factor the features were calculated with
+        min_temp: Minimum temperature of the analysis range the features were calculated with
+        max_temp: Maximum temperature of the analysis range the features were calculated with
+        reviewed: Whether the classification of the well was set manually
+
+    Returns:
+        Dictionary with the features and analysis settings of the well
+    """
+    return {
+        "is_empty": is_empty,
+        "reviewed": reviewed,
+        "tm": analysis_results["tm"],
+        "delta_tm": analysis_results["delta_tm"],
+        "min_fluorescence": analysis_results["min_fluorescence"],
+        "max_fluorescence": analysis_results["max_fluorescence"],
+        "fluorescence_range": (
+            analysis_results["max_fluorescence"] - analysis_results["min_fluorescence"]
+        ),
+        "max_slope": analysis_results["max_derivative_value"],
+        "smoothing": smoothing,
+        "min_temp": min_temp if min_temp is not None else np.nan,
+        "max_temp": max_temp if max_temp is not None else np.nan,
+        "temp_at_min": analysis_results["temp_at_min"],
+        "temp_at_max": analysis_results["temp_at_max"],
+        "max_derivative_value": analysis_results["max_derivative_value"],
+    }
+
+
+def with_delta_tm(features: Dict[str, Any], avg_control_tm: Optional[float]) -> Dict[str, Any]:
+    """Copy the features of a well and set their ΔTm relative to the average control Tm."""
+    result = dict(features)
+    result["delta_tm"] = features["tm"] - avg_control_tm if avg_control_tm is not None else np.nan
+    return result
+
+
+def _extract_chunk(
+    chunk: List[Tuple[str, pd.DataFrame]],
+    min_temp: Optional[float],
+    max_temp: Optional[float],
+    smoothing: float,
+    avg_control_tm: Optional[float],
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """Run get_dsf_curve_features for a chunk of wells (executed in a worker process)."""
+    return [
+        (
+            well,
+            get_dsf_curve_features(
+                data=well_data,
+                min_temp=min_temp,
+                max_temp=max_temp,
+                smoothing=smoothing,
+                avg_control_tm=avg_control_tm,
+            ),
+        )
+        for well, well_data in chunk
+    ]
+
+
+def extract_features_batch(
+    plate: PlateData,
+    wells: List[str],
+    min_temp: Optional[float],
+    max_temp: Optional[float],
+    smoothing: float,
+    avg_control_tm: Optional[float] = None,
+    max_workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Calculate the curve features of many wells in parallel.
+
+    The wells are split into chunks which are processed by a pool of worker processes (see
+    map_chunks).
+
+    Args:
+        plate: Indexed plate data
+        wells: Wells to analyze
+        min_temp: Minimum temperature of the analysis range
+        max_temp: Maximum temperature of the analysis range
+        smoothing: Smoothing factor for the spline fit
+        avg_control_tm: Average Tm of the control wells (used for ΔTm)
+        max_workers: Number of worker processes; defaults to the number of CPUs
+        chunk_size: Number of wells sent to a worker at once
+
+    Returns:
+        Dictionary mapping well IDs to the output of get_dsf_curve_features, in the order of
+        `wells`
+    """
+    items = [(well, plate.get_well_data(well)) for well in wells]
+    results = map_chunks(
+        _extract_chunk,
+        split_into_chunks(items, chunk_size),
+        args=(min_temp, max_temp, smoothing, avg_control_tm),
+        max_workers=max_workers,
+    )
+
+    return dict(results)
+
+
+def iter_features_batch(
+    plate: PlateData,
+    wells: List[str],
+    min_temp: Optional[float],
+    max_temp: Optional[float],
+    smoothing: float,
+    max_workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    cancel: Optional[threading.Event] = None,
+) -> Iterator[Dict[str, Dict[str, Any]]]:
+    """
+    Calculate the curve features of many wells in parallel, chunk by chunk (see
+    extract_features_batch), e.g. to report the progress or to stop early.
+
+    Args:
+        plate: Indexed plate data
+        wells: Wells to analyze
+        min_temp: Minimum temperature of the analysis range
+        max_temp: Maximum temperature of the analysis range
+        smoothing: Smoothing factor for the spline fit
+        max_workers: Number of worker processes; defaults to the number of CPUs
+        chunk_size: Number of wells sent to a worker at once
+        cancel: Stops the calculation once set (see imap_chunks)
+
+    Yields:
+        Dictionary mapping the well IDs of a chunk to the output of get_dsf_curve_features
+    """
+    items = [(well, plate.get_well_data(well)) for well in wells]
+    for results in imap_chunks(
+        _extract_chunk,
+        split_into_chunks(items, chunk_size),
+        args=(min_temp, max_temp, smoothing, None),
+        max_workers=max_workers,
+        cancel=cancel,
+    ):
+        yield dict(results)
@@ -0,0 +1,142 @@
+from typing import List
+
+import numpy as np
+import plotly.graph_objects as go
+
+# plates up to this size show the value in every cell (like bada's create_heatmap_plot)
+MAX_WELLS_WITH_TEXT = 384
+
+# larger distance matrices are averaged over blocks of wells
+MAX_MATRIX_SIZE = 512
+
+# grid lines between the wells
+PLATE_GRID = {"showgrid": True, "gridcolor": "lightgrey", "gridwidth": 1, "tickson": "boundaries"}
+
+
+def create_plate_heatmap(
+    plate_data: np.ndarray,
+    cols: List[str],
+    rows: List[str],
+    title: str,
+    color_scale: str = "RdBu_r",
+    colorbar_title: str = "",
+    value_format: str = ".2f",
+) -> go.Figure:
+    """
+    Heatmap of per-well values in the plate layout.
+
+    Same layout as bada's create_heatmap_plot, but the per-cell text labels (one string per well
+    that the browser has to lay out) are only added up to MAX_WELLS_WITH_TEXT wells. Larger plates
+    show the values on hover only, so the figure size and rendering cost stay flat.
+
+    Args:
+        plate_data: Matrix of values (rows x columns), NaN for empty cells
+        cols: Column labels
+        rows: Row labels
+        title: Title of the plot
+        color_scale: Plotly color scale
+        colorbar_title: Title of the color bar
+        value_format: Format of the values in the cells and on hover (e.g. "d" for integers)
+
+    Returns:
+        Plotly figure
+    """
+    show_text = plate_data.size <= MAX_WELLS_WITH_TEXT
+    gap = 2 if show_text else 1
+
+    heatmap = go.Heatmap(
+        z=plate_data,
+        x=cols,
+        y=rows,
+        colorscale=color_scale,
+        showscale=True,
+        colorbar={"title": {"text": colorbar_title, "side": "right"}, "thickness": 20, "len": 0.8},
+        hovertemplate=f"%{{y}}%{{x}}: %{{z:{value_format}}}<extra></extra>",
+        hoverongaps=False,
+        xgap=gap,
+        ygap=gap,
+    )
+    if show_text:
+        # only the finite cells are formatted (integer formats fail on NaN)
+        finite = np.isfinite(plate_data)
+        text = np.full(plate_data.shape, "", dtype=object)
+        text[finite] = np.char.mod(f"%{value_format}", plate_data[finite])
+        heatmap.update(
+            text=text,
+            texttemplate="%{text}",
+            textfont={"size": 10},
+        )
+
+    fig = go.Figure(heatmap)
+    fig.update_layout(
+        title={"text": title, "y": 0.95, "x": 0.5, "xanchor": "center", "yanchor": "top"},
+        height=400 if len(rows) <= 8 else 600 if len(rows) <= 16 else 800,
+        width=None,
+        yaxis_autorange="reversed",
+        margin={"t": 60, "r": 80, "b": 60, "l": 60},
+        xaxis={"side": "top", "tickmode": "linear", "dtick": 1, "tickangle": 0, **PLATE_GRID},
+        yaxis=PLATE_GRID,
+        plot_bgcolor="white",
+    )
+    return fig
+
+
+def _downsample(matrix: np.ndarray, factor: int) -> np.ndarray:
+    """Average blocks of factor x factor cells (the last block may be smaller)."""
+    size = int(np.ceil(matrix.shape[0] / factor)) * factor
+    padded = np.full((size, size), np.nan, dtype=float)
+    padded[: matrix.shape[0], : matrix.shape[1]] = matrix
+    blocks = padded.reshape(size // factor, factor, size // factor, factor)
+    return np.nanmean(blocks, axis=(1, 3))
+
+
+def create_distance_matrix_heatmap(
+    matrix: np.ndarray,
+    wells: List[str],
+    title: str = "Pairwise DTW distances",
+    colorbar_title: str = "DTW distance",
+) -> go.Figure:
+    """
+    Heatmap of a (wells x wells) distance matrix, e.g. reordered by a clustering.
+
+    Matrices of more than MAX_MATRIX_SIZE wells are shown as averages of blocks of neighbouring
+    wells, so the figure stays at most MAX_MATRIX_SIZE² cells; the hover text shows the first and
+    last well of each block.
+
+    Args:
+        matrix: Square distance matrix
+        wells: Well IDs of the rows and columns
+        title: Title of the plot
+        colorbar_title: Title of the color bar
+
+    Returns:
+        Plotly figure
+    """
+    factor = int(np.ceil(len(wells) / MAX_MATRIX_SIZE))
+    if factor > 1:
+        matrix = _downsample(matrix, factor)
+        labels = [
+            f"{wells[start]}–{wells[min(start + factor, len(wells)) - 1]}"
+            for start in range(0, len(wells), factor)
+        ]
+    else:
+        labels = list(wells)
+
+    fig = go.Figure(
+        go.Heatmap(
+            z=matrix,
+            x=labels,
+            y=labels,
+            colorscale="Viridis",
+            colorbar={"title": {"text": colorbar_title, "side": "right"}},
+            hovertemplate="%{y} – %{x}: %{z:.3f}<extra></extra>",
+        )
+    )
+    fig.update_layout(
+        title=title,
+        height=700,
+        yaxis={"autorange": "reversed", "showticklabels": len(labels) <= 96},
+        xaxis={"showticklabels": len(labels) <= 96},
+        plot_bgcolor="white",
+    )
+    return fig
@@ -0,0 +1,88 @@
+import numpy as np
+import plotly.graph_objects as go
+
+HISTOGRAM_BINS = 50
+
+THRESHOLD_COLORS = {"lower": "rgb(31, 119, 180)", "upper": "rgb(214, 39, 40)"}
+
+
+def create_distance_histogram(
+    sorted_distances: np.ndarray,
+    lower_threshold: float,
+    upper_threshold: float,
+    title: str = "Distribution of the DTW distances",
+    distance_name: str = "DTW Distance",
+) -> go.Figure:
+    """
+    Plot the histogram and the cumulative distribution of the distances with the thresholds.
+
+    The bins are counted with numpy, so the figure only contains the bin counts and the sorted
+    distances (for the cumulative distribution) instead of the raw values per bin.
+
+    Args:
+        sorted_distances: Distances of all wells in increasing order (infinite, then NaN last)
+        lower_threshold: Lower threshold (typical/undecided)
+        upper_threshold: Upper threshold (undecided/atypical)
+        title: Title of the figure
+        distance_name: Title of the x axis
+
+    Returns:
+        Plotly figure with the counts on the left and the cumulative fraction on the right axis
+    """
+    # undefined (NaN) distances are sorted last and not shown; infinite distances (DTW distances
+    # pruned beyond the upper threshold) aren't shown either, but count towards the cumulative
+    # fraction, which therefore ends below 1
+    n_wells = int(np.count_nonzero(~np.isnan(sorted_distances)))
+    sorted_distances = sorted_distances[np.isfinite(sorted_distances)]
+    counts, edges = np.histogram(sorted_distances, bins=HISTOGRAM_BINS)
+    fraction = np.arange(1, len(sorted_distances) + 1) / max(n_wells, 1)
+
+    fig = go.Figure()
+    fig.add_trace(
+        go.Bar(
+            x=(edges[:-1] + edges[1:]) / 2,
+            y=counts,
+            width=np.diff(edges),
+            name="Wells",
+            marker_color="rgb(180, 180, 180)",
+            hovertemplate="%{x:.3f}: %{y} wells<extra></extra>",
+        )
+    )
+    fig.add_trace(
+        go.Scatter(
+            x=sorted_distances,
+            y=fraction,
+            mode="lines",
+            line_shape="hv",
+            name="Cumulative fraction",
+            yaxis="y2",
+            line={"color": "black", "width": 1.5},
+            hovertemplate="%{x:.3f}: %{y:.1%}<extra></extra>",
+        )
+    )
+
+    for name, threshold in (("lower", lower_threshold), ("upper", upper_threshold)):
+        fig.add_vline(
+            x=threshold,
+            line={"color": THRESHOLD_COLORS[name], "dash": "dash", "width": 2},
+            annotation_text=f"{name} threshold",
+            annotation_position="top",
+        )
+
+    fig.update_layout(
+        title=title,
+        xaxis_title=distance_name,
+        yaxis={"title": "Number of wells"},
+        yaxis2={
+            "title": "Cumulative fraction",
+            "overlaying": "y",
+            "side": "right",
+            "range": [0, 1.05],
+            "tickformat": ".0%",
+            "showgrid": False,
+        },
+        bargap=0,
+        height=400,
+        legend={"orientation": "h", "yanchor": "bottom", "y": -0.3},
+    )
+    return fig
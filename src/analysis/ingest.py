@@ -0,0 +1,120 @@
+from collections import OrderedDict
+import hashlib
+import io
+import threading
+from typing import Dict, Tuple
+
+import pandas as pd
+
+from analysis.layout import infer_plate_size
+from analysis.parsers import LightCycler480Parser1536, QuantStudio7Parser1536
+from analysis.plate import PlateData
+
+SUPPORTED_FORMATS = ["QuantStudio 7", "LightCycler 480"]
+
+DEFAULT_PARSE_CACHE_BYTES = 512 * 1024 ** 2
+
+
+def parse_dsf_file(content: bytes, file_format: str) -> Tuple[pd.DataFrame, int]:
+    """
+    Parse and validate the content of an instrument export.
+
+    The parsers read from an in-memory buffer (pandas accepts file-like objects wherever the bada
+    parsers pass their file path on), so no temporary file is written and concurrent sessions
+    don't share any state. Plates with up to 1536 wells are supported; the plate size is the
+    smallest supported layout that contains all wells.
+
+    Args:
+        content: Raw bytes of the uploaded file
+        file_format: One of SUPPORTED_FORMATS
+
+    Returns:
+        Tuple of (validated long-format DataFrame, plate size)
+
+    Raises:
+        ValueError: If the file format is not supported
+    """
+    buffer = io.BytesIO(content)
+
+    if file_format == "QuantStudio 7":
+        validated_data = QuantStudio7Parser1536(buffer).parse()
+        minimum_size = 384  # QuantStudio 7 uses only(?) 384-well and 1536-well plates
+
+    elif file_format == "LightCycler 480":
+        validated_data = LightCycler480Parser1536(buffer).parse()
+        minimum_size = 96
+
+    else:
+        raise ValueError(f"Unsupported file format: {file_format}")
+
+    wells = validated_data["well_position"].unique().tolist()
+    return validated_data, infer_plate_size(wells, minimum_size)
+
+
+class ParseCache:
+    """
+    Process-wide cache of parsed plates, keyed by a hash of the file content and the file format.
+
+    The cached PlateData objects are shared between all sessions that upload the same file, so
+    they must be treated as read-only. The least recently used plates are evicted once the total
+    size of the cached data exceeds `max_bytes`.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_PARSE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[PlateData, int]]" = OrderedDict()
+        self._sizes: Dict[Tuple[str, str], int] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _make_key(content: bytes, file_format: str) -> Tuple[str, str]:
+        return (hashlib.sha256(content).hexdigest(), file_format)
+
+    def get_or_parse(self, content: bytes, file_format: str) -> Tuple[PlateData, int]:
+        """
+        Get the parsed plate for the file content, parsing it on a cache miss.
+
+        Args:
+            content: Raw bytes of the uploaded file
+            file_format: One of SUPPORTED_FORMATS
+
+        Returns:
+            Tuple of (plate data, plate size)
+        """
+        key = self._make_key(content, file_format)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        # parse outside of the lock so that other sessions aren't blocked in the meantime
+        validated_data, plate_size = parse_dsf_file(content, file_format)
+        entry = (PlateData(validated_data), plate_size)
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = entry
+                self._sizes[key] = entry[0].nbytes
+                self._total_bytes += self._sizes[key]
+                # always keep the newest entry, even if it exceeds the limit on its own
+                while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                    evicted_key, _ = self._entries.popitem(last=False)
+                    self._total_bytes -= self._sizes.pop(evicted_key)
+            else:
+                entry = self._entries[key]
+
+        return entry
+
+    def clear(self) -> None:
+        """Remove all cached plates."""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total_bytes = 0
+
+
+# shared by all sessions of the server process
+parse_cache = ParseCache()
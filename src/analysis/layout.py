@@ -0,0 +1,99 @@
+import re
+from typing import List, Tuple
+
+import numpy as np
+
+# (rows, columns) of the supported plate formats
+PLATE_LAYOUTS = {96: (8, 12), 384: (16, 24), 1536: (32, 48)}
+
+_WELL_PATTERN = re.compile(r"^([A-Z]+)(\d+)$")
+
+
+def get_plate_shape(plate_size: int) -> Tuple[int, int]:
+    """
+    Get the number of rows and columns of a plate.
+
+    Raises:
+        ValueError: If the plate size is not supported
+    """
+    if plate_size not in PLATE_LAYOUTS:
+        raise ValueError(f"Unsupported plate size: {plate_size}")
+    return PLATE_LAYOUTS[plate_size]
+
+
+def parse_well_ids(wells: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert well IDs into zero-based row and column indices (A1 -> (0, 0), AA1 -> (26, 0)).
+
+    Raises:
+        ValueError: If a well ID is not a row label followed by a column number
+    """
+    rows = np.empty(len(wells), dtype=np.int32)
+    cols = np.empty(len(wells), dtype=np.int32)
+    for i, well in enumerate(wells):
+        match = _WELL_PATTERN.match(well.upper())
+        if match is None:
+            raise ValueError(f"Invalid well ID: {well}")
+        letters, number = match.groups()
+        row = 0
+        for letter in letters:
+            row = row * 26 + ord(letter) - ord("A") + 1
+        rows[i] = row - 1
+        cols[i] = int(number) - 1
+    return rows, cols
+
+
+def get_row_labels(plate_size: int) -> List[str]:
+    """Row labels of a plate (A-Z, then AA, AB, ... for 1536-well plates)."""
+    n_rows, _ = get_plate_shape(plate_size)
+    letters = [chr(ord("A") + i) for i in range(26)]
+    return [letters[i] if i < 26 else letters[i // 26 - 1] + letters[i % 26] for i in range(n_rows)]
+
+
+def get_column_labels(plate_size: int) -> List[str]:
+    """Column labels of a plate ("1", "2", ...)."""
+    _, n_cols = get_plate_shape(plate_size)
+    return [str(col) for col in range(1, n_cols + 1)]
+
+
+def infer_plate_size(wells: List[str], minimum_size: int = 96) -> int:
+    """
+    Get the smallest supported plate that contains all wells.
+
+    Args:
+        wells: Well IDs of the data
+        minimum_size: Smallest plate size to return (e.g. the instrument's block format)
+
+    Raises:
+        ValueError: If the wells don't fit on any supported plate
+    """
+    rows, cols = parse_well_ids(wells)
+    max_row = int(rows.max()) if len(rows) else 0
+    max_col = int(cols.max()) if len(cols) else 0
+    for plate_size, (n_rows, n_cols) in sorted(PLATE_LAYOUTS.items()):
+        if plate_size >= minimum_size and max_row < n_rows and max_col < n_cols:
+            return plate_size
+    raise ValueError(f"Wells don't fit on a supported plate ({sorted(PLATE_LAYOUTS)} wells)")
+
+
+def to_plate_matrix(
+    positions: Tuple[np.ndarray, np.ndarray], values: np.ndarray, plate_size: int
+) -> Tuple[np.ndarray, List[str], List[str]]:
+    """
+    Arrange per-well values on the plate layout.
+
+    Args:
+        positions: Zero-based (rows, columns) of the wells (e.g. from PlateData.get_positions)
+        values: Value of each well (in the order of `positions`)
+        plate_size: Number of wells on the plate
+
+    Returns:
+        Tuple of (plate_data, column labels, row labels); wells without a value are NaN
+    """
+    n_rows, n_cols = get_plate_shape(plate_size)
+    rows, cols = positions
+
+    plate_data = np.full((n_rows, n_cols), np.nan)
+    plate_data[rows, cols] = values
+
+    return plate_data, get_column_labels(plate_size), get_row_labels(plate_size)
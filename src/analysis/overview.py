@@ -0,0 +1,196 @@
+import base64
+from io import BytesIO
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+import plotly.graph_objects as go
+
+from analysis.dense import DenseCurves
+from analysis.layout import get_column_labels, get_plate_shape, get_row_labels
+from analysis.preview import smooth_signals
+
+Color = Tuple[int, int, int]
+
+# width of the rendered plate in pixels; the cells are square
+OVERVIEW_WIDTH = 1200
+MIN_CELL_SIZE = 12
+
+BACKGROUND_COLOR: Color = (255, 255, 255)
+GRID_COLOR: Color = (220, 220, 220)
+MISSING_WELL_COLOR: Color = (240, 240, 240)
+CURVE_COLOR: Color = (31, 119, 180)
+
+
+def get_cell_size(plate_size: int) -> int:
+    """Size of a well's cell in pixels (including the 1 px grid line)."""
+    _, n_cols = get_plate_shape(plate_size)
+    return max(MIN_CELL_SIZE, OVERVIEW_WIDTH // n_cols)
+
+
+def _resample_columns(values: np.ndarray, n_columns: int) -> np.ndarray:
+    """Linearly resample each row of a matrix to `n_columns` points."""
+    positions = np.linspace(0, values.shape[1] - 1, n_columns)
+    lower = np.floor(positions).astype(int)
+    upper = np.minimum(lower + 1, values.shape[1] - 1)
+    fraction = positions - lower
+    return values[:, lower] * (1 - fraction) + values[:, upper] * fraction
+
+
+def render_plate_overview(
+    curves: DenseCurves,
+    plate_size: int,
+    min_temp: float,
+    max_temp: float,
+    signal: str = "fluorescence",
+    well_colors: Optional[Dict[str, Color]] = None,
+) -> np.ndarray:
+    """
+    Draw the curves of all wells into a single image in the plate layout.
+
+    The curves are drawn with numpy only: every curve is min-max normalized within its cell,
+    resampled to one value per pixel column and rasterized as vertical line segments between
+    neighbouring columns, for all wells at once.
+
+    Args:
+        curves: Dense matrix of all curves
+        plate_size: Number of wells on the plate
+        min_temp: Minimum temperature of the plotted range
+        max_temp: Maximum temperature of the plotted range
+        signal: "fluorescence" or "derivative" (of the smoothed fluorescence)
+        well_colors: Curve color per well (e.g. by classification); others use CURVE_COLOR
+
+    Returns:
+        RGB image as uint8 array of shape (rows * cell, columns * cell, 3)
+    """
+    n_rows, n_cols = get_plate_shape(plate_size)
+    cell = get_cell_size(plate_size)
+    inner = cell - 1
+
+    temperatures, values = curves.get_window(min_temp, max_temp)
+    values = values.astype(float)
+    if signal == "derivative":
+        if len(temperatures) < 2:
+            raise ValueError("At least two temperatures are needed for the derivative")
+        values = np.gradient(smooth_signals(values), temperatures, axis=1)
+    elif signal != "fluorescence":
+        raise ValueError(f"Unknown signal: {signal}")
+
+    # normalized to [0, 1] per well; flat curves are drawn in the middle of the cell
+    minimum = values.min(axis=1, keepdims=True)
+    value_range = values.max(axis=1, keepdims=True) - minimum
+    normalized = np.divide(
+        values - minimum, value_range, out=np.full_like(values, 0.5), where=value_range > 0
+    )
+    y = np.rint((1 - _resample_columns(normalized, inner)) * (inner - 1)).astype(int)
+
+    # vertical segment from the previous to the current column, so the curve is connected
+    previous = np.concatenate([y[:, :1], y[:, :-1]], axis=1)
+    low = np.minimum(previous, y)
+    high = np.maximum(previous, y)
+    pixel_rows = np.arange(inner)[None, :, None]
+    masks = (pixel_rows >= low[:, None, :]) & (pixel_rows <= high[:, None, :])
+
+    colors = np.tile(np.array(CURVE_COLOR, dtype=np.uint8), (len(curves), 1))
+    if well_colors:
+        for well, color in well_colors.items():
+            if well in curves:
+                colors[curves.row_index(well)] = color
+
+    cells = np.empty((n_rows, n_cols, cell, cell, 3), dtype=np.uint8)
+    cells[:] = GRID_COLOR
+    cells[:, :, :inner, :inner] = MISSING_WELL_COLOR
+
+    well_cells = np.empty((len(curves), inner, inner, 3), dtype=np.uint8)
+    well_cells[:] = BACKGROUND_COLOR
+    well_cells[masks] = np.repeat(colors, masks.sum(axis=(1, 2)), axis=0)
+    cells[curves.rows, curves.cols, :inner, :inner] = well_cells
+
+    return cells.transpose(0, 2, 1, 3, 4).reshape(n_rows * cell, n_cols * cell, 3)
+
+
+def encode_png(image: np.ndarray) -> bytes:
+    """Encode an RGB image as PNG."""
+    buffer = BytesIO()
+    Image.fromarray(image).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def create_plate_overview_figure(
+    png: bytes, plate_size: int, curves: DenseCurves, selected_well: Optional[str] = None
+) -> go.Figure:
+    """
+    Show a rendered plate overview with one invisible, clickable marker per well.
+
+    Args:
+        png: Image returned by render_plate_overview, encoded as PNG
+        plate_size: Number of wells on the plate
+        curves: Curves of the image; every well gets a marker (the point index of a selection
+            refers to `curves.wells`)
+        selected_well: Well whose cell is framed
+
+    Returns:
+        Plotly figure
+    """
+    n_rows, n_cols = get_plate_shape(plate_size)
+    cell = get_cell_size(plate_size)
+    rows, cols = curves.rows, curves.cols
+
+    fig = go.Figure()
+    fig.add_trace(
+        go.Image(
+            source="data:image/png;base64," + base64.b64encode(png).decode("ascii"),
+            x0=0,
+            y0=0,
+            dx=1,
+            dy=1,
+            hoverinfo="skip",
+        )
+    )
+    fig.add_trace(
+        go.Scatter(
+            x=cols * cell + cell / 2,
+            y=rows * cell + cell / 2,
+            mode="markers",
+            marker={"size": max(6, int(cell * 0.6)), "symbol": "square", "color": "rgba(0,0,0,0)"},
+            customdata=curves.wells,
+            hovertemplate="%{customdata}<extra></extra>",
+            showlegend=False,
+        )
+    )
+
+    if selected_well is not None and selected_well in curves:
+        row = rows[curves.row_index(selected_well)]
+        col = cols[curves.row_index(selected_well)]
+        fig.add_shape(
+            type="rect",
+            x0=col * cell,
+            x1=(col + 1) * cell - 1,
+            y0=row * cell,
+            y1=(row + 1) * cell - 1,
+            line={"color": "black", "width": 2},
+        )
+
+    fig.update_xaxes(
+        tickvals=[(col + 0.5) * cell for col in range(n_cols)],
+        ticktext=get_column_labels(plate_size),
+        side="top",
+        showgrid=False,
+        zeroline=False,
+        range=[0, n_cols * cell],
+    )
+    fig.update_yaxes(
+        tickvals=[(row + 0.5) * cell for row in range(n_rows)],
+        ticktext=get_row_labels(plate_size),
+        showgrid=False,
+        zeroline=False,
+        range=[n_rows * cell, 0],
+        scaleanchor="x",
+    )
+    fig.update_layout(
+        height=n_rows * cell + 60,
+        margin={"l": 40, "r": 10, "t": 40, "b": 10},
+        dragmode=False,
+        clickmode="event+select",
+    )
+    return fig
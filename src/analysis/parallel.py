@@ -0,0 +1,120 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait
+import multiprocessing
+import os
+import threading
+from typing import Any, Callable, Iterator, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_CHUNK_SIZE = 16
+
+# seconds between the checks of the cancel Event while waiting for a chunk (see imap_chunks)
+CANCEL_POLL_INTERVAL = 0.1
+
+
+def resolve_max_workers(max_workers: Optional[int]) -> int:
+    """Get the number of worker processes to use (None means all available CPUs)."""
+    return max(1, max_workers or os.cpu_count() or 1)
+
+
+def split_into_chunks(items: Sequence[T], chunk_size: int) -> List[Sequence[T]]:
+    """Split a sequence into consecutive chunks of at most `chunk_size` items."""
+    chunk_size = max(1, chunk_size)
+    return [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+
+def map_chunks(
+    func: Callable[..., List[Any]],
+    chunks: List[Sequence[Any]],
+    args: Sequence[Any] = (),
+    max_workers: Optional[int] = None,
+) -> List[Any]:
+    """
+    Apply `func(chunk, *args)` to every chunk and concatenate the results.
+
+    The chunks are processed by a pool of worker processes. If only a single worker or a single
+    chunk is needed, they are processed in the calling process to avoid the start-up cost of the
+    pool.
+
+    Args:
+        func: Module-level function returning a list of results for a chunk
+        chunks: Chunks of work items
+        args: Additional arguments passed to every call of `func`
+        max_workers: Number of worker processes; defaults to the number of CPUs
+
+    Returns:
+        Concatenated results of all chunks, in the order of the chunks
+    """
+    max_workers = resolve_max_workers(max_workers)
+
+    if max_workers == 1 or len(chunks) <= 1:
+        chunk_results = [func(chunk, *args) for chunk in chunks]
+    else:
+        # spawn instead of fork since the streamlit server process is multi-threaded
+        with ProcessPoolExecutor(
+            max_workers=min(max_workers, len(chunks)),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            futures = [executor.submit(func, chunk, *args) for chunk in chunks]
+            chunk_results = [future.result() for future in futures]
+
+    return [result for results in chunk_results for result in results]
+
+
+def imap_chunks(
+    func: Callable[..., List[Any]],
+    chunks: List[Sequence[Any]],
+    args: Sequence[Any] = (),
+    max_workers: Optional[int] = None,
+    cancel: Optional[threading.Event] = None,
+) -> Iterator[List[Any]]:
+    """
+    Like map_chunks, but yield the results of every chunk (in the order of the chunks) as soon as
+    they are available.
+
+    Args:
+        func: Module-level function returning a list of results for a chunk
+        chunks: Chunks of work items
+        args: Additional arguments passed to every call of `func`
+        max_workers: Number of worker processes; defaults to the number of CPUs
+        cancel: Once set, no further results are yielded and the chunks that haven't been started
+            are dropped (chunks being processed by a worker are finished in the background)
+
+    Yields:
+        Results of each chunk
+    """
+    max_workers = resolve_max_workers(max_workers)
+
+    def cancelled() -> bool:
+        return cancel is not None and cancel.is_set()
+
+    if max_workers == 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            if cancelled():
+                return
+            yield func(chunk, *args)
+        return
+
+    # spawn instead of fork since the streamlit server process is multi-threaded
+    executor = ProcessPoolExecutor(
+        max_workers=min(max_workers, len(chunks)),
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+    try:
+        # the futures are dropped once their results are yielded, so the results of the chunks
+        # aren't all kept until the end
+        futures = deque(executor.submit(func, chunk, *args) for chunk in chunks)
+        while futures:
+            future = futures.popleft()
+            # the Event is checked while waiting, so cancelling doesn't wait for the chunk
+            while not wait([future], timeout=CANCEL_POLL_INTERVAL).done:
+                if cancelled():
+                    return
+            if cancelled():
+                return
+            yield future.result()
+    finally:
+        # when cancelled, the chunks being processed are finished by the workers in the
+        # background instead of being waited for
+        executor.shutdown(wait=not cancelled(), cancel_futures=True)
@@ -0,0 +1,47 @@
+"""
+Instrument parsers that accept plates with up to 1536 wells.
+
+The bada parsers validate the well positions against the 384-well layout (rows A-P, columns
+1-24). The parsers here only replace these validation schemas; reading and reformatting the
+exports is unchanged.
+"""
+from bada.models import DSFInput, LightCycler480Raw, QuantStudio7Raw
+from bada.parsers import LightCycler480Parser, QuantStudio7Parser
+import pandas as pd
+import pandera as pa
+from pandera.typing import Series
+
+# rows A-Z and AA-AF, columns 1-48
+WELL_POSITION_PATTERN = r"^(?:[A-Z]|A[A-F])(?:[1-9]|[1-3][0-9]|4[0-8])$"
+
+
+class DSFInput1536(DSFInput):
+    well_position: Series[str] = pa.Field(str_matches=WELL_POSITION_PATTERN)
+
+
+class QuantStudio7Raw1536(QuantStudio7Raw):
+    Well: Series[int] = pa.Field(ge=1, le=1536)
+    well_position: Series[str] = pa.Field(alias="Well Position", str_matches=WELL_POSITION_PATTERN)
+
+
+class LightCycler480Raw1536(LightCycler480Raw):
+    _well: Series[float] = pa.Field(
+        regex=WELL_POSITION_PATTERN[:-1] + r": Sample \d+$",  # type: ignore
+        alias=True,
+    )
+
+
+class QuantStudio7Parser1536(QuantStudio7Parser):
+    def _validate_raw_data(self, df: pd.DataFrame) -> None:
+        QuantStudio7Raw1536.validate(df)
+
+    def _validate_processed_data(self, df: pd.DataFrame) -> None:
+        DSFInput1536.validate(df)
+
+
+class LightCycler480Parser1536(LightCycler480Parser):
+    def _validate_raw_data(self, df: pd.DataFrame) -> None:
+        LightCycler480Raw1536.validate(df)
+
+    def _validate_processed_data(self, df: pd.DataFrame) -> None:
+        DSFInput1536.validate(df)
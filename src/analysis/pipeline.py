@@ -0,0 +1,105 @@
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from analysis.classification import ATYPICAL, WellClassification
+from analysis.dense import DenseCurves
+from analysis.dtw import get_dtw_distances
+from analysis.features import extract_features_batch
+from analysis.ingest import parse_dsf_file
+from analysis.plate import PlateData
+from analysis.results import WellResults, build_results_table
+
+
+@dataclass
+class AnalysisSettings:
+    """Settings of a complete plate analysis (the values chosen on the pages of the app)."""
+
+    file_format: str
+    control_wells: List[str]
+    reference_well: Optional[str] = None
+    dtw_lower_threshold: float = 0.5
+    dtw_upper_threshold: float = 1.5
+    dtw_window: Optional[int] = None
+    smoothing: float = 0.01
+    min_temp: Optional[float] = None
+    max_temp: Optional[float] = None
+    max_workers: Optional[int] = None
+
+
+def analyze_plate(content: bytes, settings: AnalysisSettings) -> pd.DataFrame:
+    """
+    Run the complete analysis of a plate without the app.
+
+    The steps are the same as on the pages: parsing, control analysis (average control Tm), DTW
+    classification of atypical wells and feature extraction for all wells.
+
+    Args:
+        content: Raw bytes of the instrument export
+        settings: Analysis settings
+
+    Returns:
+        Results table in the format of the downloadable CSV file
+
+    Raises:
+        ValueError: If a control or reference well is not part of the plate
+    """
+    validated_data, _ = parse_dsf_file(content, settings.file_format)
+    plate = PlateData(validated_data)
+    available_wells = plate.wells
+
+    missing_controls = [well for well in settings.control_wells if well not in plate]
+    if not settings.control_wells or missing_controls:
+        raise ValueError(f"Control wells not found on the plate: {missing_controls}")
+
+    reference_well = settings.reference_well or settings.control_wells[0]
+    if reference_well not in plate:
+        raise ValueError(f"Reference well not found on the plate: {reference_well}")
+
+    min_temp = settings.min_temp if settings.min_temp is not None else plate.min_temperature
+    max_temp = settings.max_temp if settings.max_temp is not None else plate.max_temperature
+
+    control_features = extract_features_batch(
+        plate,
+        settings.control_wells,
+        min_temp=min_temp,
+        max_temp=max_temp,
+        smoothing=settings.smoothing,
+        max_workers=settings.max_workers,
+    )
+    avg_control_tm = float(np.mean([features["tm"] for features in control_features.values()]))
+
+    dtw_distances, _ = get_dtw_distances(
+        DenseCurves.from_plate(plate, available_wells),
+        reference_well,
+        min_temp=min_temp,
+        max_temp=max_temp,
+        window=settings.dtw_window,
+        prune_above=settings.dtw_upper_threshold,
+        max_workers=settings.max_workers,
+    )
+    classification = WellClassification.from_dtw_distances(dtw_distances)
+    classification.classify(settings.dtw_lower_threshold, settings.dtw_upper_threshold)
+    atypical_wells = classification.get_wells(ATYPICAL)
+
+    all_features = extract_features_batch(
+        plate,
+        available_wells,
+        min_temp=min_temp,
+        max_temp=max_temp,
+        smoothing=settings.smoothing,
+        avg_control_tm=avg_control_tm,
+        max_workers=settings.max_workers,
+    )
+    results = WellResults.from_features(
+        all_features,
+        atypical_wells,
+        smoothing=settings.smoothing,
+        min_temp=min_temp,
+        max_temp=max_temp,
+        positions=plate.get_positions(list(all_features)),
+    )
+
+    return build_results_table(results, available_wells)
@@ -0,0 +1,124 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analysis.layout import parse_well_ids
+
+
+class PlateData:
+    """
+    Well-indexed view of validated long-format DSF data.
+
+    The rows are grouped by well once at construction, so looking up the rows of a single well is a
+    dictionary lookup followed by a slice instead of a boolean mask over the whole plate. The well
+    IDs are parsed once as well: the plate keeps the (row, column) position of every well and the
+    canonical well order (A1, A2, ..., A12, B1, ...), so sorting wells or placing them on the plate
+    layout doesn't have to parse the IDs again.
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        """
+        Build the well index.
+
+        Args:
+            data: Validated DataFrame with the columns 'well_position', 'temperature' and
+                'fluorescence' (as returned by the bada parsers)
+        """
+        codes, wells = pd.factorize(data["well_position"])
+        # stable sort keeps the original (temperature) order of the rows within each well
+        order = np.argsort(codes, kind="stable")
+        self.data = data.iloc[order].reset_index(drop=True)
+
+        counts = np.bincount(codes, minlength=len(wells))
+        ends = np.cumsum(counts)
+        starts = ends - counts
+        self._index: Dict[str, Tuple[int, int]] = {
+            str(well): (int(start), int(end)) for well, start, end in zip(wells, starts, ends)
+        }
+
+        # zero-based plate positions, in the order of `wells`
+        rows, cols = parse_well_ids(list(self._index))
+        well_order = np.lexsort((cols, rows))
+        self._wells: List[str] = [str(wells[i]) for i in well_order]
+        self.rows = rows[well_order]
+        self.cols = cols[well_order]
+        self._rank: Dict[str, int] = {well: rank for rank, well in enumerate(self._wells)}
+
+        self.temperature = self.data["temperature"].to_numpy()
+        self.fluorescence = self.data["fluorescence"].to_numpy()
+        self.min_temperature = float(self.temperature.min())
+        self.max_temperature = float(self.temperature.max())
+
+    def __contains__(self, well_id: str) -> bool:
+        return well_id in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory usage of the plate data in bytes."""
+        return int(self.data.memory_usage(deep=True).sum())
+
+    @property
+    def wells(self) -> List[str]:
+        """Well IDs in the canonical order (A1, A2, ..., A12, B1, ...)."""
+        return list(self._wells)
+
+    def sort_wells(self, wells: List[str]) -> List[str]:
+        """Sort wells of the plate in the canonical order (row by row, columns in numeric order)."""
+        return sorted(wells, key=self._rank.__getitem__)
+
+    def get_positions(self, wells: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the zero-based (row, column) positions of wells on the plate layout.
+
+        Args:
+            wells: Well IDs of the plate
+
+        Returns:
+            Tuple of (rows, columns) arrays in the order of `wells`
+        """
+        ranks = np.fromiter((self._rank[well] for well in wells), dtype=np.intp, count=len(wells))
+        return self.rows[ranks], self.cols[ranks]
+
+    def get_bounds(self, well_id: str) -> Tuple[int, int]:
+        """Get the (start, end) row positions of a well in the plate arrays."""
+        return self._index[well_id]
+
+    def get_arrays(self, well_id: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the temperature and fluorescence values of a single well.
+
+        Args:
+            well_id: Well ID (e.g. 'A1')
+
+        Returns:
+            Tuple of (temperature, fluorescence) arrays; both are views into the plate arrays and
+            must not be modified
+        """
+        start, end = self.get_bounds(well_id)
+        return self.temperature[start:end], self.fluorescence[start:end]
+
+    def get_well_data(self, well_id: str) -> pd.DataFrame:
+        """
+        Get the rows of a single well as a DataFrame (e.g. for get_dsf_curve_features).
+
+        Args:
+            well_id: Well ID (e.g. 'A1')
+
+        Returns:
+            DataFrame slice with the rows of the well
+        """
+        start, end = self.get_bounds(well_id)
+        return self.data.iloc[start:end]
+
+    def get_windowed_signals(self, min_temp: float, max_temp: float) -> Dict[str, np.ndarray]:
+        """Get the fluorescence of each well within a temperature range."""
+        temperature_mask = (self.temperature >= min_temp) & (self.temperature <= max_temp)
+        signals = {}
+        for well in self._wells:
+            start, end = self._index[well]
+            signals[well] = self.fluorescence[start:end][temperature_mask[start:end]]
+        return signals
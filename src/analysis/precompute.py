@@ -0,0 +1,176 @@
+"""
+Speculative calculation of the DTW distances and the curve features of all wells.
+
+Once the control wells are analyzed, the inputs of the atypical well detection and of the feature
+extraction are known (as long as the defaults of the next pages are kept), so both are calculated
+in a background thread while the user is still on the Control Analysis page. The pages take the
+results if they were calculated for their current settings and calculate them as before otherwise.
+The Well Analysis page also runs its analysis of all wells this way and takes the features of every
+finished chunk while the rest are still calculated (see pop_features).
+
+The thread doesn't touch the session state. It is cancelled through an Event, which is checked
+after the DTW distances and before every chunk of wells of the feature extraction.
+"""
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from analysis.dense import DenseCurves
+from analysis.dtw import get_dtw_distances
+from analysis.features import iter_features_batch
+from analysis.parallel import DEFAULT_CHUNK_SIZE
+from analysis.plate import PlateData
+
+DtwResult = Tuple[Dict[str, Tuple[float, str]], List[str]]
+
+
+class Precomputation:
+    """DTW distances from a reference well and the features of all wells, in a background thread."""
+
+    def __init__(
+        self,
+        plate: PlateData,
+        curves: Optional[Union[DenseCurves, PlateData]],
+        wells: List[str],
+        reference_well: Optional[str],
+        min_temp: float,
+        max_temp: float,
+        window: Optional[int],
+        prune_above: Optional[float],
+        smoothing: float,
+        max_workers: Optional[int] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        """
+        Args:
+            plate: Indexed plate data
+            curves: Curves for the DTW distances (e.g. the dense matrix); None to skip them
+            wells: Wells whose features are calculated
+            reference_well: Reference of the DTW distances; None to skip them
+            min_temp: Minimum temperature of the analysis range
+            max_temp: Maximum temperature of the analysis range
+            window: Sakoe-Chiba band width of the DTW distances
+            prune_above: Pruning threshold of the DTW distances (see get_dtw_distances)
+            smoothing: Smoothing factor of the spline fits
+            max_workers: Number of CPUs to use
+            chunk_size: Number of wells sent to a worker at once
+        """
+        self.plate = plate
+        self.curves = curves
+        self.wells = list(wells)
+        self.reference_well = reference_well
+        self.min_temp = min_temp
+        self.max_temp = max_temp
+        self.window = window
+        self.prune_above = prune_above
+        self.smoothing = smoothing
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+
+        self.error: Optional[BaseException] = None
+        self._dtw_result: Optional[DtwResult] = None
+        self._features: Dict[str, Dict[str, Any]] = {}
+        self._n_features = 0
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._dtw_done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="precomputation", daemon=True)
+
+    def start(self) -> "Precomputation":
+        self._thread.start()
+        return self
+
+    def cancel(self, wait: bool = False) -> None:
+        """Stop the calculation after the current step (optionally waiting until it stopped)."""
+        self._cancel.set()
+        if wait and self._thread.is_alive():
+            self._thread.join()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    @property
+    def progress(self) -> Tuple[bool, int, int]:
+        """(DTW distances done, wells with features, number of wells)."""
+        return self._dtw_result is not None, self._n_features, len(self.wells)
+
+    def _run(self) -> None:
+        try:
+            if self.reference_well is not None and self.curves is not None and not self.cancelled:
+                self._dtw_result = get_dtw_distances(
+                    self.curves,
+                    self.reference_well,
+                    min_temp=self.min_temp,
+                    max_temp=self.max_temp,
+                    window=self.window,
+                    prune_above=self.prune_above,
+                    max_workers=self.max_workers,
+                )
+            self._dtw_done.set()
+
+            # one worker pool for all wells; the results of every chunk are stored as it finishes
+            for features in iter_features_batch(
+                self.plate,
+                self.wells,
+                min_temp=self.min_temp,
+                max_temp=self.max_temp,
+                smoothing=self.smoothing,
+                max_workers=self.max_workers,
+                chunk_size=self.chunk_size,
+                cancel=self._cancel,
+            ):
+                with self._lock:
+                    self._features.update(features)
+                    self._n_features += len(features)
+        except Exception as e:  # reported on the page; the pages calculate the results themselves
+            self.error = e
+        finally:
+            self._dtw_done.set()
+
+    def get_dtw_distances(
+        self,
+        reference_well: str,
+        min_temp: float,
+        max_temp: float,
+        window: Optional[int],
+        prune_above: Optional[float],
+    ) -> Optional[DtwResult]:
+        """
+        Get the DTW distances if they were (or are being) calculated for these settings.
+
+        Distances that are still being calculated are waited for, since calculating them again
+        would take at least as long.
+
+        Returns:
+            Tuple of (distances, pruned wells) as returned by get_dtw_distances; None if the
+            settings differ or the calculation was cancelled or failed
+        """
+        if (reference_well, min_temp, max_temp, window) != (
+            self.reference_well, self.min_temp, self.max_temp, self.window
+        ):
+            return None
+        # distances pruned at a higher threshold are still exact up to the requested one
+        if self.prune_above is not None and (prune_above is None or prune_above > self.prune_above):
+            return None
+
+        self._dtw_done.wait()
+        return self._dtw_result
+
+    def has_feature_settings(self, min_temp: float, max_temp: float, smoothing: float) -> bool:
+        """Whether the features are (being) calculated with these settings."""
+        return (min_temp, max_temp, smoothing) == (self.min_temp, self.max_temp, self.smoothing)
+
+    def pop_features(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the features finished since the last call, without stopping the calculation.
+
+        Returns:
+            Dictionary mapping well IDs to the output of get_dsf_curve_features (without ΔTm)
+        """
+        with self._lock:
+            features, self._features = self._features, {}
+        return features
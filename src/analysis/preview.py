@@ -0,0 +1,142 @@
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from scipy.interpolate import splev, splrep
+from scipy.signal import savgol_filter
+
+from analysis.plate import PlateData
+
+# Savitzky-Golay filter of the derivative signals (window in data points, polynomial order)
+PREVIEW_WINDOW = 7
+PREVIEW_POLYORDER = 2
+
+# points the splines of the preview are evaluated at (the exact fit uses 1000)
+PREVIEW_POINTS = 250
+
+
+def smooth_signals(values: np.ndarray) -> np.ndarray:
+    """Smooth a signal (or each row of a matrix) with a Savitzky-Golay filter before derivation."""
+    n_points = values.shape[-1]
+    window = min(PREVIEW_WINDOW, n_points if n_points % 2 else n_points - 1)
+    if window <= PREVIEW_POLYORDER:
+        return values.astype(float)
+    return savgol_filter(values, window, PREVIEW_POLYORDER, axis=-1)
+
+
+def _fit_spline(x: np.ndarray, y: np.ndarray, smoothing: float) -> Optional[tuple]:
+    """
+    Cubic smoothing spline through the measured points (FITPACK representation).
+
+    Returns None for too few points.
+    """
+    if len(x) <= 3:
+        return None
+    return splrep(x, y, s=smoothing)
+
+
+def _evaluate_spline(
+    x: np.ndarray, y: np.ndarray, smoothing: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Fit the smoothing spline and evaluate it and its derivative on PREVIEW_POINTS temperatures.
+
+    The spline is fitted to the curve scaled to the range [0, 1]; on the raw fluorescence (often
+    thousands of units) the sum of squared residuals is far larger than the smoothing factors of
+    the sliders (0 to 1), which would give an interpolating spline for every setting. Curves with
+    too few points for a cubic spline are used as measured, with finite differences.
+
+    Returns:
+        Tuple of (temperatures, values, derivative)
+    """
+    offset = float(y.min()) if len(y) else 0.0
+    scale = float(np.ptp(y)) if len(y) else 0.0
+    if scale == 0:
+        scale = 1.0
+    tck = _fit_spline(x, (y - offset) / scale, smoothing)
+    if tck is None:
+        derivative = np.gradient(y, x) if len(x) > 1 else np.zeros(len(y))
+        return x, y.astype(float), derivative
+    x_spline = np.linspace(x.min(), x.max(), PREVIEW_POINTS)
+    return (
+        x_spline,
+        splev(x_spline, tck) * scale + offset,
+        splev(x_spline, tck, der=1) * scale,
+    )
+
+
+def _refine_peak(x: np.ndarray, y: np.ndarray, idx: int) -> float:
+    """Position of the vertex of the parabola through the peak and its neighbours."""
+    if idx == 0 or idx == len(y) - 1:
+        return float(x[idx])
+    denominator = y[idx - 1] - 2 * y[idx] + y[idx + 1]
+    if denominator == 0:
+        return float(x[idx])
+    offset = 0.5 * (y[idx - 1] - y[idx + 1]) / denominator
+    step = x[idx + 1] - x[idx] if offset > 0 else x[idx] - x[idx - 1]
+    return float(x[idx] + offset * step)
+
+
+def preview_curve_features(
+    plate: PlateData,
+    well_id: str,
+    min_temp: Optional[float],
+    max_temp: Optional[float],
+    smoothing: float,
+    avg_control_tm: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Fast approximation of get_dsf_curve_features for interactive previews.
+
+    The smoothing splines are fitted with FITPACK directly to the curve scaled to [0, 1] (so the
+    smoothing factor has a visible effect), evaluated on PREVIEW_POINTS instead of 1000
+    temperatures and without fitting the same curve again for every feature; the Tm is refined
+    with a parabola through the peak of the derivative. This takes a few milliseconds per well.
+
+    Args:
+        plate: Indexed plate data
+        well_id: Well to analyze
+        min_temp: Minimum temperature of the analysis range
+        max_temp: Maximum temperature of the analysis range
+        smoothing: Smoothing factor, relative to the curve scaled to [0, 1]
+        avg_control_tm: Average Tm of the control wells (used for ΔTm)
+
+    Returns:
+        Dictionary in the format returned by get_dsf_curve_features, with "preview" set to True
+    """
+    temperature, fluorescence = plate.get_arrays(well_id)
+    if min_temp is None:
+        min_temp = float(temperature.min())
+    if max_temp is None:
+        max_temp = float(temperature.max())
+
+    # like the exact fit, the minimum and maximum are taken from the fit of the full curve
+    x_full, smoothed, _ = _evaluate_spline(temperature, fluorescence, smoothing)
+    min_idx = int(np.argmin(smoothed))
+    max_idx = int(np.argmax(smoothed))
+
+    in_range = (temperature >= min_temp) & (temperature <= max_temp)
+    if not in_range.any():
+        raise ValueError(f"No data points between {min_temp} and {max_temp} °C")
+    x, y, derivative = _evaluate_spline(temperature[in_range], fluorescence[in_range], smoothing)
+
+    peak_idx = int(np.argmax(derivative))
+    tm = _refine_peak(x, derivative, peak_idx)
+
+    return {
+        "full_well_data": plate.get_well_data(well_id),
+        "x_spline": x,
+        "y_spline": y,
+        "y_spline_derivative": derivative,
+        "min_fluorescence": float(smoothed[min_idx]),
+        "max_fluorescence": float(smoothed[max_idx]),
+        "fluorescence_range": float(smoothed[max_idx] - smoothed[min_idx]),
+        "temp_at_min": float(x_full[min_idx]),
+        "temp_at_max": float(x_full[max_idx]),
+        "tm": tm,
+        "max_derivative_value": float(derivative[peak_idx]),
+        "delta_tm": tm - avg_control_tm if avg_control_tm is not None else np.nan,
+        "smoothing": smoothing,
+        "min_temp": min_temp,
+        "max_temp": max_temp,
+        "preview": True,
+    }
@@ -0,0 +1,248 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analysis.features import to_well_result
+from analysis.layout import parse_well_ids, to_plate_matrix
+
+# scalar features stored per well, in the column order of the exported table
+FEATURE_COLUMNS = [
+    "tm",
+    "delta_tm",
+    "min_fluorescence",
+    "max_fluorescence",
+    "fluorescence_range",
+    "max_slope",
+    "smoothing",
+    "min_temp",
+    "max_temp",
+    "temp_at_min",
+    "temp_at_max",
+    "max_derivative_value",
+]
+FLAG_COLUMNS = ["is_empty", "reviewed"]
+
+
+class WellResults:
+    """
+    Columnar store for the per-well analysis results.
+
+    Every feature is kept in one numpy array indexed by well, so building the results table or a
+    heatmap is a vectorized operation. The fitted curves are not stored; they can be regenerated on
+    demand from the saved settings (see FeatureCache).
+
+    `version` is incremented on every change, so derived artifacts (e.g. the export files) can be
+    cached until the results change.
+    """
+
+    def __init__(
+        self, wells: List[str], positions: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    ):
+        """
+        Args:
+            wells: Well IDs
+            positions: (rows, columns) of the wells on the plate; parsed from the IDs if None
+        """
+        self.wells = list(wells)
+        self._index = {well: i for i, well in enumerate(self.wells)}
+        self.positions = positions if positions is not None else parse_well_ids(self.wells)
+        self.version = 0
+        n_wells = len(self.wells)
+        self._columns: Dict[str, np.ndarray] = {
+            name: np.full(n_wells, np.nan) for name in FEATURE_COLUMNS
+        }
+        for name in FLAG_COLUMNS:
+            self._columns[name] = np.zeros(n_wells, dtype=bool)
+
+    @classmethod
+    def from_features(
+        cls,
+        all_features: Dict[str, Dict[str, Any]],
+        empty_wells: List[str],
+        smoothing: float,
+        min_temp: Optional[float],
+        max_temp: Optional[float],
+        positions: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    ) -> "WellResults":
+        """
+        Create the store from the output of a batch feature extraction.
+
+        Args:
+            all_features: Dictionary mapping well IDs to the output of get_dsf_curve_features
+            empty_wells: Wells classified as atypical
+            smoothing: Smoothing factor the features were calculated with
+            min_temp: Minimum temperature of the analysis range
+            max_temp: Maximum temperature of the analysis range
+            positions: (rows, columns) of the wells in the order of `all_features`
+
+        Returns:
+            WellResults with one entry per well in `all_features`
+        """
+        results = cls(list(all_features), positions)
+        empty_wells = set(empty_wells)
+        for well, features in all_features.items():
+            results.set_features(
+                well, features, smoothing, min_temp, max_temp, is_empty=well in empty_wells
+            )
+        return results
+
+    @classmethod
+    def from_columns(
+        cls,
+        wells: List[str],
+        columns: Dict[str, np.ndarray],
+        positions: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    ) -> "WellResults":
+        """
+        Create the store from its columns (e.g. of a saved snapshot, see columns).
+
+        Args:
+            wells: Well IDs
+            columns: Array of every feature and flag (FEATURE_COLUMNS and FLAG_COLUMNS), in the
+                order of `wells`; missing columns keep their default (NaN or False)
+            positions: (rows, columns) of the wells on the plate; parsed from the IDs if None
+
+        Returns:
+            WellResults with the given values
+        """
+        results = cls(wells, positions)
+        for name, values in columns.items():
+            if name not in results._columns:
+                raise ValueError(f"Unknown results column: {name}")
+            results._columns[name][:] = values
+        return results
+
+    def __len__(self) -> int:
+        return len(self.wells)
+
+    def __contains__(self, well_id: str) -> bool:
+        return well_id in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.wells)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory usage of the feature and flag arrays in bytes."""
+        return int(sum(values.nbytes for values in self._columns.values()))
+
+    def set_features(
+        self,
+        well_id: str,
+        features: Dict[str, Any],
+        smoothing: float,
+        min_temp: Optional[float],
+        max_temp: Optional[float],
+        is_empty: Optional[bool] = None,
+        reviewed: Optional[bool] = None,
+    ) -> None:
+        """
+        Store the features of a well.
+
+        Args:
+            well_id: Well ID
+            features: Dictionary returned by get_dsf_curve_features
+            smoothing: Smoothing factor the features were calculated with
+            min_temp: Minimum temperature of the analysis range
+            max_temp: Maximum temperature of the analysis range
+            is_empty: New atypical flag; keeps the current flag if None
+            reviewed: New reviewed flag; keeps the current flag if None
+        """
+        i = self._index[well_id]
+        record = to_well_result(
+            features,
+            is_empty=self._columns["is_empty"][i] if is_empty is None else is_empty,
+            smoothing=smoothing,
+            min_temp=min_temp,
+            max_temp=max_temp,
+            reviewed=self._columns["reviewed"][i] if reviewed is None else reviewed,
+        )
+        for name in FEATURE_COLUMNS + FLAG_COLUMNS:
+            self._columns[name][i] = record[name]
+        self.version += 1
+
+    def set_flag(self, well_id: str, name: str, value: bool) -> None:
+        """Set the 'is_empty' or 'reviewed' flag of a well."""
+        self._columns[name][self._index[well_id]] = value
+        self.version += 1
+
+    def get(self, well_id: str) -> Dict[str, Any]:
+        """Get the stored features and flags of a well as a dictionary."""
+        i = self._index[well_id]
+        record: Dict[str, Any] = {name: float(self._columns[name][i]) for name in FEATURE_COLUMNS}
+        record.update({name: bool(self._columns[name][i]) for name in FLAG_COLUMNS})
+        return record
+
+    @property
+    def columns(self) -> Dict[str, np.ndarray]:
+        """All features and flags by name; the arrays must not be modified."""
+        return dict(self._columns)
+
+    def column(self, name: str) -> np.ndarray:
+        """Get a feature or flag for all wells (in the order of `wells`); must not be modified."""
+        return self._columns[name]
+
+    def to_dataframe(self, wells: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Build the results table.
+
+        Args:
+            wells: Wells (rows) of the table; wells without results get NaN features. Defaults to
+                the wells of the store.
+
+        Returns:
+            DataFrame with one row per well
+        """
+        if wells is None:
+            wells = self.wells
+        positions = np.array([self._index.get(well, -1) for well in wells], dtype=int)
+        found = positions >= 0
+
+        table = {"well": list(wells)}
+        for name in FLAG_COLUMNS + FEATURE_COLUMNS:
+            values = np.full(len(wells), np.nan if name in FEATURE_COLUMNS else False)
+            values[found] = self._columns[name][positions[found]]
+            table[name] = values
+        return pd.DataFrame(table)[["well", "reviewed", "is_empty"] + FEATURE_COLUMNS]
+
+    def to_plate_format(
+        self, name: str, plate_size: int, mask_empty: bool = False
+    ) -> Tuple[np.ndarray, List[str], List[str]]:
+        """
+        Arrange a feature on the plate layout (e.g. for create_plate_heatmap).
+
+        Args:
+            name: Feature column
+            plate_size: Number of wells on the plate
+            mask_empty: If True, atypical wells are set to NaN
+
+        Returns:
+            Tuple of (plate_data, column labels, row labels)
+        """
+        values = self._columns[name].astype(float)
+        if mask_empty:
+            values = np.where(self._columns["is_empty"], np.nan, values)
+
+        return to_plate_matrix(self.positions, values, plate_size)
+
+
+def build_results_table(results: WellResults, wells: List[str]) -> pd.DataFrame:
+    """
+    Build the results table in the format of the downloadable CSV file.
+
+    Args:
+        results: Analysis results
+        wells: Wells (rows) of the table
+
+    Returns:
+        DataFrame with one row per well
+    """
+    results_df = results.to_dataframe(wells)
+
+    # temp solution until it's updated everywhere in the code
+    return results_df.rename(
+        columns={
+            "is_empty": "atypical",
+        }
+    )
@@ -0,0 +1,124 @@
+"""
+Vectorized shape distances as a fast alternative to DTW.
+
+Instead of aligning every curve with the reference point by point, the curves are compared by
+their normalized cross-correlation with the reference, which is computed for all wells at once
+with FFTs. The maximum over shifts of up to MAX_SHIFT degrees is used, so wells with a shifted
+melting transition (i.e. a different Tm) still have a similar shape; the distance is
+1 - correlation (0 for identical shapes, about 1 for unrelated signals such as empty wells).
+"""
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from analysis.dense import DenseCurves
+from analysis.plate import PlateData
+from analysis.preview import smooth_signals
+from profiling import timed
+
+# similarity measures of the Detect Atypical Wells page
+SIMILARITY_MODES = {
+    "dtw": "DTW",
+    "correlation": "Correlation",
+    "derivative": "Derivative correlation",
+}
+
+# (lower, upper) thresholds of each measure
+DEFAULT_THRESHOLDS = {
+    "dtw": (0.5, 1.5),
+    "correlation": (0.3, 0.6),
+    "derivative": (0.4, 0.7),
+}
+
+# maximum shift of the curves against the reference in degrees
+MAX_SHIFT = 10.0
+
+
+def shifted_correlation_distances(
+    values: np.ndarray, reference: np.ndarray, max_lag: int
+) -> np.ndarray:
+    """
+    1 - maximum normalized cross-correlation of each row with the reference.
+
+    Args:
+        values: Signals as 2D array (one per row)
+        reference: Reference signal with the same number of points
+        max_lag: Largest shift (in data points) in either direction
+
+    Returns:
+        Distance of each row; constant rows get a distance of 1
+    """
+    n_points = values.shape[1]
+    centered = values - values.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(centered, axis=1, keepdims=True)
+    centered = np.divide(centered, norms, out=np.zeros_like(centered), where=norms > 0)
+
+    reference = reference - reference.mean()
+    reference_norm = np.linalg.norm(reference)
+    if reference_norm == 0:
+        raise ValueError("Cannot correlate with a constant reference signal")
+    reference = reference / reference_norm
+
+    # zero-padded, so the circular correlation equals the linear one for all lags
+    size = 1 << int(np.ceil(np.log2(2 * n_points - 1)))
+    spectrum = np.fft.rfft(centered, size, axis=1) * np.conj(np.fft.rfft(reference, size))
+    correlation = np.fft.irfft(spectrum, size, axis=1)
+
+    max_lag = min(max_lag, n_points - 1)
+    lags = np.r_[0 : max_lag + 1, size - max_lag : size]
+    # rounding can push the correlation of identical shapes slightly above 1
+    return np.clip(1.0 - correlation[:, lags].max(axis=1), 0.0, 2.0)
+
+
+@timed("get_correlation_distances")
+def get_correlation_distances(
+    curves: Union[DenseCurves, PlateData],
+    reference_well: str,
+    min_temp: float,
+    max_temp: float,
+    derivative: bool = False,
+    max_shift: float = MAX_SHIFT,
+    reference_signal: Optional[np.ndarray] = None,
+) -> Dict[str, Tuple[float, str]]:
+    """
+    Correlation distance of all wells from the reference well.
+
+    Args:
+        curves: Dense matrix of all curves (a PlateData is converted to one)
+        reference_well: Well to compare against (or the name of `reference_signal`)
+        min_temp: Minimum temperature of the compared range
+        max_temp: Maximum temperature of the compared range
+        derivative: Compare the derivatives of the smoothed curves instead of the curves
+        max_shift: Maximum shift of the curves against the reference in degrees
+        reference_signal: Signal to compare against instead of the curve of `reference_well`
+            (e.g. the consensus of the control wells), sampled at the temperatures of the range
+
+    Returns:
+        Dictionary mapping well IDs to (distance, reference_well), in the format of
+        get_dtw_distances
+    """
+    if isinstance(curves, PlateData):
+        curves = DenseCurves.from_plate(curves, curves.wells)
+
+    temperatures, values = curves.get_window(min_temp, max_temp)
+    if len(temperatures) < 2:
+        raise ValueError(f"Less than two data points between {min_temp} and {max_temp} °C")
+    values = values.astype(float)
+    if reference_signal is None:
+        reference = values[curves.row_index(reference_well)]
+    else:
+        reference = np.asarray(reference_signal, dtype=float)
+        if len(reference) != len(temperatures):
+            raise ValueError("The reference signal must have one value per temperature")
+    if derivative:
+        values = np.gradient(smooth_signals(values), temperatures, axis=1)
+        reference = np.gradient(smooth_signals(reference), temperatures)
+
+    step = float(np.median(np.diff(temperatures)))
+    distances = shifted_correlation_distances(values, reference, int(round(max_shift / step)))
+    if reference_signal is None:
+        distances[curves.row_index(reference_well)] = 0.0
+
+    return {
+        well: (float(distance), reference_well) for well, distance in zip(curves.wells, distances)
+    }
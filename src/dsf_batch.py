@@ -0,0 +1,142 @@
+"""
+Headless batch analysis of many DSF plates.
+
+Runs the same analysis as the app (parsing, control analysis, detection of atypical wells and
+feature extraction) for every plate and writes one results file per plate plus a combined file.
+
+Example:
+    python src/dsf_batch.py "exports/*.csv" --format "QuantStudio 7" --controls A1 A2 A3 \\
+        --min-temp 35 --max-temp 85 --output-dir results
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import glob
+import logging
+import multiprocessing
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+
+from analysis.ingest import SUPPORTED_FORMATS
+from analysis.parallel import resolve_max_workers
+from analysis.pipeline import AnalysisSettings, analyze_plate
+
+logger = logging.getLogger("dsf_batch")
+
+
+def collect_input_files(inputs: List[str]) -> List[Path]:
+    """
+    Expand directories and glob patterns into a sorted list of export files.
+
+    Args:
+        inputs: Files, directories (all .csv/.txt files inside) or glob patterns
+
+    Returns:
+        Sorted list of unique file paths
+    """
+    files = set()
+    for entry in inputs:
+        path = Path(entry)
+        if path.is_dir():
+            files.update(p for p in path.iterdir() if p.suffix.lower() in (".csv", ".txt"))
+        elif path.is_file():
+            files.add(path)
+        else:
+            files.update(Path(match) for match in glob.glob(entry) if Path(match).is_file())
+    return sorted(files)
+
+
+def process_plate(path: Path, settings: AnalysisSettings, output_dir: Path) -> pd.DataFrame:
+    """Analyze a single plate and write its results file (executed in a worker process)."""
+    results_df = analyze_plate(path.read_bytes(), settings)
+    results_df.to_csv(output_dir / f"{path.stem}_results.csv", index=False)
+    return results_df
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("inputs", nargs="+", help="Export files, directories or glob patterns")
+    parser.add_argument("--format", required=True, choices=SUPPORTED_FORMATS, dest="file_format")
+    parser.add_argument("--controls", required=True, nargs="+", help="Control wells")
+    parser.add_argument("--reference", help="Reference well for DTW (default: first control)")
+    parser.add_argument("--lower-threshold", type=float, default=0.5, help="Typical/undecided")
+    parser.add_argument("--upper-threshold", type=float, default=1.5, help="Undecided/atypical")
+    parser.add_argument(
+        "--dtw-window", type=int, help="Sakoe-Chiba window (data points, 0 = no window)"
+    )
+    parser.add_argument("--smoothing", type=float, default=0.01, help="Spline smoothing factor")
+    parser.add_argument("--min-temp", type=float, help="Minimum temperature (default: data min)")
+    parser.add_argument("--max-temp", type=float, help="Maximum temperature (default: data max)")
+    parser.add_argument(
+        "--workers", type=int, help="Number of plates processed in parallel (default: all CPUs)"
+    )
+    parser.add_argument("--output-dir", type=Path, default=Path("dsf_results"))
+    parser.add_argument(
+        "--combined-file", default="combined_results.csv", help="Name of the combined results file"
+    )
+    args = parser.parse_args(argv)
+    # like in the app, a window of 0 means unconstrained DTW
+    if args.dtw_window is not None:
+        if args.dtw_window < 0:
+            parser.error("--dtw-window must be 0 (no window) or a positive number of data points")
+        args.dtw_window = args.dtw_window or None
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    args = parse_args(argv)
+
+    files = collect_input_files(args.inputs)
+    if not files:
+        logger.error("No input files found")
+        return 1
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    settings = AnalysisSettings(
+        file_format=args.file_format,
+        control_wells=args.controls,
+        reference_well=args.reference,
+        dtw_lower_threshold=args.lower_threshold,
+        dtw_upper_threshold=args.upper_threshold,
+        dtw_window=args.dtw_window,
+        smoothing=args.smoothing,
+        min_temp=args.min_temp,
+        max_temp=args.max_temp,
+        # the plates are processed in parallel, so each plate is analyzed in a single process
+        max_workers=1,
+    )
+
+    all_results = {}
+    failed = []
+    max_workers = min(resolve_max_workers(args.workers), len(files))
+    with ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        futures = {
+            executor.submit(process_plate, path, settings, args.output_dir): path for path in files
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                all_results[path] = future.result()
+                logger.info("Processed %s", path)
+            except Exception as e:
+                failed.append(path)
+                logger.error("Failed to process %s: %s", path, e)
+
+    if all_results:
+        combined = pd.concat(
+            [results.assign(plate=path.stem) for path, results in sorted(all_results.items())],
+            ignore_index=True,
+        )
+        combined = combined[["plate"] + [col for col in combined.columns if col != "plate"]]
+        combined.to_csv(args.output_dir / args.combined_file, index=False)
+
+    logger.info("Processed %d plates, %d failed", len(all_results), len(failed))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,11 +1,16 @@
-from pathlib import Path
-
-from bada.parsers import LightCycler480Parser, QuantStudio7Parser
 import streamlit as st
 
+from analysis.dense import DenseCurves
+from analysis.ingest import SUPPORTED_FORMATS, parse_cache
+from profiling import timed
 from session.state_manager import SessionStateManager
-from session.utils import validate_page_access
-from utils import natural_sort_wells
+from session.snapshot import SNAPSHOT_EXTENSION
+from session.utils import (
+    restore_snapshot,
+    show_profiling_panel,
+    show_snapshot_download,
+    validate_page_access,
+)
 
 st.set_page_config(
     layout="wide",
@@ -17,8 +22,6 @@ if not validate_page_access("upload_data"):
 
 st.title("Upload Data")
 
-SUPPORTED_FORMATS = ["QuantStudio 7", "LightCycler 480"]
-
 current_format = SessionStateManager.get_value("file_format")
 file_format = st.radio(
     "Select file format",
@@ -43,34 +46,33 @@ if SessionStateManager.has_data():
     st.subheader("Data preview")
     st.dataframe(SessionStateManager.get_value("data").head())
 
-if uploaded_file is not None:
+# the uploader keeps the file, so it is only loaded again if the file or the format changed (which
+# would otherwise replace the analysis on every rerun, e.g. a restored snapshot)
+if uploaded_file is not None and (
+    (uploaded_file.file_id, file_format) != SessionStateManager.get_value("loaded_data")
+):
     try:
-        temp_path = Path("temp_dsf_file.csv")
-        temp_path.write_bytes(uploaded_file.getvalue())
-
-        if file_format == "QuantStudio 7":
-            validated_data = QuantStudio7Parser(temp_path).parse()
-            plate_size = 384  # QuantStudio 7 uses only(?) 384-well plates
-
-        else:
-            validated_data = LightCycler480Parser(temp_path).parse()
-            num_wells = validated_data["well_position"].nunique()
-            plate_size = 384 if num_wells > 96 else 96
-
-        temp_path.unlink()
+        # the plate is indexed by well once (so that the other pages don't have to filter the full
+        # data) and shared with other sessions that upload the same file
+        with timed("parse_dsf_file"):
+            plate, plate_size = parse_cache.get_or_parse(uploaded_file.getvalue(), file_format)
 
         # reset all state since we have new data, then set the new values
         SessionStateManager.reset_all()
 
-        SessionStateManager.set_value("data", validated_data)
+        SessionStateManager.set_value("data", plate.data)
+        SessionStateManager.set_value("plate", plate)
         SessionStateManager.set_value("file_format", file_format)
-        SessionStateManager.set_value(
-            "available_wells",
-            natural_sort_wells(list(validated_data["well_position"].unique()))
-        )
+        available_wells = plate.wells
+        SessionStateManager.set_value("available_wells", available_wells)
+        if SessionStateManager.get_value("use_dense_curves"):
+            with timed("DenseCurves.from_plate"):
+                dense_curves = DenseCurves.from_plate(plate, available_wells)
+            SessionStateManager.set_value("dense_curves", dense_curves)
         SessionStateManager.set_value("plate_size", plate_size)
-        SessionStateManager.set_value("min_temp", float(validated_data["temperature"].min()))
-        SessionStateManager.set_value("max_temp", float(validated_data["temperature"].max()))
+        SessionStateManager.set_value("min_temp", plate.min_temperature)
+        SessionStateManager.set_value("max_temp", plate.max_temperature)
+        SessionStateManager.set_value("loaded_data", (uploaded_file.file_id, file_format))
 
         st.success(f"""
             File uploaded and validated successfully!
@@ -79,8 +81,37 @@ if uploaded_file is not None:
         """)
 
         st.subheader("Data preview (already reformatted)")
-        st.dataframe(validated_data.head())
+        st.dataframe(plate.data.head())
 
     except Exception as e:
         st.error(f"Error processing file: {str(e)}")
         SessionStateManager.reset_all()
+
+with st.expander("Load a saved analysis"):
+    snapshot_file = st.file_uploader(
+        "Upload snapshot",
+        type=[SNAPSHOT_EXTENSION],
+        help="""A snapshot saved with "Save analysis" in the sidebar. It restores the data, the
+        settings and the results of all pages without recalculating them.""",
+    )
+    # the uploader keeps the file, so it is only restored once
+    if snapshot_file is not None and (
+        snapshot_file.file_id != SessionStateManager.get_value("loaded_snapshot")
+    ):
+        try:
+            restore_snapshot(snapshot_file.getvalue())
+        except Exception as e:
+            st.error(f"Error loading the snapshot: {str(e)}")
+        else:
+            SessionStateManager.set_value("loaded_snapshot", snapshot_file.file_id)
+            # the data preview above still shows the previous data
+            st.rerun()
+    elif snapshot_file is not None:
+        st.success(f"""
+            Analysis restored from {snapshot_file.name}:
+            - Format: {SessionStateManager.get_value("file_format")}
+            - Plate size: {SessionStateManager.get_value("plate_size")}-well
+        """)
+
+show_snapshot_download()
+show_profiling_panel()
@@ -1,11 +1,18 @@
-from bada.processing import get_dsf_curve_features
 from bada.visualization import create_melt_curve_plot_from_features
 import pandas as pd
 import streamlit as st
 
+from profiling import timed
 from session.state_manager import SessionStateManager
-from session.utils import validate_page_access
-from utils import natural_sort_wells
+from session.utils import (
+    show_feature_cache_stats,
+    show_parallel_settings,
+    show_precomputation_status,
+    show_profiling_panel,
+    show_snapshot_download,
+    start_precomputation,
+    validate_page_access,
+)
 
 st.set_page_config(
     layout="wide",
@@ -18,13 +25,24 @@ if not validate_page_access("control_analysis"):
 st.title("Control Analysis")
 
 def update_control_wells():
-    SessionStateManager.set_value("control_wells", st.session_state.control_wells_widget)
+    # kept in plate order, so the selectbox lists the controls in the same order
+    plate = SessionStateManager.get_value("plate")
+    SessionStateManager.set_value(
+        "control_wells", plate.sort_wells(st.session_state.control_wells_widget)
+    )
+    SessionStateManager.cancel_precomputation()
+    # the consensus reference of the atypical well detection depends on the control wells
+    SessionStateManager.set_value("dtw_distance_cache", None)
+    SessionStateManager.set_value("dtw_distances", None)
     SessionStateManager.set_value("control_results", None)
     SessionStateManager.set_value("avg_control_tm", None)
     SessionStateManager.set_value("plot_data", None)
 
 
 def update_analysis():
+    # the selected control is the default reference of the precomputed DTW distances
+    if st.session_state.selected_control_widget != SessionStateManager.get_value("selected_control"):
+        SessionStateManager.cancel_precomputation()
     SessionStateManager.set_value("selected_control", st.session_state.selected_control_widget)
     SessionStateManager.set_value("smoothing_control", st.session_state.smoothing_control_widget)
     SessionStateManager.set_value("control_results", None)
@@ -47,6 +65,7 @@ def update_temperature():
         # update temperature values
         SessionStateManager.set_value("min_temp", st.session_state.min_temp_widget)
         SessionStateManager.set_value("max_temp", st.session_state.max_temp_widget)
+        SessionStateManager.cancel_precomputation()
         
         # clear control analysis results since they depend on temperature range
         SessionStateManager.set_value("control_results", None)
@@ -55,14 +74,15 @@ def update_temperature():
         
         # clear DTW-related session state variables to force recalculation
         SessionStateManager.set_value("dtw_distances", None)
+        SessionStateManager.set_value("dtw_distance_cache", None)
         SessionStateManager.set_value("plate_data", None)
                 
         # clear well classifications since they depend on DTW distances
-        SessionStateManager.set_value("dtw_filled_wells", [])
-        SessionStateManager.set_value("dtw_undecided_wells", [])
-        SessionStateManager.set_value("dtw_empty_wells", [])
+        SessionStateManager.set_value("well_classification", None)
         
         # clear well analysis results since they depend on temperature range
+        SessionStateManager.cancel_precomputation("well_analysis_job")
+        SessionStateManager.set_value("well_analysis_pending", set())
         SessionStateManager.set_value("well_analysis_results", None)
 
 control_col1, control_col2 = st.columns([0.7, 0.3])
@@ -70,8 +90,8 @@ control_col1, control_col2 = st.columns([0.7, 0.3])
 with control_col1:
     st.multiselect(
         "Select control wells",
-        options=natural_sort_wells(SessionStateManager.get_value("available_wells")),
-        default=natural_sort_wells(SessionStateManager.get_value("control_wells")),
+        options=SessionStateManager.get_value("available_wells"),
+        default=SessionStateManager.get_value("control_wells"),
         key="control_wells_widget",
         on_change=update_control_wells,
         help="Select one or more wells that contain control measurements",
@@ -99,7 +119,7 @@ with control_col2:
 
     st.selectbox(
         "Select control well",
-        options=natural_sort_wells(control_wells),
+        options=control_wells,
         index=selected_index,
         help="Select a control well to view its analysis results",
         key="selected_control_widget",
@@ -121,12 +141,12 @@ with controls_col1:
         key="smoothing_control_widget",
     )
 
-data = SessionStateManager.get_value("data")
+plate = SessionStateManager.get_value("plate")
 with controls_col2:
     st.number_input(
         "Minimum temperature (°C)",
-        min_value=float(data["temperature"].min()),
-        max_value=float(data["temperature"].max()),
+        min_value=plate.min_temperature,
+        max_value=plate.max_temperature,
         value=SessionStateManager.get_value("min_temp"),
         step=1.0,
         key="min_temp_widget",
@@ -140,8 +160,8 @@ with controls_col2:
 with controls_col3:
     st.number_input(
         "Maximum temperature (°C)",
-        min_value=float(data["temperature"].min()),
-        max_value=float(data["temperature"].max()),
+        min_value=plate.min_temperature,
+        max_value=plate.max_temperature,
         value=SessionStateManager.get_value("max_temp"),
         step=1.0,
         key="max_temp_widget",
@@ -153,16 +173,17 @@ with controls_col3:
     )
 
 selected_control = SessionStateManager.get_value("selected_control")
-well_data = data[data["well_position"] == selected_control]
-plot_data = get_dsf_curve_features(
-    data=well_data,
-    min_temp=SessionStateManager.get_value("min_temp"),
-    max_temp=SessionStateManager.get_value("max_temp"),
-    smoothing=SessionStateManager.get_value("smoothing_control"),
-    avg_control_tm=SessionStateManager.get_value("avg_control_tm"),
-)
-
-fig = create_melt_curve_plot_from_features(plot_data)
+feature_cache = SessionStateManager.get_feature_cache()
+fit_settings = {
+    "min_temp": SessionStateManager.get_value("min_temp"),
+    "max_temp": SessionStateManager.get_value("max_temp"),
+    "smoothing": SessionStateManager.get_value("smoothing_control"),
+    "avg_control_tm": SessionStateManager.get_value("avg_control_tm"),
+}
+plot_data = feature_cache.get(plate, selected_control, **fit_settings)
+
+with timed("create_melt_curve_plot_from_features"):
+    fig = create_melt_curve_plot_from_features(plot_data)
 
 plot_col, metrics_col = st.columns([0.85, 0.15])
 
@@ -184,15 +205,17 @@ if SessionStateManager.get_value("control_results") is None:
     total_tm = 0
     control_wells = SessionStateManager.get_value("control_wells")
 
-    for well in control_wells:
-        single_well_data = data[data["well_position"] == well]
-        well_data = get_dsf_curve_features(
-            data=single_well_data,
-            min_temp=SessionStateManager.get_value("min_temp"),
-            max_temp=SessionStateManager.get_value("max_temp"),
-            smoothing=SessionStateManager.get_value("smoothing_control"),
-        )
+    control_features = feature_cache.get_many(
+        plate,
+        control_wells,
+        min_temp=SessionStateManager.get_value("min_temp"),
+        max_temp=SessionStateManager.get_value("max_temp"),
+        smoothing=SessionStateManager.get_value("smoothing_control"),
+        max_workers=SessionStateManager.get_value("max_workers"),
+        chunk_size=SessionStateManager.get_value("chunk_size"),
+    )
 
+    for well, well_data in control_features.items():
         control_results.append(
             {
                 "Well": well,
@@ -215,4 +238,14 @@ if SessionStateManager.get_value("control_results") is None:
 st.subheader("Summary of control wells")
 st.dataframe(pd.DataFrame(SessionStateManager.get_value("control_results")))
 
-st.info(f"Average Tm of control wells: {SessionStateManager.get_value('avg_control_tm'):.2f}°C")
+avg_control_tm = SessionStateManager.get_value("avg_control_tm")
+st.info(f"Average Tm of control wells: {avg_control_tm:.2f}°C")
+
+# the DTW distances and features of the next pages are calculated while the controls are reviewed
+start_precomputation()
+
+show_precomputation_status()
+show_feature_cache_stats()
+show_parallel_settings()
+show_snapshot_download()
+show_profiling_panel()
@@ -1,12 +1,37 @@
-from bada.processing import get_dtw_distances_from_reference
-from bada.utils.reformatting import convert_distances_to_plate_format
-from bada.visualization import create_heatmap_plot
+import numpy as np
 import pandas as pd
+from scipy.stats import spearmanr
 import streamlit as st
 
+from analysis.classification import (
+    ATYPICAL,
+    LABEL_NAMES,
+    TYPICAL,
+    UNDECIDED,
+    WellClassification,
+    get_agreement_table,
+)
+from analysis.clustering import (
+    LINKAGE_METHODS,
+    cluster_wells,
+    get_cluster_summary,
+    get_pairwise_dtw_distances,
+)
+from analysis.consensus import CONSENSUS_REFERENCE, get_consensus_curve
+from analysis.dense import DenseCurves
+from analysis.dtw import get_dtw_distances
+from analysis.heatmap import create_distance_matrix_heatmap, create_plate_heatmap
+from analysis.histogram import create_distance_histogram
+from analysis.layout import to_plate_matrix
+from analysis.similarity import SIMILARITY_MODES, get_correlation_distances
+from profiling import timed
 from session.state_manager import SessionStateManager
-from session.utils import validate_page_access
-from utils import natural_sort_wells
+from session.utils import (
+    show_parallel_settings,
+    show_profiling_panel,
+    show_snapshot_download,
+    validate_page_access,
+)
 
 st.set_page_config(
     layout="wide",
@@ -18,51 +43,324 @@ st.title("Detect Atypical Wells")
 if not validate_page_access("detect_atypical_wells"):
     st.stop()
 
+def get_thresholds(mode):
+    """Get the (lower, upper) thresholds of a similarity measure."""
+    if mode == "dtw":
+        return (
+            SessionStateManager.get_value("dtw_lower_threshold"),
+            SessionStateManager.get_value("dtw_upper_threshold"),
+        )
+    return SessionStateManager.get_value("correlation_thresholds")[mode]
+
+
+def update_similarity_mode():
+    """Switch the similarity measure; the classification is rebuilt from its distances."""
+    SessionStateManager.set_value("similarity_mode", st.session_state.similarity_mode_widget)
+    SessionStateManager.set_value("well_classification", None)
+    SessionStateManager.set_value("plate_data", None)
+
+    # the threshold inputs are recreated with the thresholds of the new measure
+    st.session_state.pop("lower_threshold_widget", None)
+    st.session_state.pop("upper_threshold_widget", None)
+
+
 def update_thresholds():
     """Update threshold values in session state when changed."""
-    SessionStateManager.set_value(
-        "dtw_lower_threshold", st.session_state.dtw_lower_threshold_widget
-    )
-    SessionStateManager.set_value(
-        "dtw_upper_threshold", st.session_state.dtw_upper_threshold_widget
+    mode = SessionStateManager.get_value("similarity_mode")
+    lower_threshold = st.session_state.lower_threshold_widget
+    upper_threshold = st.session_state.upper_threshold_widget
+    if mode != "dtw":
+        thresholds = dict(SessionStateManager.get_value("correlation_thresholds"))
+        thresholds[mode] = (lower_threshold, upper_threshold)
+        SessionStateManager.set_value("correlation_thresholds", thresholds)
+        return
+
+    SessionStateManager.set_value("dtw_lower_threshold", lower_threshold)
+    SessionStateManager.set_value("dtw_upper_threshold", upper_threshold)
+
+    # the distance of pruned wells is unknown beyond the threshold used for pruning, which is not
+    # enough to classify them once the upper threshold is raised above it
+    prune_threshold = SessionStateManager.get_value("dtw_prune_threshold")
+    if prune_threshold is not None and upper_threshold > prune_threshold:
+        SessionStateManager.set_value("dtw_distances", None)
+        SessionStateManager.set_value("well_classification", None)
+        SessionStateManager.set_value("plate_data", None)
+
+
+def update_dtw_window():
+    """Update the Sakoe-Chiba window and force the recalculation of the DTW distances."""
+    window = st.session_state.dtw_window_widget
+    SessionStateManager.set_value("dtw_window", int(window) if window > 0 else None)
+    SessionStateManager.set_value("dtw_distances", None)
+    SessionStateManager.set_value("well_classification", None)
+    SessionStateManager.set_value("plate_data", None)
+
+
+def update_reference():
+    """Switch the reference; the distances of references used before are cached."""
+    SessionStateManager.set_value("dtw_reference", st.session_state.dtw_reference_widget)
+
+
+def get_reference():
+    """Get the reference of the distances: a control well or the consensus of all controls."""
+    reference = SessionStateManager.get_value("dtw_reference")
+    control_wells = SessionStateManager.get_value("control_wells")
+    if reference == CONSENSUS_REFERENCE or reference in control_wells:
+        return reference
+    return SessionStateManager.get_value("selected_control")
+
+
+def format_reference(reference):
+    if reference == CONSENSUS_REFERENCE:
+        return "Consensus of all control wells"
+    return reference
+
+
+def get_finite_distances(distances):
+    """Replace the infinite distances of pruned wells with NaN, so they are shown like no value."""
+    return np.where(np.isfinite(distances), distances, np.nan)
+
+
+def get_consensus():
+    """Get the consensus curve of the control wells, recalculated only if its inputs changed."""
+    control_wells = SessionStateManager.get_value("control_wells")
+    min_temp = SessionStateManager.get_value("min_temp")
+    max_temp = SessionStateManager.get_value("max_temp")
+    window = SessionStateManager.get_value("dtw_window")
+    key = (tuple(control_wells), min_temp, max_temp, window)
+
+    cached = SessionStateManager.get_value("consensus_curve")
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    curves = SessionStateManager.get_value("dense_curves")
+    if curves is None:
+        curves = DenseCurves.from_plate(
+            SessionStateManager.get_value("plate"), SessionStateManager.get_value("available_wells")
+        )
+        SessionStateManager.set_value("dense_curves", curves)
+    consensus = get_consensus_curve(curves, control_wells, min_temp, max_temp, window=window)
+    SessionStateManager.set_value("consensus_curve", (key, consensus))
+    return consensus
+
+
+def get_reference_distances(reference, calculate=True):
+    """
+    Get the DTW distances from a reference, calculated once per reference and settings.
+
+    Returns:
+        Tuple of (distances, pruned wells, pruning threshold); None if the distances are not
+        cached and `calculate` is False
+    """
+    min_temp = SessionStateManager.get_value("min_temp")
+    max_temp = SessionStateManager.get_value("max_temp")
+    window = SessionStateManager.get_value("dtw_window")
+    upper_threshold = SessionStateManager.get_value("dtw_upper_threshold")
+
+    # distances pruned at a higher threshold are still exact up to the current one
+    dtw_distance_cache = SessionStateManager.get_dtw_distance_cache()
+    key = (reference, min_temp, max_temp, window)
+    cached = dtw_distance_cache.get(key)
+    if cached is not None and cached[2] >= upper_threshold:
+        return cached
+    if not calculate:
+        return None
+
+    # the exact distance of wells beyond the upper threshold is irrelevant for the classification
+    # with the dense matrix, the temperature range is a column slice instead of a filter
+    # taken from the background calculation of the Control Analysis page if it used these settings
+    precomputation = SessionStateManager.get_value("precomputation")
+    precomputed = None
+    if precomputation is not None and reference != CONSENSUS_REFERENCE:
+        precomputed = precomputation.get_dtw_distances(
+            reference, min_temp, max_temp, window, upper_threshold
+        )
+    if precomputed is not None:
+        dtw_distances, pruned_wells = precomputed
+    else:
+        curves = SessionStateManager.get_value("dense_curves")
+        if curves is None:
+            curves = SessionStateManager.get_value("plate")
+        dtw_distances, pruned_wells = get_dtw_distances(
+            curves,
+            reference,
+            min_temp=min_temp,
+            max_temp=max_temp,
+            window=window,
+            prune_above=upper_threshold,
+            max_workers=SessionStateManager.get_value("max_workers"),
+            reference_signal=get_consensus() if reference == CONSENSUS_REFERENCE else None,
+        )
+    dtw_distance_cache[key] = (dtw_distances, pruned_wells, upper_threshold)
+    return dtw_distance_cache[key]
+
+
+def get_pairwise_distances(calculate=True):
+    """
+    Get the DTW distances between all pairs of wells, calculated once per settings.
+
+    Returns:
+        PairwiseDistances; None if they are not cached and `calculate` is False
+    """
+    min_temp = SessionStateManager.get_value("min_temp")
+    max_temp = SessionStateManager.get_value("max_temp")
+    window = SessionStateManager.get_value("dtw_window")
+    key = (min_temp, max_temp, window)
+
+    cached = SessionStateManager.get_value("pairwise_dtw_distances")
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    if not calculate:
+        return None
+
+    curves = SessionStateManager.get_value("dense_curves")
+    if curves is None:
+        curves = SessionStateManager.get_value("plate")
+    pairwise = get_pairwise_dtw_distances(
+        curves,
+        min_temp,
+        max_temp,
+        window=window,
+        max_workers=SessionStateManager.get_value("max_workers"),
     )
+    SessionStateManager.set_value("pairwise_dtw_distances", (key, pairwise))
+    return pairwise
 
-reference_well = SessionStateManager.get_value("selected_control")
 
-# dtw_distances and plate_data can be reset in 2_Control_Analysis
-if SessionStateManager.get_value("dtw_distances") is None:
-    data = SessionStateManager.get_value("data")
+def update_clustering():
+    SessionStateManager.set_value("n_clusters", st.session_state.n_clusters_widget)
+    SessionStateManager.set_value("linkage_method", st.session_state.linkage_method_widget)
+
+
+def get_similarity_distances(mode, reference):
+    """Get the distances of a correlation measure, recalculated only if their inputs changed."""
     min_temp = SessionStateManager.get_value("min_temp")
     max_temp = SessionStateManager.get_value("max_temp")
-    
-    filtered_data = data[
-        (data["temperature"] >= min_temp) & (data["temperature"] <= max_temp)
-    ]
+    control_wells = SessionStateManager.get_value("control_wells")
+    window = SessionStateManager.get_value("dtw_window")
+    key = (mode, reference, tuple(control_wells), min_temp, max_temp, window)
+
+    cached = SessionStateManager.get_value("correlation_distances")
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    curves = SessionStateManager.get_value("dense_curves")
+    if curves is None:
+        curves = SessionStateManager.get_value("plate")
+    distances = get_correlation_distances(
+        curves,
+        reference,
+        min_temp,
+        max_temp,
+        derivative=mode == "derivative",
+        reference_signal=get_consensus() if reference == CONSENSUS_REFERENCE else None,
+    )
+    SessionStateManager.set_value("correlation_distances", (key, distances))
+    SessionStateManager.set_value("well_classification", None)
+    SessionStateManager.set_value("plate_data", None)
+    return distances
+
+
+reference_well = get_reference()
+similarity_mode = SessionStateManager.get_value("similarity_mode")
+distance_name = f"{SIMILARITY_MODES[similarity_mode]} distance"
+
+reference_options = [CONSENSUS_REFERENCE] + SessionStateManager.get_value("control_wells")
+st.selectbox(
+    "Reference",
+    options=reference_options,
+    index=reference_options.index(reference_well),
+    format_func=format_reference,
+    key="dtw_reference_widget",
+    on_change=update_reference,
+    help="""The wells are compared with a control well or with the consensus of all control wells
+    (their DTW barycenter average), which is less sensitive to a single noisy control.""",
+)
 
-    dtw_distances = get_dtw_distances_from_reference(
-        filtered_data, reference_well, normalized=True
+st.radio(
+    "Similarity measure",
+    options=list(SIMILARITY_MODES),
+    format_func=SIMILARITY_MODES.get,
+    index=list(SIMILARITY_MODES).index(similarity_mode),
+    horizontal=True,
+    key="similarity_mode_widget",
+    on_change=update_similarity_mode,
+    help="""DTW aligns every curve with the reference curve point by point. The correlation
+    measures compare the shape of the curves (or of their derivatives) with a single vectorized
+    calculation for the whole plate, which takes milliseconds instead of seconds; use the
+    agreement report below to check that they classify your plate like DTW.""",
+)
+
+if similarity_mode == "dtw":
+    distances, pruned_wells, prune_threshold = get_reference_distances(reference_well)
+    # dtw_distances and plate_data can be reset in 2_Control_Analysis
+    if distances is not SessionStateManager.get_value("dtw_distances"):
+        SessionStateManager.set_value("dtw_distances", distances)
+        SessionStateManager.set_value("dtw_pruned_wells", pruned_wells)
+        SessionStateManager.set_value("dtw_prune_threshold", prune_threshold)
+        SessionStateManager.set_value("well_classification", None)
+        SessionStateManager.set_value("plate_data", None)
+else:
+    distances = get_similarity_distances(similarity_mode, reference_well)
+
+# the distances are sorted once, the thresholds only move the class boundaries
+if SessionStateManager.get_value("well_classification") is None:
+    SessionStateManager.set_value(
+        "well_classification", WellClassification.from_dtw_distances(distances)
     )
-    SessionStateManager.set_value("dtw_distances", dtw_distances)
+classification = SessionStateManager.get_value("well_classification")
 
 if SessionStateManager.get_value("plate_data") is None:
-    dtw_distances = SessionStateManager.get_value("dtw_distances")
     plate_size = SessionStateManager.get_value("plate_size")
     
-    plate_data, cols, rows = convert_distances_to_plate_format(dtw_distances, plate_size)
+    # pruned wells (infinite DTW distance) are left blank like wells without a distance
+    with timed("to_plate_matrix"):
+        plate_data, cols, rows = to_plate_matrix(
+            SessionStateManager.get_value("plate").get_positions(classification.wells),
+            get_finite_distances(classification.distances),
+            plate_size,
+        )
     SessionStateManager.set_value("plate_data", plate_data)
     SessionStateManager.set_value("plate_cols", cols)
     SessionStateManager.set_value("plate_rows", rows)
 
-fig = create_heatmap_plot(
-    SessionStateManager.get_value("plate_data"),
-    SessionStateManager.get_value("plate_cols"),
-    SessionStateManager.get_value("plate_rows"),
-    title=f"Shape comparison with reference well {reference_well}",
-    colorbar_title="DTW Distance",
-)
+with timed("create_plate_heatmap"):
+    fig = create_plate_heatmap(
+        SessionStateManager.get_value("plate_data"),
+        SessionStateManager.get_value("plate_cols"),
+        SessionStateManager.get_value("plate_rows"),
+        title=(
+            "Shape comparison with the consensus of the control wells"
+            if reference_well == CONSENSUS_REFERENCE
+            else f"Shape comparison with reference well {reference_well}"
+        ),
+        colorbar_title=distance_name,
+    )
 
 st.plotly_chart(fig, use_container_width=True)
 
+pruned_wells = SessionStateManager.get_value("dtw_pruned_wells")
+if similarity_mode == "dtw" and pruned_wells:
+    st.caption(
+        f"{len(pruned_wells)} wells exceed the upper threshold by a lower bound of their distance; "
+        "their exact distance was not calculated, so they are blank in the heatmap and left out "
+        "of the distribution."
+    )
+
+with st.expander("DTW settings"):
+    dtw_window = SessionStateManager.get_value("dtw_window")
+    st.number_input(
+        "Sakoe-Chiba window (data points)",
+        min_value=0,
+        value=dtw_window if dtw_window is not None else 0,
+        step=1,
+        key="dtw_window_widget",
+        on_change=update_dtw_window,
+        help="""Limit how far the curves may be shifted against each other when they are aligned
+        (0 = no limit). A narrow window speeds up the calculation and allows to skip wells that
+        are clearly atypical, but very shifted melting transitions will appear less similar.""",
+    )
+
 st.subheader("Threshold selection")
 st.markdown("""
     Here you can set thresholds that are used to determine whether a signal is considered typical
@@ -76,16 +374,19 @@ st.markdown("""
     - if the distance is large, the shape of the curves are different (red wells)
 """)
 col1, col2 = st.columns(2)
+lower_threshold, upper_threshold = get_thresholds(similarity_mode)
+# correlation distances are between 0 and 2
+threshold_step = 0.1 if similarity_mode == "dtw" else 0.05
 
 with col1:
     st.number_input(
         "Lower threshold (typical/undecided)",
         min_value=0.0,
         max_value=10.0,
-        value=SessionStateManager.get_value("dtw_lower_threshold"),
-        step=0.1,
+        value=float(lower_threshold),
+        step=threshold_step,
         help="Wells below this threshold will be considered typical",
-        key="dtw_lower_threshold_widget",
+        key="lower_threshold_widget",
         on_change=update_thresholds,
     )
 
@@ -94,32 +395,32 @@ with col2:
         "Upper threshold (undecided/atypical)",
         min_value=0.0,
         max_value=10.0,
-        value=SessionStateManager.get_value("dtw_upper_threshold"),
-        step=0.1,
+        value=float(upper_threshold),
+        step=threshold_step,
         help="Wells above this threshold will be considered atypical",
-        key="dtw_upper_threshold_widget",
+        key="upper_threshold_widget",
         on_change=update_thresholds,
     )
 
-typical_wells = []
-undecided_wells = []
-atypical_wells = []
+lower_threshold, upper_threshold = get_thresholds(similarity_mode)
 
-dtw_distances = SessionStateManager.get_value("dtw_distances")
-lower_threshold = SessionStateManager.get_value("dtw_lower_threshold")
-upper_threshold = SessionStateManager.get_value("dtw_upper_threshold")
-
-for well, (distance, _) in dtw_distances.items():
-    if distance <= lower_threshold:
-        typical_wells.append(well)
-    elif distance >= upper_threshold:
-        atypical_wells.append(well)
-    else:
-        undecided_wells.append(well)
+# store well classifications for use in sample analysis
+classification.classify(lower_threshold, upper_threshold)
+SessionStateManager.set_value("well_classification", classification)
+typical_wells = classification.get_wells(TYPICAL)
+undecided_wells = classification.get_wells(UNDECIDED)
+atypical_wells = classification.get_wells(ATYPICAL)
 
-typical_wells = natural_sort_wells(typical_wells)
-undecided_wells = natural_sort_wells(undecided_wells)
-atypical_wells = natural_sort_wells(atypical_wells)
+st.plotly_chart(
+    create_distance_histogram(
+        classification.sorted_distances,
+        lower_threshold,
+        upper_threshold,
+        title=f"Distribution of the {distance_name}s",
+        distance_name=distance_name,
+    ),
+    use_container_width=True,
+)
 
 col1, col2, col3 = st.columns(3)
 
@@ -138,7 +439,187 @@ with col3:
     st.write(f"Number of atypical wells: {len(atypical_wells)}")
     st.dataframe(pd.DataFrame({"Well": atypical_wells}), use_container_width=True)
 
-# store well classifications for use in sample analysis
-SessionStateManager.set_value("dtw_filled_wells", typical_wells)
-SessionStateManager.set_value("dtw_undecided_wells", undecided_wells)
-SessionStateManager.set_value("dtw_empty_wells", atypical_wells)
+if similarity_mode != "dtw":
+    with st.expander("Agreement with DTW"):
+        st.markdown(f"""
+            Classification of the wells by DTW (with the DTW thresholds, rows) and by the
+            {SIMILARITY_MODES[similarity_mode].lower()} (columns).
+        """)
+        cached = get_reference_distances(reference_well, calculate=False)
+        if cached is None and st.button("Calculate DTW distances"):
+            cached = get_reference_distances(reference_well)
+
+        if cached is None:
+            st.write("The DTW distances have not been calculated for the current settings yet.")
+        else:
+            dtw_classification = WellClassification.from_dtw_distances(cached[0])
+            dtw_classification.classify(*get_thresholds("dtw"))
+            agreement_table = get_agreement_table(dtw_classification, classification)
+
+            metric_col1, metric_col2 = st.columns(2)
+            metric_col1.metric(
+                "Agreement",
+                f"{np.trace(agreement_table.to_numpy()) / len(classification):.1%}",
+                help="Fraction of the wells with the same classification",
+            )
+            # pruned wells have no exact DTW distance to rank
+            ranked = np.isfinite(dtw_classification.distances) & np.isfinite(
+                classification.distances
+            )
+            rank_correlation = spearmanr(
+                dtw_classification.distances[ranked], classification.distances[ranked]
+            )[0]
+            metric_col2.metric(
+                "Rank correlation",
+                f"{rank_correlation:.3f}",
+                help="""Spearman correlation of the distances of the wells with an exact DTW
+                distance (wells pruned beyond the upper DTW threshold are left out)""",
+            )
+            st.dataframe(agreement_table.rename_axis(index="DTW"), use_container_width=True)
+
+            differing = np.flatnonzero(dtw_classification.labels != classification.labels)
+            if len(differing):
+                st.write(f"Wells classified differently: {len(differing)}")
+                st.dataframe(
+                    pd.DataFrame({
+                        "Well": [classification.wells[i] for i in differing],
+                        "DTW": [LABEL_NAMES[dtw_classification.labels[i]] for i in differing],
+                        "DTW distance": get_finite_distances(
+                            dtw_classification.distances[differing]
+                        ),
+                        SIMILARITY_MODES[similarity_mode]: [
+                            LABEL_NAMES[classification.labels[i]] for i in differing
+                        ],
+                        distance_name.capitalize(): classification.distances[differing],
+                    }),
+                    use_container_width=True,
+                )
+
+with st.expander("DTW distances to each control well"):
+    control_wells = SessionStateManager.get_value("control_wells")
+    missing_controls = [
+        well for well in control_wells if get_reference_distances(well, calculate=False) is None
+    ]
+    if missing_controls and st.button(
+        f"Calculate the distances to all {len(control_wells)} control wells"
+    ):
+        for well in missing_controls:
+            get_reference_distances(well)
+        missing_controls = []
+
+    if missing_controls:
+        st.write(
+            "The distances of all wells to each control well are calculated once and cached, so "
+            "switching the reference between the control wells doesn't recalculate them."
+        )
+    else:
+        references = list(control_wells)
+        if get_reference_distances(CONSENSUS_REFERENCE, calculate=False) is not None:
+            references.append(CONSENSUS_REFERENCE)
+        # pruned wells (infinite distance) are shown as empty cells
+        control_distances = pd.DataFrame({
+            format_reference(reference): {
+                well: distance
+                for well, (distance, _) in get_reference_distances(reference)[0].items()
+            }
+            for reference in references
+        }).replace(np.inf, np.nan)
+        control_distances.index.name = "Well"
+
+        st.markdown("**Distances between the control wells**")
+        st.caption("A control with large distances to all other controls is a poor reference.")
+        st.dataframe(control_distances.loc[control_wells], use_container_width=True)
+
+        st.markdown("**Distances of all wells**")
+        st.caption(
+            "Pruned distances (beyond the upper threshold) were not calculated and are left empty."
+        )
+        st.dataframe(control_distances, use_container_width=True)
+
+with st.expander("Shape clusters"):
+    st.markdown("""
+        Groups of wells with similar curves, e.g. several wells with the same unusual
+        (biphasic or aggregating) shape. The DTW distances between all pairs of wells are
+        clustered hierarchically; the distance matrix is shown in the order of the clustering,
+        so every cluster is a block along its diagonal.
+    """)
+    pairwise = get_pairwise_distances(calculate=False)
+    if pairwise is None and st.button(
+        f"Calculate the DTW distances between all pairs of wells ({len(classification)} wells)"
+    ):
+        with st.spinner("Calculating the pairwise DTW distances..."):
+            pairwise = get_pairwise_distances()
+
+    if pairwise is None:
+        st.write("The pairwise distances have not been calculated for the current settings yet.")
+    else:
+        cluster_col1, cluster_col2 = st.columns(2)
+        with cluster_col1:
+            st.number_input(
+                "Number of clusters",
+                min_value=1,
+                max_value=max(1, len(pairwise)),
+                value=min(SessionStateManager.get_value("n_clusters"), len(pairwise)),
+                step=1,
+                key="n_clusters_widget",
+                on_change=update_clustering,
+            )
+        with cluster_col2:
+            linkage_method = SessionStateManager.get_value("linkage_method")
+            st.selectbox(
+                "Linkage",
+                options=list(LINKAGE_METHODS),
+                index=list(LINKAGE_METHODS).index(linkage_method),
+                format_func=LINKAGE_METHODS.get,
+                key="linkage_method_widget",
+                on_change=update_clustering,
+                help="""How the distance between two clusters is calculated from the distances
+                of their wells (average, largest, smallest or weighted average).""",
+            )
+
+        clusters, leaf_order = cluster_wells(
+            pairwise,
+            n_clusters=SessionStateManager.get_value("n_clusters"),
+            method=SessionStateManager.get_value("linkage_method"),
+        )
+
+        cluster_summary = pd.DataFrame(
+            get_cluster_summary(pairwise, clusters, SessionStateManager.get_value("control_wells"))
+        )
+        labels = np.array([classification.get_label(well) for well in pairwise.wells])
+        for label in (TYPICAL, UNDECIDED, ATYPICAL):
+            cluster_summary[LABEL_NAMES[label]] = [
+                int(np.sum(labels[clusters == cluster] == label))
+                for cluster in cluster_summary["Cluster"]
+            ]
+        st.dataframe(cluster_summary.set_index("Cluster"), use_container_width=True)
+
+        cluster_plate, cluster_cols, cluster_rows = to_plate_matrix(
+            SessionStateManager.get_value("plate").get_positions(pairwise.wells),
+            clusters.astype(float),
+            SessionStateManager.get_value("plate_size"),
+        )
+        st.plotly_chart(
+            create_plate_heatmap(
+                cluster_plate,
+                cluster_cols,
+                cluster_rows,
+                title="Shape clusters",
+                color_scale="Turbo",
+                colorbar_title="Cluster",
+                value_format=".0f",
+            ),
+            use_container_width=True,
+        )
+
+        with timed("create_distance_matrix_heatmap"):
+            fig = create_distance_matrix_heatmap(
+                pairwise.to_square(leaf_order),
+                [pairwise.wells[i] for i in leaf_order],
+                title="Pairwise DTW distances (in the order of the clustering)",
+            )
+        st.plotly_chart(fig, use_container_width=True)
+
+show_parallel_settings()
+show_snapshot_download()
+show_profiling_panel()
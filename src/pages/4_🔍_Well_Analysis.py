@@ -1,9 +1,24 @@
-from bada.processing import get_dsf_curve_features
 from bada.visualization import create_melt_curve_plot_from_features
 import streamlit as st
 
+from analysis.classification import ATYPICAL, LABEL_NAMES, UNDECIDED
+from analysis.dense import DenseCurves
+from analysis.features import to_well_result
+from analysis.heatmap import create_plate_heatmap
+from analysis.overview import create_plate_overview_figure, encode_png, render_plate_overview
+from analysis.preview import preview_curve_features
+from profiling import timed
 from session.state_manager import SessionStateManager
-from session.utils import validate_page_access
+from session.utils import (
+    collect_well_analysis,
+    show_feature_cache_stats,
+    show_parallel_settings,
+    show_preview_mode_toggle,
+    show_profiling_panel,
+    show_snapshot_download,
+    start_well_analysis,
+    validate_page_access,
+)
 
 st.set_page_config(
     layout="wide",
@@ -12,6 +27,13 @@ st.set_page_config(
 
 st.title("Well Analysis")
 
+# curve colors of the plate overview (typical wells use the default color)
+UNDECIDED_COLOR = (255, 127, 14)
+ATYPICAL_COLOR = (214, 39, 40)
+
+# seconds between the updates of the progress while all wells are analyzed
+PROGRESS_INTERVAL = 1.0
+
 if not validate_page_access("well_analysis"):
     st.stop()
 
@@ -19,22 +41,15 @@ if not validate_page_access("well_analysis"):
 def get_well_classification(well_id):
     """Get the current classification of a well."""
     well_analysis_results = SessionStateManager.get_value("well_analysis_results")
-    if well_id in well_analysis_results and well_analysis_results[well_id].get("reviewed"):
-        if well_analysis_results[well_id].get("is_empty"):
+    if well_id in well_analysis_results and well_analysis_results.get(well_id)["reviewed"]:
+        if well_analysis_results.get(well_id)["is_empty"]:
             return "Atypical"
         else:
             return "Typical"
-            
-    filled_wells = SessionStateManager.get_value("dtw_filled_wells")
-    undecided_wells = SessionStateManager.get_value("dtw_undecided_wells")
-    empty_wells = SessionStateManager.get_value("dtw_empty_wells")
-    
-    if well_id in filled_wells:
-        return "Typical"
-    elif well_id in undecided_wells:
-        return "Undecided"
-    elif well_id in empty_wells:
-        return "Atypical"
+
+    classification = SessionStateManager.get_value("well_classification")
+    if well_id in classification:
+        return LABEL_NAMES[classification.get_label(well_id)]
     else:
         return "Typical"  # not sure if needed, but shouldn't do any harm either
 
@@ -44,30 +59,13 @@ def update_well_classification():
     selected_well = SessionStateManager.get_value("selected_well")
     new_classification = st.session_state.classification_widget
     
-    filled_wells = SessionStateManager.get_value("dtw_filled_wells").copy()
-    undecided_wells = SessionStateManager.get_value("dtw_undecided_wells").copy()
-    empty_wells = SessionStateManager.get_value("dtw_empty_wells").copy()
-    
-    if selected_well in filled_wells:
-        filled_wells.remove(selected_well)
-    if selected_well in undecided_wells:
-        undecided_wells.remove(selected_well)
-    if selected_well in empty_wells:
-        empty_wells.remove(selected_well)
-    
-    if new_classification == "Typical":
-        filled_wells.append(selected_well)
-    elif new_classification == "Undecided":
-        undecided_wells.append(selected_well)
-    elif new_classification == "Atypical":
-        empty_wells.append(selected_well)
-    
-    SessionStateManager.set_value("dtw_filled_wells", filled_wells)
-    SessionStateManager.set_value("dtw_undecided_wells", undecided_wells)
-    SessionStateManager.set_value("dtw_empty_wells", empty_wells)
+    classification = SessionStateManager.get_value("well_classification")
+    labels = {name: label for label, name in LABEL_NAMES.items()}
+    classification.set_label(selected_well, labels[new_classification])
+    SessionStateManager.set_value("well_classification", classification)
 
     well_analysis_results = SessionStateManager.get_value("well_analysis_results")
-    well_analysis_results[selected_well]["reviewed"] = True
+    well_analysis_results.set_flag(selected_well, "reviewed", True)
     SessionStateManager.set_value("well_analysis_results", well_analysis_results)
     
     SessionStateManager.set_value("classification_changed", True)
@@ -78,21 +76,77 @@ def update_smoothing():
     SessionStateManager.set_value("smoothing_features", st.session_state.smoothing_features_widget)
 
 
-def update_selected_well():
-    """Update selected well and reset parameters to that well's saved values."""
-    selected_well = st.session_state.selected_well_widget
+def select_well(selected_well):
+    """Select a well and reset parameters to that well's saved values."""
     SessionStateManager.set_value("selected_well", selected_well)
     
     # reset parameters to the selected well's saved values
     well_analysis_results = SessionStateManager.get_value("well_analysis_results")
     
-    if selected_well in well_analysis_results:
-        saved_data = well_analysis_results[selected_well]
+    if (
+        selected_well in well_analysis_results
+        and selected_well not in SessionStateManager.get_value("well_analysis_pending")
+    ):
+        saved_data = well_analysis_results.get(selected_well)
         SessionStateManager.set_value("smoothing_features", saved_data["smoothing"])
         SessionStateManager.set_value("min_temp", saved_data["min_temp"])
         SessionStateManager.set_value("max_temp", saved_data["max_temp"])
 
 
+def update_selected_well():
+    """Update selected well when changed in the selectbox."""
+    select_well(st.session_state.selected_well_widget)
+
+
+def select_well_from_overview():
+    """Select the well clicked in the plate overview."""
+    points = st.session_state.plate_overview_widget.selection.points
+    if points:
+        curves = SessionStateManager.get_value("dense_curves")
+        select_well(curves.wells[points[0]["point_index"]])
+        # the selectbox is recreated with the new well as its default
+        st.session_state.pop("selected_well_widget", None)
+
+
+def update_overview_signal():
+    SessionStateManager.set_value("overview_signal", st.session_state.overview_signal_widget)
+
+
+def get_plate_overview_png():
+    """Render the overview of all curves, or reuse the last image if nothing has changed."""
+    min_temp = SessionStateManager.get_value("min_temp")
+    max_temp = SessionStateManager.get_value("max_temp")
+    signal = SessionStateManager.get_value("overview_signal")
+    classification = SessionStateManager.get_value("well_classification")
+    key = (signal, min_temp, max_temp, classification.labels.tobytes())
+
+    cached = SessionStateManager.get_value("plate_overview")
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    curves = SessionStateManager.get_value("dense_curves")
+    if curves is None:
+        curves = DenseCurves.from_plate(
+            SessionStateManager.get_value("plate"), SessionStateManager.get_value("available_wells")
+        )
+        SessionStateManager.set_value("dense_curves", curves)
+
+    well_colors = {well: UNDECIDED_COLOR for well in classification.get_wells(UNDECIDED)}
+    well_colors.update({well: ATYPICAL_COLOR for well in classification.get_wells(ATYPICAL)})
+    with timed("render_plate_overview"):
+        image = render_plate_overview(
+            curves,
+            SessionStateManager.get_value("plate_size"),
+            min_temp,
+            max_temp,
+            signal=signal,
+            well_colors=well_colors,
+        )
+        png = encode_png(image)
+    SessionStateManager.set_value("plate_overview", (key, png))
+    return png
+
+
 def update_temperature():
     """Update temperature range values."""
     SessionStateManager.set_value("min_temp", st.session_state.min_temp_widget)
@@ -107,11 +161,12 @@ def save_well_changes():
     min_temp = SessionStateManager.get_value("min_temp")
     max_temp = SessionStateManager.get_value("max_temp")
     
-    data = SessionStateManager.get_value("data")
+    plate = SessionStateManager.get_value("plate")
     avg_control_tm = SessionStateManager.get_value("avg_control_tm")
     
-    analysis_results = get_dsf_curve_features(
-        data=data[data["well_position"] == selected_well],
+    analysis_results = SessionStateManager.get_feature_cache().get(
+        plate,
+        selected_well,
         min_temp=min_temp,
         max_temp=max_temp,
         smoothing=smoothing_features,
@@ -119,304 +174,321 @@ def save_well_changes():
     )
     
     # update is_empty flag based on current classification
-    empty_wells = SessionStateManager.get_value("dtw_empty_wells")
-    is_empty = selected_well in empty_wells
+    classification = SessionStateManager.get_value("well_classification")
+    is_empty = classification.get_label(selected_well) == ATYPICAL
     
-    well_analysis_results[selected_well].update({
-        "is_empty": is_empty,
-        "tm": analysis_results["tm"],
-        "delta_tm": analysis_results["delta_tm"],
-        "min_fluorescence": analysis_results["min_fluorescence"],
-        "max_fluorescence": analysis_results["max_fluorescence"],
-        "fluorescence_range": (
-            analysis_results["max_fluorescence"] - analysis_results["min_fluorescence"]
-        ),
-        "max_slope": analysis_results["max_derivative_value"],
-        "smoothing": smoothing_features,
-        "min_temp": min_temp,
-        "max_temp": max_temp,
-        "full_well_data": analysis_results["full_well_data"],
-        "x_spline": analysis_results["x_spline"],
-        "y_spline": analysis_results["y_spline"],
-        "y_spline_derivative": analysis_results["y_spline_derivative"],
-        "temp_at_min": analysis_results["temp_at_min"],
-        "temp_at_max": analysis_results["temp_at_max"],
-        "max_derivative_value": analysis_results["max_derivative_value"],
-    })
+    well_analysis_results.set_features(
+        selected_well,
+        analysis_results,
+        smoothing=smoothing_features,
+        min_temp=min_temp,
+        max_temp=max_temp,
+        is_empty=is_empty,
+    )
     
     SessionStateManager.set_value("well_analysis_results", well_analysis_results)
     SessionStateManager.set_value("just_saved_well", selected_well)
     SessionStateManager.set_value("classification_changed", False)
 
 
-if not SessionStateManager.get_value("dtw_filled_wells"):
+if SessionStateManager.get_value("well_classification") is None:
     st.warning("Please first detect the atypical wells.")
     st.stop()
 
+# the wells are analyzed in the background and shown as their chunks finish, so the finished wells
+# can be inspected while the rest are analyzed
 if not SessionStateManager.get_value("well_analysis_results"):
-    available_wells = SessionStateManager.get_value("available_wells")
-    data = SessionStateManager.get_value("data")
-    min_temp = SessionStateManager.get_value("min_temp")
-    max_temp = SessionStateManager.get_value("max_temp")
-    smoothing_features = SessionStateManager.get_value("smoothing_features")
-    avg_control_tm = SessionStateManager.get_value("avg_control_tm")
-    dtw_empty_wells = SessionStateManager.get_value("dtw_empty_wells")
-    
-    # initial analysis for all wells
-    well_analysis_results = {}
-    for well in available_wells:
-        single_well_data = data[data["well_position"] == well]
-        analysis_results = get_dsf_curve_features(
-            data=single_well_data,
-            min_temp=min_temp,
-            max_temp=max_temp,
-            smoothing=smoothing_features,
-            avg_control_tm=avg_control_tm,
+    start_well_analysis()
+collect_well_analysis()
+
+
+def show_analysis_progress():
+    """Progress of the analysis of all wells and the Tm of the finished wells on the plate."""
+    well_analysis_results = SessionStateManager.get_value("well_analysis_results")
+    n_wells = len(well_analysis_results)
+    n_waiting = len(SessionStateManager.get_value("well_analysis_pending"))
+    n_pending = collect_well_analysis()
+    # the inspector only offers the finished wells, so the page is rerun whenever wells finish
+    if n_pending < n_waiting:
+        st.rerun()
+
+    st.progress(
+        (n_wells - n_pending) / n_wells,
+        text=f"Analyzing all wells: {n_wells - n_pending} of {n_wells} done",
+    )
+    plate_data, cols, rows = well_analysis_results.to_plate_format(
+        "tm", SessionStateManager.get_value("plate_size")
+    )
+    with timed("create_plate_heatmap"):
+        fig = create_plate_heatmap(
+            plate_data, cols, rows, title="Tm of the analyzed wells", colorbar_title="Tm (°C)"
         )
-        # undecided wells are for now treated as typical
-        # TODO: replace is_empty with is_atypical throughout the code base
-        is_empty = well in dtw_empty_wells
-        well_analysis_results[well] = {
-            "is_empty": is_empty,
-            "reviewed": False,
-            "tm": analysis_results["tm"],
-            "delta_tm": analysis_results["delta_tm"],
-            "min_fluorescence": analysis_results["min_fluorescence"],
-            "max_fluorescence": analysis_results["max_fluorescence"],
-            "fluorescence_range": analysis_results["max_fluorescence"] - analysis_results["min_fluorescence"],
-            "max_slope": analysis_results["max_derivative_value"],
-            "smoothing": smoothing_features,
-            "min_temp": min_temp,
-            "max_temp": max_temp,
-            "full_well_data": analysis_results["full_well_data"],
-            "x_spline": analysis_results["x_spline"],
-            "y_spline": analysis_results["y_spline"],
-            "y_spline_derivative": analysis_results["y_spline_derivative"],
-            "temp_at_min": analysis_results["temp_at_min"],
-            "temp_at_max": analysis_results["temp_at_max"],
-            "max_derivative_value": analysis_results["max_derivative_value"],
-        }
-    
-    SessionStateManager.set_value("well_analysis_results", well_analysis_results)
+    st.plotly_chart(fig, use_container_width=True)
 
-col1, col2, col3, col4, col5 = st.columns(5)
 
-with col1:
-    available_wells = SessionStateManager.get_value("available_wells")
+if SessionStateManager.get_value("well_analysis_pending"):
+    st.fragment(run_every=PROGRESS_INTERVAL)(show_analysis_progress)()
+
+
+@st.fragment
+def well_inspector():
+    """
+    Well selection, analysis settings, plot and metrics of the selected well.
+    Runs as a fragment, so changing a setting only reruns this part of the page.
+    """
+    # while all wells are analyzed, only the finished wells can be selected
+    pending = SessionStateManager.get_value("well_analysis_pending")
+    available_wells = [
+        well for well in SessionStateManager.get_value("available_wells") if well not in pending
+    ]
+    if not available_wells:
+        st.info("The first wells are being analyzed...")
+        return
+
     selected_well = SessionStateManager.get_value("selected_well")
-    
-    if selected_well is None and available_wells:
+    if selected_well in pending:
+        st.info(f"Well {selected_well} is still being analyzed.")
+        selected_well = None
+    if selected_well is None:
         SessionStateManager.set_value("selected_well", available_wells[0])
         selected_well = available_wells[0]
+        st.session_state.pop("selected_well_widget", None)
 
-    if selected_well in available_wells:
-        selected_index = available_wells.index(selected_well)
-    else:
-        selected_index = 0
-
-    st.selectbox(
-        "Select Well for Analysis",
-        options=available_wells,
-        index=selected_index,
-        key="selected_well_widget",
-        on_change=update_selected_well,
-    )
+    col1, col2, col3, col4, col5 = st.columns(5)
 
-with col2:
-    st.slider(
-        "Spline smoothing factor",
-        min_value=0.0,
-        max_value=1.0,
-        value=SessionStateManager.get_value("smoothing_features"),
-        step=0.01,
-        help="Adjust the smoothing factor for the spline fit",
-        key="smoothing_features_widget",
-        on_change=update_smoothing,
-    )
+    with col1:
+        if selected_well in available_wells:
+            selected_index = available_wells.index(selected_well)
+        else:
+            selected_index = 0
+
+        st.selectbox(
+            "Select Well for Analysis",
+            options=available_wells,
+            index=selected_index,
+            key="selected_well_widget",
+            on_change=update_selected_well,
+        )
 
-with col3:
-    data = SessionStateManager.get_value("data")
-    st.number_input(
-        "Min temperature (°C)",
-        min_value=float(data["temperature"].min()),
-        max_value=float(data["temperature"].max()),
-        value=SessionStateManager.get_value("min_temp"),
-        step=1.0,
-        key="min_temp_widget",
-        on_change=update_temperature,
-    )
+    with col2:
+        st.slider(
+            "Spline smoothing factor",
+            min_value=0.0,
+            max_value=1.0,
+            value=SessionStateManager.get_value("smoothing_features"),
+            step=0.01,
+            help="Adjust the smoothing factor for the spline fit",
+            key="smoothing_features_widget",
+            on_change=update_smoothing,
+        )
 
-with col4:
-    st.number_input(
-        "Max temperature (°C)",
-        min_value=float(data["temperature"].min()),
-        max_value=float(data["temperature"].max()),
-        value=SessionStateManager.get_value("max_temp"),
-        step=1.0,
-        key="max_temp_widget",
-        on_change=update_temperature,
-    )
+    with col3:
+        plate = SessionStateManager.get_value("plate")
+        st.number_input(
+            "Min temperature (°C)",
+            min_value=plate.min_temperature,
+            max_value=plate.max_temperature,
+            value=SessionStateManager.get_value("min_temp"),
+            step=1.0,
+            key="min_temp_widget",
+            on_change=update_temperature,
+        )
 
-with col5:
-    selected_well = SessionStateManager.get_value("selected_well")
-    current_classification = get_well_classification(selected_well)
-    classification_options = ["Typical", "Undecided", "Atypical"]
-    current_index = classification_options.index(current_classification)
-    
-    st.selectbox(
-        "Well Classification",
-        options=classification_options,
-        index=current_index,
-        key="classification_widget",
-        on_change=update_well_classification,
-        help="Change the classification of this well"
-    )
+    with col4:
+        st.number_input(
+            "Max temperature (°C)",
+            min_value=plate.min_temperature,
+            max_value=plate.max_temperature,
+            value=SessionStateManager.get_value("max_temp"),
+            step=1.0,
+            key="max_temp_widget",
+            on_change=update_temperature,
+        )
 
-save_col1, save_col2, save_col3 = st.columns(3)
+    with col5:
+        selected_well = SessionStateManager.get_value("selected_well")
+        current_classification = get_well_classification(selected_well)
+        classification_options = ["Typical", "Undecided", "Atypical"]
+        current_index = classification_options.index(current_classification)
+
+        st.selectbox(
+            "Well Classification",
+            options=classification_options,
+            index=current_index,
+            key="classification_widget",
+            on_change=update_well_classification,
+            help="Change the classification of this well"
+        )
 
-with save_col2:
-    # check if current settings differ from saved settings for this well
+    save_col1, save_col2, save_col3 = st.columns(3)
+
+    with save_col2:
+        # check if current settings differ from saved settings for this well
+        selected_well = SessionStateManager.get_value("selected_well")
+        well_analysis_results = SessionStateManager.get_value("well_analysis_results")
+        smoothing_features = SessionStateManager.get_value("smoothing_features")
+        min_temp = SessionStateManager.get_value("min_temp")
+        max_temp = SessionStateManager.get_value("max_temp")
+        classification_changed = SessionStateManager.get_value("classification_changed", False)
+
+        saved_data = well_analysis_results.get(selected_well)
+        fit_settings_changed = (
+            smoothing_features != saved_data["smoothing"] or
+            min_temp != saved_data["min_temp"] or
+            max_temp != saved_data["max_temp"]
+        )
+        settings_changed = fit_settings_changed or classification_changed
+
+        # check if we just saved this well
+        just_saved_well = SessionStateManager.get_value("just_saved_well")
+        if just_saved_well == selected_well and not settings_changed:
+            st.success("Saved updated analysis!", icon="✅")
+            # clear the flag so message doesn't persist
+            SessionStateManager.set_value("just_saved_well", None)
+        elif settings_changed:
+            st.button(
+                "💾 Save Changes",
+                help="Save the updated analysis settings and results for this well",
+                on_click=save_well_changes,
+                type="primary",
+                use_container_width=True
+            )
+        else:
+            st.success("Saved", icon="✅")
+
+    # # show current vs saved settings comparison
+    # if selected_well in well_analysis_results:
+    #     saved_settings = well_analysis_results[selected_well]
+    #     current_settings_differ = (
+    #         smoothing_features != saved_settings["smoothing"] or
+    #         min_temp != saved_settings["min_temp"] or
+    #         max_temp != saved_settings["max_temp"]
+    #     )
+
+    #     # check if classification differs from saved classification
+    #     saved_is_empty = saved_settings["is_empty"]
+    #     current_empty_wells = SessionStateManager.get_value("dtw_empty_wells")
+    #     current_is_empty = selected_well in current_empty_wells
+    #     classification_differs = saved_is_empty != current_is_empty
+
+    #     if current_settings_differ or classification_differs:
+    #         warning_text = "**Viewing temporary analysis** - Current settings differ from saved:\n"
+    #         if current_settings_differ:
+    #             warning_text += f"- **Saved smoothing**: {saved_settings['smoothing']:.3f} → **Current**: {smoothing_features:.3f}\n"
+    #             warning_text += f"- **Saved temp range**: {saved_settings['min_temp']:.1f}°C - {saved_settings['max_temp']:.1f}°C → **Current**: {min_temp:.1f}°C - {max_temp:.1f}°C\n"
+    #         if classification_differs:
+    #             saved_classification = "Atypical" if saved_is_empty else "Typical/Undecided"
+    #             current_classification = get_well_classification(selected_well)
+    #             warning_text += f"- **Saved classification**: {saved_classification} → **Current**: {current_classification}\n"
+    #         warning_text += "\nUse \"Save Changes\" to permanently update this well's analysis."
+
+    #         st.warning(warning_text)
+
+    # get the current analysis data to display; the curves aren't stored with the results, so they
+    # are taken from the feature cache (which fits the well again unless it was shown recently)
     selected_well = SessionStateManager.get_value("selected_well")
     well_analysis_results = SessionStateManager.get_value("well_analysis_results")
-    smoothing_features = SessionStateManager.get_value("smoothing_features")
-    min_temp = SessionStateManager.get_value("min_temp")
-    max_temp = SessionStateManager.get_value("max_temp")
-    classification_changed = SessionStateManager.get_value("classification_changed", False)
-    
-    settings_changed = (
-        smoothing_features != well_analysis_results[selected_well]["smoothing"] or
-        min_temp != well_analysis_results[selected_well]["min_temp"] or
-        max_temp != well_analysis_results[selected_well]["max_temp"] or
-        classification_changed
-    )
-    
-    # check if we just saved this well
-    just_saved_well = SessionStateManager.get_value("just_saved_well")
-    if just_saved_well == selected_well and not settings_changed:
-        st.success("Saved updated analysis!", icon="✅")
-        # clear the flag so message doesn't persist
-        SessionStateManager.set_value("just_saved_well", None)
-    elif settings_changed:
-        st.button(
-            "💾 Save Changes",
-            help="Save the updated analysis settings and results for this well",
-            on_click=save_well_changes,
-            type="primary",
-            use_container_width=True
-        )
+    plate = SessionStateManager.get_value("plate")
+    feature_cache = SessionStateManager.get_feature_cache()
+    fit_settings = {
+        "min_temp": min_temp,
+        "max_temp": max_temp,
+        "smoothing": smoothing_features,
+        "avg_control_tm": SessionStateManager.get_value("avg_control_tm"),
+    }
+    # unsaved settings are previewed unless the exact fit is already cached; saving runs the fit
+    is_preview = False
+    if fit_settings_changed and SessionStateManager.get_value("preview_mode"):
+        analysis_results = feature_cache.get_cached(plate, selected_well, **fit_settings)
+        if analysis_results is None:
+            analysis_results = preview_curve_features(plate, selected_well, **fit_settings)
+            is_preview = True
     else:
-        st.success("Saved", icon="✅")
-
-# # show current vs saved settings comparison
-# if selected_well in well_analysis_results:
-#     saved_settings = well_analysis_results[selected_well]
-#     current_settings_differ = (
-#         smoothing_features != saved_settings["smoothing"] or
-#         min_temp != saved_settings["min_temp"] or
-#         max_temp != saved_settings["max_temp"]
-#     )
-    
-#     # check if classification differs from saved classification
-#     saved_is_empty = saved_settings["is_empty"]
-#     current_empty_wells = SessionStateManager.get_value("dtw_empty_wells")
-#     current_is_empty = selected_well in current_empty_wells
-#     classification_differs = saved_is_empty != current_is_empty
-    
-#     if current_settings_differ or classification_differs:
-#         warning_text = "**Viewing temporary analysis** - Current settings differ from saved:\n"
-#         if current_settings_differ:
-#             warning_text += f"- **Saved smoothing**: {saved_settings['smoothing']:.3f} → **Current**: {smoothing_features:.3f}\n"
-#             warning_text += f"- **Saved temp range**: {saved_settings['min_temp']:.1f}°C - {saved_settings['max_temp']:.1f}°C → **Current**: {min_temp:.1f}°C - {max_temp:.1f}°C\n"
-#         if classification_differs:
-#             saved_classification = "Atypical" if saved_is_empty else "Typical/Undecided"
-#             current_classification = get_well_classification(selected_well)
-#             warning_text += f"- **Saved classification**: {saved_classification} → **Current**: {current_classification}\n"
-#         warning_text += "\nUse \"Save Changes\" to permanently update this well's analysis."
-        
-#         st.warning(warning_text)
-
-# get the current analysis data to display (either saved or temporary with current settings)
-selected_well = SessionStateManager.get_value("selected_well")
-well_analysis_results = SessionStateManager.get_value("well_analysis_results")
-current_settings_differ = (
-    smoothing_features != well_analysis_results[selected_well]["smoothing"] or
-    min_temp != well_analysis_results[selected_well]["min_temp"] or
-    max_temp != well_analysis_results[selected_well]["max_temp"]
-)
-
-# check if saved data has valid plotting data (not None values from atypical wells)
-saved_data = well_analysis_results[selected_well]
-saved_data_has_plot_data = (
-    saved_data.get("full_well_data") is not None and
-    saved_data.get("x_spline") is not None and
-    saved_data.get("y_spline") is not None
-)
-
-if current_settings_differ or not saved_data_has_plot_data:
-    # Calculate fresh analysis data when settings changed or saved data lacks plotting data
-    data = SessionStateManager.get_value("data")
-    avg_control_tm = SessionStateManager.get_value("avg_control_tm")
-    
-    analysis_results = get_dsf_curve_features(
-        data=data[data["well_position"] == selected_well],
+        analysis_results = feature_cache.get(plate, selected_well, **fit_settings)
+    current_well_data = to_well_result(
+        analysis_results,
+        is_empty=well_analysis_results.get(selected_well)["is_empty"],
+        smoothing=smoothing_features,
         min_temp=min_temp,
         max_temp=max_temp,
-        smoothing=smoothing_features,
-        avg_control_tm=avg_control_tm,
     )
-    
-    current_well_data = {
-        "tm": analysis_results["tm"],
-        "delta_tm": analysis_results["delta_tm"],
-        "min_fluorescence": analysis_results["min_fluorescence"],
-        "max_fluorescence": analysis_results["max_fluorescence"],
-        "fluorescence_range": analysis_results["max_fluorescence"] - analysis_results["min_fluorescence"],
-        "max_slope": analysis_results["max_derivative_value"],
-        "smoothing": smoothing_features,
-        "min_temp": min_temp,
-        "max_temp": max_temp,
-        "full_well_data": analysis_results["full_well_data"],
-        "x_spline": analysis_results["x_spline"],
-        "y_spline": analysis_results["y_spline"],
-        "y_spline_derivative": analysis_results["y_spline_derivative"],
-        "temp_at_min": analysis_results["temp_at_min"],
-        "temp_at_max": analysis_results["temp_at_max"],
-        "max_derivative_value": analysis_results["max_derivative_value"],
-    }
-else:
-    # use saved analysis data when settings haven't changed and data is valid
-    current_well_data = well_analysis_results[selected_well]
 
-fig = create_melt_curve_plot_from_features(current_well_data)
+    with timed("create_melt_curve_plot_from_features"):
+        fig = create_melt_curve_plot_from_features(analysis_results)
 
-plot_col, metrics_col = st.columns([0.85, 0.15])
+    plot_col, metrics_col = st.columns([0.85, 0.15])
 
-with plot_col:
-    st.plotly_chart(fig, use_container_width=True)
+    with plot_col:
+        st.plotly_chart(fig, use_container_width=True)
 
-with metrics_col:
-    st.subheader("Analysis Results")
-    st.metric(
-        "Tm (°C)",
-        f"{current_well_data['tm']:.2f}",
-    )
-    st.metric(
-        "ΔTm (K)",
-        f"{current_well_data['delta_tm']:.2f}",
-    )
-    st.metric(
-        "Min Fluorescence",
-        f"{current_well_data['min_fluorescence']:.2f}",
-    )
-    st.metric(
-        "Max Fluorescence",
-        f"{current_well_data['max_fluorescence']:.2f}",
-    )
-    st.metric(
-        "Fluorescence Range",
-        f"{current_well_data['fluorescence_range']:.2f}",
-    )
-    st.metric(
-        "Max Slope",
-        f"{current_well_data['max_slope']:.3f}",
-    )
+    with metrics_col:
+        if is_preview:
+            st.subheader("Preview")
+            st.caption("Quick spline fit of the scaled curve; save to calculate the exact values.")
+        else:
+            st.subheader("Analysis Results")
+        st.metric(
+            "Tm (°C)",
+            f"{current_well_data['tm']:.2f}",
+        )
+        st.metric(
+            "ΔTm (K)",
+            f"{current_well_data['delta_tm']:.2f}",
+        )
+        st.metric(
+            "Min Fluorescence",
+            f"{current_well_data['min_fluorescence']:.2f}",
+        )
+        st.metric(
+            "Max Fluorescence",
+            f"{current_well_data['max_fluorescence']:.2f}",
+        )
+        st.metric(
+            "Fluorescence Range",
+            f"{current_well_data['fluorescence_range']:.2f}",
+        )
+        st.metric(
+            "Max Slope",
+            f"{current_well_data['max_slope']:.3f}",
+        )
+
+    with st.expander("Plate overview"):
+        st.radio(
+            "Signal",
+            options=["fluorescence", "derivative"],
+            format_func=str.capitalize,
+            index=["fluorescence", "derivative"].index(
+                SessionStateManager.get_value("overview_signal")
+            ),
+            horizontal=True,
+            key="overview_signal_widget",
+            on_change=update_overview_signal,
+        )
+        st.caption(
+            "Curves of all wells in the selected temperature range (normalized per well; undecided "
+            "wells in orange, atypical wells in red). Click a well to select it."
+        )
+        # renders the image first, which also builds the dense curves if needed
+        overview_png = get_plate_overview_png()
+        overview_fig = create_plate_overview_figure(
+            overview_png,
+            SessionStateManager.get_value("plate_size"),
+            SessionStateManager.get_value("dense_curves"),
+            selected_well=selected_well,
+        )
+        st.plotly_chart(
+            overview_fig,
+            use_container_width=True,
+            key="plate_overview_widget",
+            on_select=select_well_from_overview,
+            selection_mode="points",
+        )
+
+
+well_inspector()
+
+show_preview_mode_toggle()
+show_feature_cache_stats()
+show_parallel_settings()
+show_snapshot_download()
+show_profiling_panel()
@@ -1,12 +1,24 @@
-from bada.utils.reformatting import convert_features_to_plate_format
-from bada.visualization import create_heatmap_plot
+from io import BytesIO
 
-import numpy as np
-import pandas as pd
 import streamlit as st
 
+from analysis.export import (
+    CURVE_EXPORT_FORMAT,
+    EXPORT_FORMATS,
+    export_table,
+    write_curve_archive,
+)
+from analysis.heatmap import create_plate_heatmap
+from analysis.results import build_results_table
+from profiling import timed
 from session.state_manager import SessionStateManager
-from session.utils import validate_page_access
+from session.utils import (
+    collect_well_analysis,
+    show_parallel_settings,
+    show_profiling_panel,
+    show_snapshot_download,
+    validate_page_access,
+)
 
 st.set_page_config(
     layout="wide",
@@ -18,6 +30,73 @@ st.title("Plate Heatmap View")
 if not validate_page_access("summary_and_download"):
     st.stop()
 
+# the wells analyzed in the background since the Well Analysis page was left are stored first
+n_pending = collect_well_analysis()
+if n_pending:
+    st.warning(
+        f"""{n_pending} wells are still being analyzed. Go back to the Well Analysis page or
+        reload this page once all wells are done."""
+    )
+    st.stop()
+
+# the results table in the tabular formats and the curves of all wells
+DOWNLOAD_FORMATS = {**EXPORT_FORMATS, "curves": CURVE_EXPORT_FORMAT}
+
+
+def get_export(export_format, calculate=True):
+    """
+    Get the results file in a format, created on demand and cached until the results change.
+
+    Returns:
+        Content of the file; None if it is not cached and `calculate` is False
+    """
+    well_analysis_results = SessionStateManager.get_value("well_analysis_results")
+    cached = SessionStateManager.get_value("results_exports")
+    # the results are changed in place (e.g. on the Well Analysis page), which bumps their version
+    if (
+        cached is None
+        or cached[0] is not well_analysis_results
+        or cached[1] != well_analysis_results.version
+    ):
+        cached = (well_analysis_results, well_analysis_results.version, {})
+        SessionStateManager.set_value("results_exports", cached)
+
+    exports = cached[2]
+    if export_format not in exports:
+        if not calculate:
+            return None
+        if export_format == "curves":
+            exports[export_format] = get_curve_archive(well_analysis_results)
+        else:
+            results_df = build_results_table(
+                well_analysis_results, SessionStateManager.get_value("available_wells")
+            )
+            exports[export_format] = export_table(results_df, export_format)
+    return exports[export_format]
+
+
+def get_curve_archive(well_analysis_results):
+    """Write the raw and fitted curves of all wells; the fits are taken from the feature cache."""
+    progress_bar = st.progress(0.0, text="Writing the curves...")
+    output = BytesIO()
+    write_curve_archive(
+        output,
+        SessionStateManager.get_value("plate"),
+        well_analysis_results,
+        SessionStateManager.get_feature_cache(),
+        max_workers=SessionStateManager.get_value("max_workers"),
+        progress=lambda done, total: progress_bar.progress(
+            done / total, text=f"Writing the curves... ({done}/{total} wells)"
+        ),
+    )
+    progress_bar.empty()
+    return output.getvalue()
+
+
+def update_export_format():
+    SessionStateManager.set_value("export_format", st.session_state.export_format_widget)
+
+
 st.info("""
 📊 **Review your results**: This heatmap shows the final ΔTm values for all wells. 
 If you notice any unexpected patterns or values, you can return to the **Well Analysis** page to
@@ -28,83 +107,60 @@ well_analysis_results = SessionStateManager.get_value("well_analysis_results")
 
 plate_size = SessionStateManager.get_value("plate_size")
 
-# create a copy of well_analysis_results and set delta_tm to NaN for empty wells
-well_analysis_for_heatmap = {}
-for well, data in well_analysis_results.items():
-    well_data = data.copy()
-    # if well is marked as empty/atypical, set delta_tm to NaN so it appears white in heatmap
-    if data.get("is_empty", False):
-        well_data["delta_tm"] = np.nan
-    well_analysis_for_heatmap[well] = well_data
-
-plate_data, cols, rows = convert_features_to_plate_format(
-    well_analysis_for_heatmap,
-    plate_size,
-    "delta_tm"
-)
+# empty/atypical wells are set to NaN so they appear white in the heatmap
+with timed("to_plate_format"):
+    plate_data, cols, rows = well_analysis_results.to_plate_format(
+        "delta_tm", plate_size, mask_empty=True
+    )
 
-fig = create_heatmap_plot(
-    plate_data,
-    cols,
-    rows,
-    title="ΔTm Values",
-    colorbar_title="ΔTm (K)"
-)
+with timed("create_plate_heatmap"):
+    fig = create_plate_heatmap(
+        plate_data,
+        cols,
+        rows,
+        title="ΔTm Values",
+        colorbar_title="ΔTm (K)"
+    )
 
 st.plotly_chart(fig, use_container_width=True)
 
-results_data = []
-available_wells = SessionStateManager.get_value("available_wells")
-reviewed_wells = SessionStateManager.get_value("reviewed_wells")
-
-for well in available_wells:
-    result = {
-        "well": well,
-        "reviewed": well in reviewed_wells,
-        "is_empty": False,
-        "tm": None,
-        "delta_tm": None,
-        "min_fluorescence": None,
-        "max_fluorescence": None,
-        "fluorescence_range": None,
-        "max_slope": None,
-        "smoothing": None,
-        "min_temp": None,
-        "max_temp": None,
-    }
-
-    if well in well_analysis_results:
-        well_data = well_analysis_results[well]
-        result.update(well_data)
-
-    results_data.append(result)
-
-results_df = pd.DataFrame(results_data)
-results_df = results_df.drop(
-    columns=[
-        "x_spline",
-        "y_spline",
-        "full_well_data",
-        "y_spline_derivative",
-    ]
-)
-
-# temp solution until it's updated everywhere in the code
-results_df = results_df.rename(
-    columns={
-        "is_empty": "atypical",
-    }
-)
-
-csv = results_df.to_csv(index=False)
+export_format = SessionStateManager.get_value("export_format")
+file_format = DOWNLOAD_FORMATS[export_format]
 
 col1, col2, col3 = st.columns(3)
 with col2:
-    st.download_button(
-        label="📥 Download Analysis Results (CSV)", 
-        data=csv, 
-        file_name="dsf_analysis_results.csv", 
-        mime="text/csv",
-        type="secondary",
-        use_container_width=True
+    st.selectbox(
+        "File format",
+        options=list(DOWNLOAD_FORMATS),
+        index=list(DOWNLOAD_FORMATS).index(export_format),
+        format_func=lambda name: DOWNLOAD_FORMATS[name].label,
+        key="export_format_widget",
+        on_change=update_export_format,
+        help="""Parquet and Arrow IPC files keep the column types and are read much faster than
+        CSV files, e.g. by pandas (read_parquet, read_feather), polars or DuckDB. The NPZ curves
+        are a NumPy archive with the raw curve, the fitted spline and its derivative of every well
+        (float32, one array per chunk of wells; see analysis.export.load_curve_archive).""",
     )
+
+    # the file is only written once it is requested
+    data = get_export(export_format, calculate=False)
+    if data is None and st.button(
+        f"Prepare Analysis Results ({file_format.label})",
+        type="secondary",
+        use_container_width=True,
+    ):
+        data = get_export(export_format)
+
+    if data is not None:
+        st.download_button(
+            label=f"📥 Download Analysis Results ({file_format.label})",
+            data=data,
+            file_name=f"dsf_analysis_results.{file_format.extension}",
+            mime=file_format.mime,
+            type="secondary",
+            use_container_width=True
+        )
+
+show_parallel_settings()
+show_snapshot_download()
+show_profiling_panel()
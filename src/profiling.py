@@ -0,0 +1,143 @@
+"""
+Opt-in timing of the heavy calls of a page rerun.
+
+The profiler of the current session is activated at the start of a rerun (see
+session.utils.start_profiling). Code wrapped in `timed` is only measured while a profiler is active,
+otherwise it costs two perf_counter calls.
+"""
+from collections import defaultdict
+from contextlib import ContextDecorator
+from datetime import datetime
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# JSON lines file with the numbers of every profiled rerun
+PROFILE_LOG_FILE = os.environ.get("DSF_VIEWER_PROFILE_LOG", "dsf_viewer_profile.log")
+
+# streamlit runs every rerun of a session in its own script thread
+_active = threading.local()
+_logger_lock = threading.Lock()
+
+
+class Profiler:
+    """Wall times and call counts of the timed calls, per rerun and cumulated over the session."""
+
+    def __init__(self):
+        self.reruns = 0
+        self.page: Optional[str] = None
+        self.rerun_start = time.perf_counter()
+        self.rerun_timings: Dict[str, Dict[str, float]] = {}
+        self.total_timings: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {"calls": 0, "seconds": 0.0}
+        )
+
+    def start_rerun(self, page: str) -> None:
+        self.reruns += 1
+        self.page = page
+        self.rerun_start = time.perf_counter()
+        self.rerun_timings = defaultdict(lambda: {"calls": 0, "seconds": 0.0})
+
+    def record(self, name: str, seconds: float) -> None:
+        for timings in (self.rerun_timings, self.total_timings):
+            timings[name]["calls"] += 1
+            timings[name]["seconds"] += seconds
+
+    @property
+    def rerun_seconds(self) -> float:
+        """Wall time since the start of the current rerun."""
+        return time.perf_counter() - self.rerun_start
+
+
+def activate(profiler: Optional[Profiler]) -> None:
+    """Set the profiler that records the timed calls of the current rerun (None to disable)."""
+    _active.profiler = profiler
+
+
+def get_active_profiler() -> Optional[Profiler]:
+    return getattr(_active, "profiler", None)
+
+
+class timed(ContextDecorator):
+    """
+    Measure the wall time of a block or function for the active profiler.
+
+    Example:
+        with timed("create_plate_heatmap"):
+            fig = create_plate_heatmap(...)
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def _recreate_cm(self) -> "timed":
+        # a fresh instance per decorated call, so concurrent sessions don't share the start time
+        return type(self)(self.name)
+
+    def __enter__(self) -> "timed":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> bool:
+        profiler = get_active_profiler()
+        if profiler is not None:
+            profiler.record(self.name, time.perf_counter() - self._start)
+        return False
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """
+    Approximate memory usage of a value in bytes.
+
+    Arrays, data frames and objects with an `nbytes` attribute (e.g. PlateData) report their buffer
+    size; containers are measured recursively (up to a few levels deep).
+    """
+    if value is None:
+        return 0
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, np.ndarray) or hasattr(value, "nbytes"):
+        return int(value.nbytes)
+
+    size = sys.getsizeof(value)
+    if _depth >= 4:
+        return size
+    if isinstance(value, dict):
+        size += sum(
+            estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1) for k, v in value.items()
+        )
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _depth + 1) for item in value)
+    return size
+
+
+def _get_logger() -> logging.Logger:
+    logger = logging.getLogger("dsf_viewer.profiling")
+    with _logger_lock:
+        if not logger.handlers:
+            handler = logging.FileHandler(PROFILE_LOG_FILE)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+    return logger
+
+
+def write_log(profiler: Profiler, state_sizes: Dict[str, int]) -> None:
+    """Append the numbers of the current rerun to the profile log as one JSON line."""
+    record = {
+        "timestamp": datetime.now().isoformat(timespec="milliseconds"),
+        "rerun": profiler.reruns,
+        "page": profiler.page,
+        "rerun_seconds": profiler.rerun_seconds,
+        "timings": profiler.rerun_timings,
+        "state_sizes": state_sizes,
+    }
+    _get_logger().info(json.dumps(record))
@@ -34,7 +34,7 @@ PAGE_STATE_REQUIREMENTS: Dict[str, List[str]] = {
         "control_wells", 
         "selected_control",
         "avg_control_tm",
-        "dtw_filled_wells"
+        "well_classification"
     ],
     
     "well_review": [
@@ -42,9 +42,7 @@ PAGE_STATE_REQUIREMENTS: Dict[str, List[str]] = {
         "available_wells",
         "avg_control_tm",
         "well_analysis_results",
-        "dtw_filled_wells",
-        "dtw_undecided_wells",
-        "dtw_empty_wells"
+        "well_classification"
     ],
     
     "summary_and_download": [
@@ -0,0 +1,373 @@
+"""
+Save and restore a complete analysis as a versioned snapshot file.
+
+A snapshot is a zip archive (like an NPZ file) with a JSON manifest for the settings and other
+small values and one compressed .npy entry per array: the long-format plate data, the distances of
+the atypical well detection, the classification labels and the per-well results. The fitted curves
+are not stored; like during the analysis, they are regenerated on demand from the saved settings of
+each well (see FeatureCache). State that is derived in milliseconds (the plate index, the dense
+curve matrix and the heatmap matrices) is rebuilt when the snapshot is loaded.
+"""
+from datetime import datetime, timezone
+import json
+from typing import Any, BinaryIO, Dict, List, Mapping, Optional, Tuple
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from analysis.classification import WellClassification
+from analysis.clustering import PairwiseDistances
+from analysis.dense import DenseCurves
+from analysis.export import read_array, write_array
+from analysis.plate import PlateData
+from analysis.results import WellResults
+
+SNAPSHOT_FORMAT = "dsf-viewer-snapshot"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_EXTENSION = "dsfsnap"
+
+MANIFEST_NAME = "manifest.json"
+
+# session state values that are saved as they are (JSON lists are restored as tuples where needed)
+SETTINGS_KEYS = [
+    "file_format",
+    "plate_size",
+    "min_temp",
+    "max_temp",
+    "control_wells",
+    "selected_control",
+    "avg_control_tm",
+    "control_results",
+    "smoothing_control",
+    "dtw_lower_threshold",
+    "dtw_upper_threshold",
+    "dtw_window",
+    "dtw_pruned_wells",
+    "dtw_prune_threshold",
+    "dtw_reference",
+    "similarity_mode",
+    "correlation_thresholds",
+    "n_clusters",
+    "linkage_method",
+    "smoothing_features",
+    "selected_well",
+    "overview_signal",
+    "use_dense_curves",
+    "max_workers",
+    "chunk_size",
+    "feature_cache_size",
+    "preview_mode",
+    "export_format",
+    "smoothing_review",
+    "current_well_index",
+    "initial_wells_to_review",
+]
+
+# review state stored as sets in the session state
+SET_KEYS = ["reviewed_wells", "reviewed_as_empty", "reviewed_as_filled"]
+
+DistanceDict = Dict[str, Tuple[float, str]]
+
+
+def _to_json(value: Any) -> Any:
+    """Convert numpy scalars and arrays for json.dumps."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Cannot save a value of type {type(value).__name__} in a snapshot")
+
+
+def _to_tuple(value: Any) -> Any:
+    """Convert (nested) JSON lists back to tuples, e.g. for cache keys."""
+    if isinstance(value, list):
+        return tuple(_to_tuple(item) for item in value)
+    return value
+
+
+class _SnapshotWriter:
+    """Writes the arrays of a snapshot under generated names (referenced in the manifest)."""
+
+    def __init__(self, archive: zipfile.ZipFile, wells: List[str]):
+        self.archive = archive
+        self._well_index = {well: i for i, well in enumerate(wells)}
+        self._n_arrays = 0
+
+    def add_array(self, array: np.ndarray) -> str:
+        """Write an array and get its name for the manifest."""
+        name = f"array_{self._n_arrays:04d}"
+        self._n_arrays += 1
+        write_array(self.archive, name, array)
+        return name
+
+    def add_wells(self, wells: List[str]) -> str:
+        """Write a list of wells as indices into the wells of the plate."""
+        return self.add_array(
+            np.array([self._well_index[well] for well in wells], dtype=np.int32)
+        )
+
+    def add_distances(self, distances: DistanceDict) -> Dict[str, Any]:
+        references = {reference for _, reference in distances.values()}
+        return {
+            "wells": self.add_wells(list(distances)),
+            "distances": self.add_array(
+                np.fromiter((distance for distance, _ in distances.values()), dtype=float)
+            ),
+            "reference": references.pop() if len(references) == 1 else None,
+        }
+
+
+class _SnapshotReader:
+    """Reads the arrays of a snapshot."""
+
+    def __init__(self, archive: zipfile.ZipFile, wells: List[str]):
+        self.archive = archive
+        self.wells = wells
+
+    def get_array(self, name: str) -> np.ndarray:
+        return read_array(self.archive, name)
+
+    def get_wells(self, name: str) -> List[str]:
+        return [self.wells[i] for i in self.get_array(name)]
+
+    def get_distances(self, entry: Dict[str, Any]) -> DistanceDict:
+        distances = self.get_array(entry["distances"])
+        return {
+            well: (float(distance), entry["reference"])
+            for well, distance in zip(self.get_wells(entry["wells"]), distances)
+        }
+
+
+def _write_plate_data(writer: _SnapshotWriter, data: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Write the columns of the plate data; text columns are stored as codes and categories."""
+    columns = []
+    for name in data.columns:
+        values = data[name]
+        if pd.api.types.is_numeric_dtype(values):
+            columns.append({"name": name, "values": writer.add_array(values.to_numpy())})
+        else:
+            codes, categories = pd.factorize(values)
+            columns.append({
+                "name": name,
+                "codes": writer.add_array(codes.astype(np.int32)),
+                "categories": writer.add_array(np.asarray(categories, dtype=str)),
+            })
+    return columns
+
+
+def _read_plate_data(archive: zipfile.ZipFile, columns: List[Dict[str, Any]]) -> pd.DataFrame:
+    data = {}
+    for column in columns:
+        if "values" in column:
+            data[column["name"]] = read_array(archive, column["values"])
+        else:
+            categories = read_array(archive, column["categories"]).astype(object)
+            data[column["name"]] = categories[read_array(archive, column["codes"])]
+    return pd.DataFrame(data)
+
+
+def write_snapshot(output: BinaryIO, state: Mapping[str, Any]) -> None:
+    """
+    Write the analysis in the session state as a snapshot.
+
+    Args:
+        output: Writable binary file
+        state: Session state (or any mapping with the keys of SessionStateManager.DEFAULT_VALUES)
+
+    Raises:
+        ValueError: If no data has been uploaded
+    """
+    plate: Optional[PlateData] = state.get("plate")
+    if plate is None:
+        raise ValueError("There is no data to save")
+
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        writer = _SnapshotWriter(archive, plate.wells)
+        manifest: Dict[str, Any] = {
+            "format": SNAPSHOT_FORMAT,
+            "version": SNAPSHOT_VERSION,
+            "created": datetime.now(timezone.utc).isoformat(),
+            "settings": {key: state.get(key) for key in SETTINGS_KEYS},
+            "sets": {key: sorted(state.get(key) or []) for key in SET_KEYS},
+            "plate_data": _write_plate_data(writer, plate.data),
+        }
+
+        # the distances of the shown reference are also an entry of the cache, which is kept in
+        # the restored state (the Detect Atypical Wells page compares them by identity)
+        dtw_distances = state.get("dtw_distances")
+        cache_entries = []
+        for i, (key, (distances, pruned, threshold)) in enumerate(
+            (state.get("dtw_distance_cache") or {}).items()
+        ):
+            cache_entries.append({
+                "key": key,
+                "pruned": pruned,
+                "prune_threshold": threshold,
+                **writer.add_distances(distances),
+            })
+            if distances is dtw_distances:
+                manifest["dtw_distances"] = {"cache_entry": i}
+        manifest["dtw_distance_cache"] = cache_entries
+        if dtw_distances is not None and "dtw_distances" not in manifest:
+            manifest["dtw_distances"] = writer.add_distances(dtw_distances)
+
+        correlation_distances = state.get("correlation_distances")
+        if correlation_distances is not None:
+            key, distances = correlation_distances
+            manifest["correlation_distances"] = {"key": key, **writer.add_distances(distances)}
+
+        consensus_curve = state.get("consensus_curve")
+        if consensus_curve is not None:
+            key, curve = consensus_curve
+            manifest["consensus_curve"] = {"key": key, "curve": writer.add_array(curve)}
+
+        pairwise = state.get("pairwise_dtw_distances")
+        if pairwise is not None:
+            key, distances = pairwise
+            manifest["pairwise_dtw_distances"] = {
+                "key": key,
+                "wells": writer.add_wells(distances.wells),
+                "condensed": writer.add_array(distances.condensed),
+            }
+
+        classification: Optional[WellClassification] = state.get("well_classification")
+        if classification is not None:
+            manifest["well_classification"] = {
+                "wells": writer.add_wells(classification.wells),
+                "distances": writer.add_array(classification.distances),
+                "labels": writer.add_array(classification.labels),
+            }
+
+        results: Optional[WellResults] = state.get("well_analysis_results")
+        if results is not None:
+            manifest["well_analysis_results"] = {
+                "wells": writer.add_wells(results.wells),
+                "rows": writer.add_array(results.positions[0]),
+                "cols": writer.add_array(results.positions[1]),
+                "columns": {
+                    name: writer.add_array(values) for name, values in results.columns.items()
+                },
+                "version": results.version,
+            }
+
+        archive.writestr(MANIFEST_NAME, json.dumps(manifest, default=_to_json, indent=1))
+
+
+def read_snapshot(file: BinaryIO) -> Dict[str, Any]:
+    """
+    Read a snapshot written by write_snapshot.
+
+    Args:
+        file: Readable binary file
+
+    Returns:
+        Session state values of the saved analysis (values that were not saved are missing and
+        keep their defaults)
+
+    Raises:
+        ValueError: If the file is not a snapshot or was written by a newer version of the app
+    """
+    try:
+        archive = zipfile.ZipFile(file)
+    except zipfile.BadZipFile as e:
+        raise ValueError("The file is not a DSF viewer snapshot") from e
+
+    with archive:
+        try:
+            manifest = json.loads(archive.read(MANIFEST_NAME))
+        except KeyError as e:
+            raise ValueError("The file is not a DSF viewer snapshot") from e
+        if manifest.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError("The file is not a DSF viewer snapshot")
+        if manifest["version"] > SNAPSHOT_VERSION:
+            raise ValueError(
+                f"The snapshot was saved by a newer version of the app (snapshot version "
+                f"{manifest['version']}, supported up to {SNAPSHOT_VERSION})"
+            )
+
+        settings = manifest["settings"]
+        state: Dict[str, Any] = {
+            key: value for key, value in settings.items() if key in SETTINGS_KEYS
+        }
+        if settings.get("correlation_thresholds") is not None:
+            state["correlation_thresholds"] = {
+                mode: tuple(thresholds)
+                for mode, thresholds in settings["correlation_thresholds"].items()
+            }
+        state.update({key: set(wells) for key, wells in manifest["sets"].items()})
+
+        # the plate index is rebuilt from the long-format data (no parsing or validation needed)
+        plate = PlateData(_read_plate_data(archive, manifest["plate_data"]))
+        reader = _SnapshotReader(archive, plate.wells)
+        state["data"] = plate.data
+        state["plate"] = plate
+        state["available_wells"] = plate.wells
+        if settings.get("use_dense_curves"):
+            state["dense_curves"] = DenseCurves.from_plate(plate, plate.wells)
+
+        dtw_distance_cache = {}
+        cache_distances = []
+        for entry in manifest.get("dtw_distance_cache", []):
+            distances = reader.get_distances(entry)
+            cache_distances.append(distances)
+            dtw_distance_cache[_to_tuple(entry["key"])] = (
+                distances,
+                entry["pruned"],
+                entry["prune_threshold"],
+            )
+        state["dtw_distance_cache"] = dtw_distance_cache
+
+        dtw_distances = manifest.get("dtw_distances")
+        if dtw_distances is not None:
+            if "cache_entry" in dtw_distances:
+                state["dtw_distances"] = cache_distances[dtw_distances["cache_entry"]]
+            else:
+                state["dtw_distances"] = reader.get_distances(dtw_distances)
+
+        correlation_distances = manifest.get("correlation_distances")
+        if correlation_distances is not None:
+            state["correlation_distances"] = (
+                _to_tuple(correlation_distances["key"]),
+                reader.get_distances(correlation_distances),
+            )
+
+        consensus_curve = manifest.get("consensus_curve")
+        if consensus_curve is not None:
+            state["consensus_curve"] = (
+                _to_tuple(consensus_curve["key"]),
+                reader.get_array(consensus_curve["curve"]),
+            )
+
+        pairwise = manifest.get("pairwise_dtw_distances")
+        if pairwise is not None:
+            state["pairwise_dtw_distances"] = (
+                _to_tuple(pairwise["key"]),
+                PairwiseDistances(
+                    reader.get_wells(pairwise["wells"]), reader.get_array(pairwise["condensed"])
+                ),
+            )
+
+        saved_classification = manifest.get("well_classification")
+        if saved_classification is not None:
+            classification = WellClassification(
+                reader.get_wells(saved_classification["wells"]),
+                reader.get_array(saved_classification["distances"]),
+            )
+            classification.labels[:] = reader.get_array(saved_classification["labels"])
+            state["well_classification"] = classification
+
+        saved_results = manifest.get("well_analysis_results")
+        if saved_results is not None:
+            results = WellResults.from_columns(
+                reader.get_wells(saved_results["wells"]),
+                {
+                    name: reader.get_array(array)
+                    for name, array in saved_results["columns"].items()
+                },
+                (reader.get_array(saved_results["rows"]), reader.get_array(saved_results["cols"])),
+            )
+            results.version = saved_results["version"]
+            state["well_analysis_results"] = results
+
+    return state
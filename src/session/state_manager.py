@@ -1,7 +1,12 @@
-from typing import Any, List
+from typing import Any, Dict, List, Tuple
 
 import streamlit as st
 
+from analysis.cache import FeatureCache
+from analysis.clustering import DEFAULT_N_CLUSTERS
+from analysis.similarity import DEFAULT_THRESHOLDS
+from profiling import Profiler
+
 
 class SessionStateManager:
     """Manages session state initialization and utilities."""
@@ -10,6 +15,8 @@ class SessionStateManager:
     DEFAULT_VALUES = {
         # data-related state
         "data": None,
+        "plate": None,
+        "dense_curves": None,
         "file_format": None,
         "available_wells": [],
         "plate_size": None,
@@ -33,17 +40,76 @@ class SessionStateManager:
         
         # dtw-related state (for atypical well detection)
         "dtw_distances": None,
+        "dtw_window": None,
+        "dtw_pruned_wells": [],
+        "dtw_prune_threshold": None,
+        # reference of the distances: a control well or the consensus (None = selected_control)
+        "dtw_reference": None,
+        # DTW distances per reference, created on first use (see get_dtw_distance_cache)
+        "dtw_distance_cache": None,
+        "consensus_curve": None,
+        # DTW distances between all pairs of wells and their clustering (see analysis.clustering)
+        "pairwise_dtw_distances": None,
+        "n_clusters": DEFAULT_N_CLUSTERS,
+        "linkage_method": "average",
         "plate_data": None,
         "plate_cols": None,
         "plate_rows": None,
-        "dtw_filled_wells": [],
-        "dtw_undecided_wells": [],
-        "dtw_empty_wells": [],
-        "well_analysis_results": {},
+        # per-well labels of the threshold classification (WellClassification)
+        "well_classification": None,
+        "well_analysis_results": None,
+        # background analysis of all wells that fills well_analysis_results chunk by chunk, and
+        # the wells it hasn't stored yet (see collect_well_analysis)
+        "well_analysis_job": None,
+        "well_analysis_pending": set(),
+        
+        # correlation-based alternative to DTW (see analysis.similarity)
+        "similarity_mode": "dtw",
+        "correlation_thresholds": {
+            mode: thresholds
+            for mode, thresholds in DEFAULT_THRESHOLDS.items()
+            if mode != "dtw"
+        },
+        "correlation_distances": None,
         
         # well analysis state
         "smoothing_features": 0.01,
         "selected_well": None,
+        "overview_signal": "fluorescence",
+        "plate_overview": None,
+        
+        # summary and download state
+        # (results, results version, {format: file content}) of the files created so far
+        "results_exports": None,
+        "export_format": "csv",
+        
+        # file ID of the last restored snapshot (see session.snapshot) and (file ID, format) of the
+        # last loaded data file, so files kept in the uploaders are only loaded once
+        "loaded_snapshot": None,
+        "loaded_data": None,
+        
+        # build the dense wells x temperatures matrix at upload (used e.g. for DTW)
+        "use_dense_curves": True,
+        
+        # batch processing settings (max_workers=None uses all available CPUs)
+        "max_workers": None,
+        "chunk_size": 16,
+        
+        # memoized curve features, created on first use (see get_feature_cache)
+        "feature_cache": None,
+        "feature_cache_size": 32,
+        
+        # opt-in timing of the heavy calls (see profiling.py), kept when new data is uploaded
+        "profiling_enabled": False,
+        "profiler": None,
+        
+        # calculate the DTW distances and features of the next pages in the background after the
+        # control analysis (see analysis.precompute)
+        "background_precompute": True,
+        "precomputation": None,
+        
+        # show a fast preview instead of the exact fit while the well inspector settings are changed
+        "preview_mode": True,
         
         # well review state
         "smoothing_review": 0.01,
@@ -55,6 +121,9 @@ class SessionStateManager:
         "current_review_filters": None,
     }
     
+    # settings that are not reset by reset_all
+    KEEP_ON_RESET = {"profiling_enabled", "profiler", "loaded_snapshot", "loaded_data"}
+    
     @classmethod
     def initialize_all(cls) -> None:
         """Initialize all session state variables with their default values."""
@@ -78,8 +147,11 @@ class SessionStateManager:
     @classmethod
     def reset_all(cls) -> None:
         """Reset all session state variables to their default values."""
+        cls.cancel_precomputation()
+        cls.cancel_precomputation("well_analysis_job")
         for key, default_value in cls.DEFAULT_VALUES.items():
-            st.session_state[key] = default_value    
+            if key not in cls.KEEP_ON_RESET:
+                st.session_state[key] = default_value
 
     @classmethod
     def get_value(cls, key: str, default: Any = None) -> Any:
@@ -91,6 +163,46 @@ class SessionStateManager:
         """Set a session state value."""
         st.session_state[key] = value
     
+    @classmethod
+    def get_feature_cache(cls) -> FeatureCache:
+        """Get the session's curve feature cache, creating it if necessary."""
+        feature_cache = st.session_state.get("feature_cache")
+        if feature_cache is None:
+            feature_cache = FeatureCache(maxsize=cls.get_value("feature_cache_size"))
+            st.session_state["feature_cache"] = feature_cache
+        return feature_cache
+    
+    @classmethod
+    def get_dtw_distance_cache(cls) -> Dict[Tuple, Tuple[Dict, List[str], float]]:
+        """
+        Get the session's DTW distances per reference, creating the cache if necessary.
+
+        The cache maps (reference, min_temp, max_temp, window) to (distances, pruned wells,
+        pruning threshold), so switching between references doesn't recalculate the distances.
+        """
+        dtw_distance_cache = st.session_state.get("dtw_distance_cache")
+        if dtw_distance_cache is None:
+            dtw_distance_cache = {}
+            st.session_state["dtw_distance_cache"] = dtw_distance_cache
+        return dtw_distance_cache
+
+    @classmethod
+    def cancel_precomputation(cls, key: str = "precomputation") -> None:
+        """Stop a background calculation (e.g. when its inputs change) and discard it."""
+        precomputation = st.session_state.get(key)
+        if precomputation is not None:
+            precomputation.cancel()
+            st.session_state[key] = None
+
+    @classmethod
+    def get_profiler(cls) -> Profiler:
+        """Get the session's profiler, creating it if necessary."""
+        profiler = st.session_state.get("profiler")
+        if profiler is None:
+            profiler = Profiler()
+            st.session_state["profiler"] = profiler
+        return profiler
+    
     @classmethod
     def has_data(cls) -> bool:
         """Check if data has been uploaded."""
@@ -110,8 +222,8 @@ class SessionStateManager:
     @classmethod
     def has_well_analysis(cls) -> bool:
         """Check if well analysis has been completed."""
-        well_analysis_results = st.session_state.get("well_analysis_results", {})
-        return len(well_analysis_results) > 0
+        well_analysis_results = st.session_state.get("well_analysis_results")
+        return well_analysis_results is not None and len(well_analysis_results) > 0
 
 
 # convenience functions for common operations
@@ -1,6 +1,18 @@
+from datetime import datetime
+from io import BytesIO
+
+import pandas as pd
 import streamlit as st
 
+from analysis.classification import ATYPICAL
+from analysis.consensus import CONSENSUS_REFERENCE
+from analysis.features import extract_features_batch, with_delta_tm
+from analysis.precompute import Precomputation
+from analysis.results import WellResults
+from profiling import activate, estimate_size, timed, write_log
+
 from .page_states import get_page_dependencies
+from .snapshot import SNAPSHOT_EXTENSION, read_snapshot, write_snapshot
 from .state_manager import SessionStateManager
 
 
@@ -59,6 +71,7 @@ def validate_page_access(page_name: str) -> bool:
     """
     # Initialize the page state
     init_page(page_name)
+    start_profiling(page_name)
     
     # Check prerequisites
     if not check_prerequisites(page_name):
@@ -68,6 +81,386 @@ def validate_page_access(page_name: str) -> bool:
     return True
 
 
+def show_feature_cache_stats() -> None:
+    """
+    Show the hit/miss statistics of the curve feature cache in the sidebar.
+    """
+    cache_stats = SessionStateManager.get_feature_cache().stats
+    st.sidebar.caption(
+        f"Feature cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+        f"({cache_stats['size']}/{cache_stats['maxsize']} entries)"
+    )
+
+
+def update_parallel_settings():
+    """Update the number of worker processes and the chunk size in session state when changed."""
+    max_workers = st.session_state.max_workers_widget
+    SessionStateManager.set_value("max_workers", int(max_workers) if max_workers > 0 else None)
+    SessionStateManager.set_value("chunk_size", int(st.session_state.chunk_size_widget))
+
+
+def show_parallel_settings() -> None:
+    """
+    Show the settings of the parallel feature extraction and DTW calculation in the sidebar.
+    """
+    max_workers = SessionStateManager.get_value("max_workers")
+    with st.sidebar.expander("Parallel processing"):
+        st.number_input(
+            "Worker processes",
+            min_value=0,
+            value=max_workers if max_workers is not None else 0,
+            step=1,
+            key="max_workers_widget",
+            on_change=update_parallel_settings,
+            help="""Number of processes (or threads of the DTW library) used for the feature
+            extraction and the DTW distances; 0 uses all available CPUs. Applies to the next
+            calculation.""",
+        )
+        st.number_input(
+            "Wells per task",
+            min_value=1,
+            value=SessionStateManager.get_value("chunk_size"),
+            step=1,
+            key="chunk_size_widget",
+            on_change=update_parallel_settings,
+            help="""Number of wells sent to a worker process at once. Larger chunks have less
+            overhead, smaller chunks spread the work more evenly and report progress more
+            often.""",
+        )
+
+
+def update_preview_mode():
+    """Update the preview mode toggle in session state when changed."""
+    SessionStateManager.set_value("preview_mode", st.session_state.preview_mode_widget)
+
+
+def show_preview_mode_toggle() -> None:
+    """
+    Show the toggle for the preview mode in the sidebar.
+    """
+    st.sidebar.toggle(
+        "Preview while adjusting",
+        value=SessionStateManager.get_value("preview_mode"),
+        key="preview_mode_widget",
+        on_change=update_preview_mode,
+        help="""Show a fast preview of the curve fit while the smoothing factor or the temperature
+        range of the inspected well are adjusted. The exact fit is calculated when the settings
+        are saved.""",
+    )
+
+
+def show_snapshot_download() -> None:
+    """
+    Show the button to save the current analysis as a snapshot in the sidebar.
+    The snapshot is only written when it is requested.
+    """
+    if not SessionStateManager.has_data():
+        return
+
+    with st.sidebar.expander("Save analysis"):
+        if SessionStateManager.get_value("well_analysis_pending"):
+            st.caption("The analysis can be saved once all wells are analyzed.")
+            return
+        st.caption(
+            "Save the data, settings and results to continue later; load the file on the "
+            "Upload Data page."
+        )
+        if st.button("Prepare snapshot", use_container_width=True):
+            output = BytesIO()
+            with timed("write_snapshot"):
+                write_snapshot(output, st.session_state)
+            st.download_button(
+                label=f"📥 Download snapshot ({len(output.getvalue()) / 1024:.0f} KiB)",
+                data=output.getvalue(),
+                file_name=f"dsf_analysis_{datetime.now():%Y%m%d_%H%M}.{SNAPSHOT_EXTENSION}",
+                mime="application/zip",
+                use_container_width=True,
+            )
+
+
+def restore_snapshot(content: bytes) -> None:
+    """
+    Replace the session state with a saved analysis.
+
+    The snapshot is read completely before the session state is replaced, so the current analysis
+    is kept if the file can't be read.
+
+    Raises:
+        ValueError: If the file is not a valid snapshot (a damaged file can raise other errors)
+    """
+    with timed("read_snapshot"):
+        values = read_snapshot(BytesIO(content))
+    SessionStateManager.reset_all()
+    for key, value in values.items():
+        SessionStateManager.set_value(key, value)
+
+
+def start_precomputation() -> None:
+    """
+    Start the background calculation of the DTW distances and the features of all wells with the
+    current settings, unless it is disabled or already running (or done) for these settings.
+    """
+    if not SessionStateManager.get_value("background_precompute"):
+        return
+
+    # the reference and settings the Detect Atypical Wells and Well Analysis pages will use; the
+    # consensus reference depends on the DTW window of the next page, so it isn't precomputed
+    reference = SessionStateManager.get_value("dtw_reference")
+    if reference not in SessionStateManager.get_value("control_wells"):
+        reference = SessionStateManager.get_value("selected_control")
+    if (
+        SessionStateManager.get_value("similarity_mode") != "dtw"
+        or SessionStateManager.get_value("dtw_reference") == CONSENSUS_REFERENCE
+    ):
+        reference = None
+    curves = SessionStateManager.get_value("dense_curves")
+    settings = {
+        "reference_well": reference,
+        "min_temp": SessionStateManager.get_value("min_temp"),
+        "max_temp": SessionStateManager.get_value("max_temp"),
+        "window": SessionStateManager.get_value("dtw_window"),
+        "prune_above": SessionStateManager.get_value("dtw_upper_threshold"),
+        "smoothing": SessionStateManager.get_value("smoothing_features"),
+    }
+
+    precomputation = SessionStateManager.get_value("precomputation")
+    if precomputation is not None and not precomputation.cancelled and all(
+        getattr(precomputation, name) == value for name, value in settings.items()
+    ):
+        return
+
+    SessionStateManager.cancel_precomputation()
+    SessionStateManager.set_value(
+        "precomputation",
+        Precomputation(
+            SessionStateManager.get_value("plate"),
+            curves if curves is not None else SessionStateManager.get_value("plate"),
+            SessionStateManager.get_value("available_wells"),
+            max_workers=SessionStateManager.get_value("max_workers"),
+            chunk_size=SessionStateManager.get_value("chunk_size"),
+            **settings,
+        ).start(),
+    )
+
+
+def start_well_analysis() -> None:
+    """
+    Start the analysis of all wells with the current settings in the background.
+
+    The results are created right away with the features of all wells missing; collect_well_analysis
+    fills them in as the chunks of wells finish. A matching calculation of the Control Analysis page
+    is continued instead of starting over.
+    """
+    plate = SessionStateManager.get_value("plate")
+    available_wells = SessionStateManager.get_value("available_wells")
+    min_temp = SessionStateManager.get_value("min_temp")
+    max_temp = SessionStateManager.get_value("max_temp")
+    smoothing = SessionStateManager.get_value("smoothing_features")
+
+    SessionStateManager.cancel_precomputation("well_analysis_job")
+    job = SessionStateManager.get_value("precomputation")
+    if job is not None and job.has_feature_settings(min_temp, max_temp, smoothing):
+        # taken over, so later changes on the Control Analysis page don't cancel it
+        SessionStateManager.set_value("precomputation", None)
+    else:
+        SessionStateManager.cancel_precomputation()
+        job = Precomputation(
+            plate,
+            None,
+            available_wells,
+            reference_well=None,
+            min_temp=min_temp,
+            max_temp=max_temp,
+            window=None,
+            prune_above=None,
+            smoothing=smoothing,
+            max_workers=SessionStateManager.get_value("max_workers"),
+            chunk_size=SessionStateManager.get_value("chunk_size"),
+        ).start()
+
+    SessionStateManager.set_value("well_analysis_job", job)
+    SessionStateManager.set_value("well_analysis_pending", set(available_wells))
+    SessionStateManager.set_value(
+        "well_analysis_results",
+        WellResults(available_wells, plate.get_positions(available_wells)),
+    )
+
+
+def collect_well_analysis() -> int:
+    """
+    Store the features of the wells finished by the background analysis in the results.
+
+    If the analysis stopped before all wells were finished (e.g. it was cancelled or failed), the
+    remaining wells are calculated here.
+
+    Returns:
+        Number of wells that are still being analyzed
+    """
+    job = SessionStateManager.get_value("well_analysis_job")
+    pending = SessionStateManager.get_value("well_analysis_pending")
+    if job is None or not pending:
+        return 0
+
+    # read before taking the features, so no features finished in between are missed
+    running = job.running
+    features = {well: values for well, values in job.pop_features().items() if well in pending}
+    remaining = [] if running else [
+        well
+        for well in SessionStateManager.get_value("available_wells")
+        if well in pending and well not in features
+    ]
+
+    if features or remaining:
+        # the features aren't added to the feature cache, which only holds the wells that are
+        # looked at; the inspector fits the selected well again when it's shown
+        avg_control_tm = SessionStateManager.get_value("avg_control_tm")
+        features = {
+            well: with_delta_tm(values, avg_control_tm) for well, values in features.items()
+        }
+        if remaining:
+            features.update(
+                extract_features_batch(
+                    SessionStateManager.get_value("plate"),
+                    remaining,
+                    min_temp=job.min_temp,
+                    max_temp=job.max_temp,
+                    smoothing=job.smoothing,
+                    avg_control_tm=avg_control_tm,
+                    max_workers=SessionStateManager.get_value("max_workers"),
+                    chunk_size=SessionStateManager.get_value("chunk_size"),
+                )
+            )
+        # undecided wells are for now treated as typical
+        classification = SessionStateManager.get_value("well_classification")
+        atypical_wells = set(classification.get_wells(ATYPICAL))
+        results = SessionStateManager.get_value("well_analysis_results")
+        for well, values in features.items():
+            results.set_features(
+                well,
+                values,
+                smoothing=job.smoothing,
+                min_temp=job.min_temp,
+                max_temp=job.max_temp,
+                is_empty=well in atypical_wells,
+            )
+        pending = pending - set(features)
+        SessionStateManager.set_value("well_analysis_pending", pending)
+
+    if not pending:
+        SessionStateManager.set_value("well_analysis_job", None)
+    return len(pending)
+
+
+def update_background_precompute():
+    """Update the background calculation toggle in session state when changed."""
+    SessionStateManager.set_value(
+        "background_precompute", st.session_state.background_precompute_widget
+    )
+    if not st.session_state.background_precompute_widget:
+        SessionStateManager.cancel_precomputation()
+
+
+def show_precomputation_status() -> None:
+    """
+    Show the toggle and the progress of the background calculation in the sidebar.
+    """
+    st.sidebar.toggle(
+        "Calculate next steps in the background",
+        value=SessionStateManager.get_value("background_precompute"),
+        key="background_precompute_widget",
+        on_change=update_background_precompute,
+        help="""Calculate the DTW distances and the features of all wells with the current
+        settings while you review the control wells, so the next pages are ready sooner.""",
+    )
+    precomputation = SessionStateManager.get_value("precomputation")
+    if precomputation is None:
+        return
+
+    dtw_done, n_features, n_wells = precomputation.progress
+    if precomputation.error is not None:
+        st.sidebar.caption(f"Background calculation failed: {precomputation.error}")
+    elif precomputation.running:
+        st.sidebar.caption(
+            f"Calculating in the background: DTW distances {'done' if dtw_done else 'running'}, "
+            f"features of {n_features}/{n_wells} wells"
+        )
+    elif not precomputation.cancelled:
+        st.sidebar.caption(f"Background calculation done ({n_features} wells)")
+
+
+def start_profiling(page_name: str) -> None:
+    """
+    Activate the session's profiler for this rerun if profiling is enabled.
+    """
+    if SessionStateManager.get_value("profiling_enabled"):
+        profiler = SessionStateManager.get_profiler()
+        profiler.start_rerun(page_name)
+        activate(profiler)
+    else:
+        activate(None)
+
+
+def update_profiling_enabled():
+    """Update the profiling toggle in session state when changed."""
+    SessionStateManager.set_value("profiling_enabled", st.session_state.profiling_enabled_widget)
+
+
+def get_state_sizes() -> dict:
+    """
+    Get the approximate memory usage in bytes of every session state variable.
+    """
+    return {
+        key: estimate_size(st.session_state.get(key))
+        for key in SessionStateManager.DEFAULT_VALUES
+        if key != "profiler"
+    }
+
+
+def show_profiling_panel() -> None:
+    """
+    Show the profiling toggle and, if enabled, the timings of this rerun in the sidebar.
+    Must be called at the end of a page so all timed calls of the rerun are included.
+    """
+    st.sidebar.toggle(
+        "Profile reruns",
+        value=SessionStateManager.get_value("profiling_enabled"),
+        key="profiling_enabled_widget",
+        on_change=update_profiling_enabled,
+        help="Measure the heavy calls of every rerun and the size of the session state",
+    )
+    if not SessionStateManager.get_value("profiling_enabled"):
+        return
+
+    profiler = SessionStateManager.get_profiler()
+    state_sizes = get_state_sizes()
+    write_log(profiler, state_sizes)
+
+    with st.sidebar.expander("Profile", expanded=True):
+        st.caption(
+            f"Rerun {profiler.reruns} ({profiler.page}): {profiler.rerun_seconds * 1000:.0f} ms"
+        )
+        timings = pd.DataFrame(
+            [
+                {
+                    "call": name,
+                    "calls": profiler.rerun_timings.get(name, {}).get("calls", 0),
+                    "ms": profiler.rerun_timings.get(name, {}).get("seconds", 0.0) * 1000,
+                    "session calls": total["calls"],
+                    "session ms": total["seconds"] * 1000,
+                }
+                for name, total in profiler.total_timings.items()
+            ]
+        )
+        if not timings.empty:
+            st.dataframe(timings.sort_values("ms", ascending=False), hide_index=True)
+
+        sizes = pd.DataFrame(
+            {"key": list(state_sizes), "KiB": [size / 1024 for size in state_sizes.values()]}
+        )
+        sizes = sizes[sizes["KiB"] >= 1].sort_values("KiB", ascending=False)
+        st.dataframe(sizes, hide_index=True)
+
+
 def get_session_summary() -> dict:
     """
     Get a summary of the current session state for debugging.
@@ -82,5 +475,5 @@ def get_session_summary() -> dict:
         "num_control_wells": len(st.session_state.get("control_wells", [])),
         "selected_control": st.session_state.get("selected_control"),
         "plate_size": st.session_state.get("plate_size"),
-        "num_well_analysis_results": len(st.session_state.get("well_analysis_results", {})),
+        "num_well_analysis_results": len(st.session_state.get("well_analysis_results") or []),
     } 
\ No newline at end of file
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the app modules are imported like in the app, which runs from src/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "src"))
@@ -0,0 +1,59 @@
+import numpy as np
+
+from analysis.classification import ATYPICAL, TYPICAL, UNDECIDED, WellClassification
+
+
+def make_classification() -> WellClassification:
+    wells = ["A1", "A2", "A3", "A4", "A5", "A6"]
+    distances = [0.5, 3.0, np.nan, 1.5, np.inf, 1.0]
+    return WellClassification(wells, np.array(distances))
+
+
+def test_classify_by_thresholds():
+    classification = make_classification()
+    classification.classify(1.0, 2.0)
+
+    assert classification.get_wells(TYPICAL) == ["A1", "A6"]
+    # NaN distances are undecided for all thresholds
+    assert classification.get_wells(UNDECIDED) == ["A3", "A4"]
+    # distances pruned beyond a threshold (inf) are atypical
+    assert classification.get_wells(ATYPICAL) == ["A2", "A5"]
+
+
+def test_count_matches_classify():
+    classification = make_classification()
+    for lower, upper in [(0.0, 0.0), (1.0, 2.0), (1.5, 1.5), (2.0, 1.0), (10.0, 20.0)]:
+        classification.classify(lower, upper)
+        counts = classification.count(lower, upper)
+        assert counts == {
+            label: int(np.count_nonzero(classification.labels == label))
+            for label in (TYPICAL, UNDECIDED, ATYPICAL)
+        }
+        assert sum(counts.values()) == len(classification)
+
+
+def test_overlapping_thresholds_prefer_typical():
+    classification = make_classification()
+    classification.classify(2.0, 1.0)
+    assert classification.get_wells(TYPICAL) == ["A1", "A4", "A6"]
+    assert classification.get_wells(ATYPICAL) == ["A2", "A5"]
+
+
+def test_set_label_until_reclassified():
+    classification = make_classification()
+    classification.classify(1.0, 2.0)
+    classification.set_label("A2", TYPICAL)
+    assert classification.get_label("A2") == TYPICAL
+
+    classification.classify(1.0, 2.0)
+    assert classification.get_label("A2") == ATYPICAL
+
+
+def test_from_dtw_distances():
+    classification = WellClassification.from_dtw_distances(
+        {"B1": (0.2, "A1"), "B2": (0.1, "A1")}
+    )
+    assert classification.wells == ["B1", "B2"]
+    assert "B2" in classification
+    assert classification.distances.tolist() == [0.2, 0.1]
+    assert classification.get_wells(TYPICAL) == ["B1", "B2"]
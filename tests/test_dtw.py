@@ -0,0 +1,75 @@
+from typing import Optional
+
+from dtaidistance import dtw
+import numpy as np
+import pytest
+
+from analysis.dtw import lb_keogh, lb_kim, normalize_signal
+
+
+def brute_force_dtw(a: np.ndarray, b: np.ndarray, window: Optional[int] = None) -> float:
+    """DTW distance as defined by dtaidistance (square root of the summed squared differences)."""
+    n, m = len(a), len(b)
+    cost = np.full((n + 1, m + 1), np.inf)
+    cost[0, 0] = 0.0
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            if window is not None and abs(i - j) >= window:
+                continue
+            cost[i, j] = (a[i - 1] - b[j - 1]) ** 2 + min(
+                cost[i - 1, j], cost[i, j - 1], cost[i - 1, j - 1]
+            )
+    return float(np.sqrt(cost[n, m]))
+
+
+@pytest.fixture
+def signals() -> np.ndarray:
+    """Normalized noisy sigmoids with shifted midpoints, as compared by the DTW screening."""
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 1, 40)
+    curves = [
+        1 / (1 + np.exp(-(x - midpoint) / 0.05)) + rng.normal(0, 0.05, len(x))
+        for midpoint in rng.uniform(0.3, 0.7, 12)
+    ]
+    return np.array([normalize_signal(curve) for curve in curves])
+
+
+def test_brute_force_matches_dtaidistance(signals):
+    reference = signals[0]
+    for signal in signals[1:4]:
+        assert brute_force_dtw(reference, signal) == pytest.approx(
+            dtw.distance(reference, signal, use_c=False)
+        )
+        assert brute_force_dtw(reference, signal, window=4) == pytest.approx(
+            dtw.distance(reference, signal, window=4, use_c=False)
+        )
+
+
+def test_lb_kim_is_lower_bound(signals):
+    reference, others = signals[0], signals[1:]
+    bounds = lb_kim(reference, list(others))
+    distances = [brute_force_dtw(reference, signal) for signal in others]
+    assert np.all(bounds <= np.array(distances) + 1e-12)
+
+
+def test_lb_kim_different_lengths(signals):
+    reference = signals[0]
+    others = [signals[1][:25], signals[2]]
+    bounds = lb_kim(reference, others)
+    distances = [brute_force_dtw(reference, signal) for signal in others]
+    assert np.all(bounds <= np.array(distances) + 1e-12)
+
+
+@pytest.mark.parametrize("window", [1, 2, 5, 40])
+def test_lb_keogh_is_lower_bound(signals, window):
+    reference, others = signals[0], signals[1:]
+    bounds = lb_keogh(reference, others, window)
+    distances = [brute_force_dtw(reference, signal, window) for signal in others]
+    assert np.all(bounds <= np.array(distances) + 1e-12)
+
+
+def test_lb_keogh_without_warping_is_euclidean(signals):
+    # with window 1 no warping is allowed, so the bound is the DTW (Euclidean) distance
+    reference, others = signals[0], signals[1:]
+    expected = np.sqrt(((others - reference) ** 2).sum(axis=1))
+    np.testing.assert_allclose(lb_keogh(reference, others, 1), expected)
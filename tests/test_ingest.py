@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+# the instrument parsers are bada's
+pytest.importorskip("bada")
+
+from analysis import ingest  # noqa: E402
+from analysis.ingest import ParseCache  # noqa: E402
+
+
+@pytest.fixture
+def parsed_files(monkeypatch):
+    """Replace the parser by one plate per file content and count the calls."""
+    calls = []
+
+    def parse_dsf_file(content, file_format):
+        calls.append(content)
+        data = pd.DataFrame({
+            "well_position": "A1",
+            "temperature": np.arange(25.0, 95.5, 0.5),
+            "fluorescence": float(len(calls)),
+        })
+        return data, 96
+
+    monkeypatch.setattr(ingest, "parse_dsf_file", parse_dsf_file)
+    return calls
+
+
+def plate_bytes() -> int:
+    cache = ParseCache()
+    plate, _ = cache.get_or_parse(b"size", "QuantStudio 7")
+    return plate.nbytes
+
+
+def test_cache_hit(parsed_files):
+    cache = ParseCache()
+    plate, plate_size = cache.get_or_parse(b"file", "QuantStudio 7")
+    assert cache.get_or_parse(b"file", "QuantStudio 7")[0] is plate
+    assert plate_size == 96
+    assert parsed_files == [b"file"]
+
+    # the same content in another format is parsed again
+    cache.get_or_parse(b"file", "LightCycler 480")
+    assert len(parsed_files) == 2
+
+
+def test_least_recently_used_evicted(parsed_files):
+    cache = ParseCache(max_bytes=2 * plate_bytes())
+    parsed_files.clear()
+
+    cache.get_or_parse(b"first", "QuantStudio 7")
+    cache.get_or_parse(b"second", "QuantStudio 7")
+    # using the first file makes the second one the least recently used
+    cache.get_or_parse(b"first", "QuantStudio 7")
+    cache.get_or_parse(b"third", "QuantStudio 7")
+    assert parsed_files == [b"first", b"second", b"third"]
+
+    cache.get_or_parse(b"first", "QuantStudio 7")
+    cache.get_or_parse(b"third", "QuantStudio 7")
+    assert len(parsed_files) == 3
+    cache.get_or_parse(b"second", "QuantStudio 7")
+    assert parsed_files[-1] == b"second"
+
+
+def test_newest_plate_kept_beyond_limit(parsed_files):
+    cache = ParseCache(max_bytes=1)
+    plate, _ = cache.get_or_parse(b"large", "QuantStudio 7")
+    assert cache.get_or_parse(b"large", "QuantStudio 7")[0] is plate
+    cache.get_or_parse(b"other", "QuantStudio 7")
+    cache.get_or_parse(b"large", "QuantStudio 7")
+    assert parsed_files == [b"large", b"other", b"large"]
+
+
+def test_clear(parsed_files):
+    cache = ParseCache()
+    cache.get_or_parse(b"file", "QuantStudio 7")
+    cache.clear()
+    cache.get_or_parse(b"file", "QuantStudio 7")
+    assert parsed_files == [b"file", b"file"]
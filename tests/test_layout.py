@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from analysis.layout import (
+    get_column_labels,
+    get_row_labels,
+    infer_plate_size,
+    parse_well_ids,
+    to_plate_matrix,
+)
+
+
+@pytest.mark.parametrize(
+    "plate_size, n_rows, n_cols, last_well",
+    [(96, 8, 12, "H12"), (384, 16, 24, "P24"), (1536, 32, 48, "AF48")],
+)
+def test_to_plate_matrix(plate_size, n_rows, n_cols, last_well):
+    wells = [f"{row}{col}" for row in get_row_labels(plate_size) for col in range(1, n_cols + 1)]
+    assert len(wells) == plate_size
+    assert wells[-1] == last_well
+
+    values = np.arange(plate_size, dtype=float)
+    plate_data, cols, rows = to_plate_matrix(parse_well_ids(wells), values, plate_size)
+
+    assert plate_data.shape == (n_rows, n_cols)
+    # the wells are in row-major order, so the matrix is the values row by row
+    np.testing.assert_array_equal(plate_data, values.reshape(n_rows, n_cols))
+    assert cols == get_column_labels(plate_size)
+    assert rows == get_row_labels(plate_size)
+    assert infer_plate_size(wells) == plate_size
+
+
+def test_to_plate_matrix_missing_wells():
+    wells = ["A1", "B2", "AA3"]
+    plate_data, _, rows = to_plate_matrix(parse_well_ids(wells), np.array([1.0, 2.0, 3.0]), 1536)
+
+    assert rows[26] == "AA"
+    assert plate_data[0, 0] == 1.0
+    assert plate_data[1, 1] == 2.0
+    assert plate_data[26, 2] == 3.0
+    assert np.count_nonzero(np.isnan(plate_data)) == 1536 - 3
+
+
+def test_unsupported_plate_size():
+    with pytest.raises(ValueError):
+        to_plate_matrix(parse_well_ids(["A1"]), np.array([1.0]), 100)
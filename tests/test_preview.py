@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.plate import PlateData
+from analysis.preview import preview_curve_features
+
+
+@pytest.fixture
+def plate() -> PlateData:
+    """A noisy melting curve on the raw fluorescence scale (about 900 to 5900 units)."""
+    rng = np.random.default_rng(0)
+    temperature = np.arange(25.0, 95.5, 0.5)
+    fluorescence = 900 + 5000 / (1 + np.exp(-(temperature - 55.0) / 1.5))
+    fluorescence += rng.normal(0, 25, len(temperature))
+    return PlateData(
+        pd.DataFrame(
+            {"well_position": "A1", "temperature": temperature, "fluorescence": fluorescence}
+        )
+    )
+
+
+def test_preview_follows_smoothing(plate):
+    slopes = [
+        preview_curve_features(plate, "A1", None, None, smoothing)["max_derivative_value"]
+        for smoothing in (0.0, 0.01, 0.1, 1.0)
+    ]
+    # a smoother spline has a flatter peak of the derivative
+    assert all(np.diff(slopes) < 0)
+
+
+def test_preview_finds_tm(plate):
+    features = preview_curve_features(plate, "A1", 40.0, 70.0, 0.01, avg_control_tm=54.0)
+    assert features["preview"]
+    assert features["tm"] == pytest.approx(55.0, abs=1.0)
+    assert features["delta_tm"] == pytest.approx(features["tm"] - 54.0)
+    assert features["min_fluorescence"] < 1000 < 5500 < features["max_fluorescence"]
+
+
+def test_preview_flat_curve(plate):
+    flat = PlateData(
+        pd.DataFrame(
+            {"well_position": "A1", "temperature": np.arange(25.0, 60.0), "fluorescence": 100.0}
+        )
+    )
+    features = preview_curve_features(flat, "A1", None, None, 0.5)
+    assert features["fluorescence_range"] == pytest.approx(0.0)
@@ -0,0 +1,115 @@
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# the snapshot stores the per-well results, whose module fits the curves with bada
+pytest.importorskip("bada")
+
+from analysis.classification import ATYPICAL, TYPICAL, WellClassification  # noqa: E402
+from analysis.plate import PlateData  # noqa: E402
+from analysis.results import WellResults  # noqa: E402
+from session.snapshot import read_snapshot, write_snapshot  # noqa: E402
+
+WELLS = ["A1", "A2", "A10", "B1"]
+
+
+@pytest.fixture
+def state():
+    temperature = np.arange(25.0, 95.5, 0.5)
+    data = pd.concat(
+        [
+            pd.DataFrame({
+                "well_position": well,
+                "temperature": temperature,
+                "fluorescence": 1000 + 5000 / (1 + np.exp(-(temperature - 50 - i) / 1.5)),
+            })
+            for i, well in enumerate(WELLS)
+        ],
+        ignore_index=True,
+    )
+    plate = PlateData(data)
+
+    dtw_distances = {"A2": (0.5, "A1"), "A10": (np.inf, "A1"), "B1": (np.nan, "A1")}
+    classification = WellClassification.from_dtw_distances(dtw_distances)
+    classification.classify(1.0, 2.0)
+    classification.set_label("B1", TYPICAL)
+
+    results = WellResults(plate.wells)
+    results.set_flag("A2", "reviewed", True)
+    results.set_flag("B1", "is_empty", True)
+
+    return {
+        "data": plate.data,
+        "plate": plate,
+        "file_format": "QuantStudio 7",
+        "plate_size": 96,
+        "min_temp": 35.0,
+        "max_temp": 85.0,
+        "control_wells": ["A1"],
+        "correlation_thresholds": {"pearson": (0.1, 0.2)},
+        "dtw_distances": dtw_distances,
+        "dtw_distance_cache": {("A1", 35.0, 85.0, None): (dtw_distances, ["A10"], 2.0)},
+        "well_classification": classification,
+        "well_analysis_results": results,
+        "reviewed_wells": {"A2", "B1"},
+    }
+
+
+def round_trip(state):
+    buffer = BytesIO()
+    write_snapshot(buffer, state)
+    return read_snapshot(BytesIO(buffer.getvalue()))
+
+
+def test_round_trip(state):
+    restored = round_trip(state)
+
+    assert restored["plate"].wells == state["plate"].wells
+    pd.testing.assert_frame_equal(restored["data"], state["data"])
+    assert restored["available_wells"] == state["plate"].wells
+    for key in ("file_format", "plate_size", "min_temp", "max_temp", "control_wells"):
+        assert restored[key] == state[key]
+    assert restored["correlation_thresholds"] == {"pearson": (0.1, 0.2)}
+    assert restored["reviewed_wells"] == {"A2", "B1"}
+
+    distances = restored["dtw_distances"]
+    assert distances["A2"] == (0.5, "A1")
+    assert distances["A10"] == (np.inf, "A1")
+    assert np.isnan(distances["B1"][0])
+    # the shown distances are still the cached ones
+    cached, pruned, threshold = restored["dtw_distance_cache"][("A1", 35.0, 85.0, None)]
+    assert cached is distances
+    assert list(pruned) == ["A10"]
+    assert threshold == 2.0
+
+    classification = restored["well_classification"]
+    assert classification.wells == state["well_classification"].wells
+    np.testing.assert_array_equal(classification.labels, state["well_classification"].labels)
+    assert classification.get_label("A10") == ATYPICAL
+    assert classification.get_label("B1") == TYPICAL
+
+    results = restored["well_analysis_results"]
+    assert results.wells == state["well_analysis_results"].wells
+    assert results.version == state["well_analysis_results"].version
+    assert results.get("A2")["reviewed"]
+    assert results.get("B1")["is_empty"]
+    assert not results.get("A1")["reviewed"]
+
+
+def test_missing_values_keep_defaults(state):
+    restored = round_trip({"plate": state["plate"], "data": state["data"]})
+    assert "well_classification" not in restored
+    assert "well_analysis_results" not in restored
+    assert restored["plate"].wells == state["plate"].wells
+
+
+def test_not_a_snapshot():
+    with pytest.raises(ValueError):
+        read_snapshot(BytesIO(b"well_position,temperature,fluorescence\n"))
+
+
+def test_nothing_to_save():
+    with pytest.raises(ValueError):
+        write_snapshot(BytesIO(), {})